@@ -0,0 +1,299 @@
+"""
+Approximate nearest-neighbor search over course vectors.
+
+Every course's TF-IDF vector (similar.py) is projected onto ANN_DIM random
+Gaussian directions and scaled to unit length, so cosine similarity becomes
+a dot product of small dense float32 vectors. The vectors are indexed by a
+forest of random-projection trees: each node splits its courses at the median
+of their projections onto the difference of two random members, so every
+tree is balanced and stored implicitly as flat heap arrays (one hyperplane
+and offset per inner node, plus the course order of its leaves). A query
+descends every tree, also visiting the leaves behind the ANN_PROBES - 1
+splits it passed closest to, and reranks the union of those leaves exactly.
+
+    index = AnnIndex()                   # ANN_DIR by default; arrays are memory-mapped
+    index.similar("edx:abc", k=10, level="beginner", language="english")
+    index.search(vector, k=10)           # any ANN_DIM vector, e.g. index.vector("edx:abc")
+
+Filters (source, level, language; case-insensitive) are applied to the
+candidates, doubling the probes while too few pass; filters that match at
+most ANN_EXACT_BELOW courses are answered by an exact scan of those courses.
+build() writes a new generation (similar.write_generation); rebuild after an
+ETL run and reload AnnIndex to pick it up.
+"""
+import argparse
+import json
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import (
+    TARGET_DB, SIMILAR_DIR, ANN_DIR, ANN_DIM, ANN_TREES, ANN_LEAF_SIZE, ANN_PROBES, ANN_EXACT_BELOW,
+)
+from .db import open_conn
+from .loader import LIVE_TABLE
+from .logging_config import logger
+from .similar import SimilarityIndex, segments, current_generation, write_generation, refresh as refresh_similar
+
+FILTER_FIELDS = ("source", "level", "language")
+# Per field: course -> value code (-1 when unknown), and the courses of each code (rows, offsets)
+FILTER_ARRAYS = tuple(f"{field}_{name}" for field in FILTER_FIELDS for name in ("codes", "rows", "offsets"))
+ARRAYS = ("vectors", "planes", "offsets", "perms") + FILTER_ARRAYS
+
+_CHUNK = 65536   # courses per step when projecting and splitting
+
+def index_dir_for(target_db: Optional[Path] = None) -> Path:
+    """Index directory that belongs to a catalog DB: unified_courses.db -> unified_courses.ann/."""
+    return ANN_DIR if target_db is None else Path(target_db).with_suffix(".ann")
+
+# ---------- Vectors ----------
+
+def project(rows_csr: Tuple[np.ndarray, ...], n_terms: int, dim: int = ANN_DIM, seed: int = 0) -> np.ndarray:
+    """Unit-length random projections of sparse CSR rows, float32 (n, dim); empty rows stay zero."""
+    indptr, indices, data = rows_csr
+    directions = np.random.default_rng(seed).standard_normal((n_terms, dim), dtype=np.float32)
+    n = len(indptr) - 1
+    out = np.zeros((n, dim), dtype=np.float32)
+    step = max(1, _CHUNK // 16)   # ~16 terms * dim floats per course in flight
+    for lo in range(0, n, step):
+        hi = min(n, lo + step)
+        a, b = int(indptr[lo]), int(indptr[hi])
+        if a == b:
+            continue
+        contrib = directions[indices[a:b]] * np.asarray(data[a:b], dtype=np.float32)[:, None]
+        nonempty = np.flatnonzero(np.diff(indptr[lo:hi + 1]))
+        out[lo + nonempty] = np.add.reduceat(contrib, indptr[lo:hi][nonempty] - a, axis=0)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    out /= np.where(norms > 0, norms, 1)
+    return out
+
+# ---------- Forest ----------
+
+def _depth(n: int, leaf_size: int) -> int:
+    return int(np.ceil(np.log2(n / leaf_size))) if n > leaf_size else 0
+
+def _split_starts(starts: np.ndarray, n: int) -> np.ndarray:
+    """Start of every child range when each range [starts[i], starts[i+1] or n) is halved."""
+    sizes = np.diff(np.append(starts, n))
+    return np.stack([starts, starts + sizes // 2], axis=1).ravel()
+
+def _leaf_starts(n: int, depth: int) -> np.ndarray:
+    starts = np.zeros(1, dtype=np.int64)
+    for _ in range(depth):
+        starts = _split_starts(starts, n)
+    return np.append(starts, n)
+
+def _build_tree(vectors: np.ndarray, depth: int, rng: np.random.Generator) -> Tuple[np.ndarray, ...]:
+    """Hyperplanes and offsets of the 2**depth - 1 inner nodes (heap order), and the leaf order of the courses."""
+    n, dim = vectors.shape
+    planes = np.zeros((2 ** depth - 1, dim), dtype=np.float32)
+    offsets = np.zeros(2 ** depth - 1, dtype=np.float32)
+    perm = np.arange(n, dtype=np.int32)
+    starts = np.zeros(1, dtype=np.int64)
+    for level in range(depth):
+        sizes = np.diff(np.append(starts, n))
+        a = starts + rng.integers(0, sizes)
+        b = starts + (a - starts + rng.integers(1, sizes)) % sizes   # a second, different member
+        normals = vectors[perm[a]] - vectors[perm[b]]
+        node = np.repeat(np.arange(len(sizes)), sizes)
+        proj = np.empty(n, dtype=np.float32)
+        for lo in range(0, n, _CHUNK):
+            hi = min(n, lo + _CHUNK)
+            proj[lo:hi] = np.einsum("ij,ij->i", vectors[perm[lo:hi]], normals[node[lo:hi]])
+        order = np.lexsort((proj, node))
+        perm, proj = perm[order], proj[order]
+        mids = starts + sizes // 2
+        first = 2 ** level - 1
+        planes[first:first + len(sizes)] = normals
+        offsets[first:first + len(sizes)] = (proj[mids - 1] + proj[mids]) / 2
+        starts = _split_starts(starts, n)
+    return planes, offsets, perm
+
+def _filter_arrays(values: Dict[str, Sequence[Optional[str]]]) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+    arrays, vocab = {}, {}
+    for field in FILTER_FIELDS:
+        codes: Dict[str, int] = {}
+        keys = ((v or "").strip().lower() for v in values[field])
+        column = np.fromiter((codes.setdefault(key, len(codes)) if key else -1 for key in keys), dtype=np.int32)
+        rows = np.argsort(column, kind="stable").astype(np.int32)
+        counts = np.bincount(column[column >= 0], minlength=len(codes))
+        offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        unknown = int((column < 0).sum())
+        arrays.update({f"{field}_codes": column, f"{field}_rows": rows[unknown:], f"{field}_offsets": offsets})
+        vocab[field] = list(codes)
+    return arrays, vocab
+
+def build_from_vectors(index_dir: Path, course_ids: List[str], vectors: np.ndarray,
+                       values: Dict[str, Sequence[Optional[str]]], trees: int = ANN_TREES,
+                       leaf_size: int = ANN_LEAF_SIZE, seed: int = 0) -> Dict[str, int]:
+    """Index unit-length `vectors` (one per course id) with their filter `values` and save a new generation."""
+    index_dir = Path(index_dir)
+    try:
+        generation = json.loads((current_generation(index_dir) / "meta.json").read_text())["generation"] + 1
+    except FileNotFoundError:
+        generation = 1
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    depth = _depth(len(course_ids), max(leaf_size, 2))
+    rng = np.random.default_rng(seed)
+    forest = [_build_tree(vectors, depth, rng) for _ in range(trees)]
+    arrays, vocab = _filter_arrays(values)
+    arrays.update(vectors=vectors, planes=np.stack([t[0] for t in forest]), offsets=np.stack([t[1] for t in forest]),
+                  perms=np.stack([t[2] for t in forest]))
+    meta = {"generation": generation, "built_at": datetime.utcnow().isoformat(), "dim": vectors.shape[1],
+            "trees": trees, "leaf_size": leaf_size, "depth": depth, "seed": seed}
+    write_generation(index_dir, generation, arrays, {"ids": course_ids, "values": vocab, "meta": meta})
+    return {"courses": len(course_ids), "trees": trees, "depth": depth}
+
+def build(conn: sqlite3.Connection, index_dir: Optional[Path] = None, similar_dir: Optional[Path] = None,
+          dim: int = ANN_DIM, trees: int = ANN_TREES, leaf_size: int = ANN_LEAF_SIZE, seed: int = 0) -> Dict[str, int]:
+    """Refresh the similar-courses index in `similar_dir`, project its vectors and index them in `index_dir`."""
+    started = time.perf_counter()
+    similar_dir = Path(similar_dir or SIMILAR_DIR)
+    refresh_similar(conn, similar_dir)
+    source = SimilarityIndex(similar_dir)
+    vectors = project(source.rows(), len(source.idf), dim, seed)
+    fields = ", ".join(FILTER_FIELDS)
+    by_id = {cid: rest for cid, *rest in conn.execute(f"SELECT course_id, {fields} FROM {LIVE_TABLE}")}
+    rows = [by_id.get(cid, (None,) * len(FILTER_FIELDS)) for cid in source.course_ids]
+    values = {field: [r[i] for r in rows] for i, field in enumerate(FILTER_FIELDS)}
+    stats = build_from_vectors(index_dir or ANN_DIR, source.course_ids, vectors, values, trees, leaf_size, seed)
+    logger.info("ANN index: %d courses, %d trees of depth %d, built in %.1fs", stats["courses"], trees,
+                stats["depth"], time.perf_counter() - started)
+    return stats
+
+# ---------- Search ----------
+
+class AnnIndex:
+    """The live generation of a saved ANN index; arrays are read-only memory maps unless `mmap` is off."""
+
+    def __init__(self, index_dir: Optional[Path] = None, mmap: bool = True):
+        self.path = current_generation(Path(index_dir or ANN_DIR))
+        mode = "r" if mmap else None
+        self.arrays = {name: np.load(self.path / f"{name}.npy", mmap_mode=mode) for name in ARRAYS}
+        self.vectors = self.arrays["vectors"]
+        self.course_ids: List[str] = json.loads((self.path / "ids.json").read_text(encoding="utf-8"))
+        self.meta: Dict = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        values = json.loads((self.path / "values.json").read_text(encoding="utf-8"))
+        self._codes = {field: {v: i for i, v in enumerate(vs)} for field, vs in values.items()}
+        self._row_of = {cid: i for i, cid in enumerate(self.course_ids)}
+        self._depth = self.meta["depth"]
+        self._leaf_starts = _leaf_starts(len(self.course_ids), self._depth)
+        self._perms = self.arrays["perms"].reshape(-1)
+
+    def __len__(self):
+        return len(self.course_ids)
+
+    def vector(self, course_id: str) -> Optional[np.ndarray]:
+        row = self._row_of.get(course_id)
+        return None if row is None else np.asarray(self.vectors[row])
+
+    def _filter_rows(self, filters: Dict[str, str]) -> Optional[np.ndarray]:
+        """Sorted rows matching every filter, None without filters."""
+        rows = None
+        for field, value in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Cannot filter on '{field}' (expected one of {', '.join(FILTER_FIELDS)})")
+            code = self._codes[field].get(value.strip().lower())
+            if code is None:
+                return np.zeros(0, dtype=np.int32)
+            offsets = self.arrays[f"{field}_offsets"]
+            matching = self.arrays[f"{field}_rows"][offsets[code]:offsets[code + 1]]
+            rows = matching if rows is None else np.intersect1d(rows, matching, assume_unique=True)
+        return rows
+
+    def _candidates(self, q: np.ndarray, probes: int) -> np.ndarray:
+        """Courses in the leaves q reaches in every tree, plus the leaves behind its probes - 1 closest splits."""
+        planes, offsets, depth = self.arrays["planes"], self.arrays["offsets"], self._depth
+        if depth == 0:
+            return np.arange(len(self))
+        trees = np.arange(len(planes))
+        node = np.zeros(len(trees), dtype=np.int64)
+        path = np.empty((len(trees), depth), dtype=np.int64)
+        margin = np.empty((len(trees), depth), dtype=np.float32)
+        for level in range(depth):
+            path[:, level] = node
+            margin[:, level] = planes[trees, node] @ q - offsets[trees, node]
+            node = 2 * node + 1 + (margin[:, level] > 0)
+        leaves, owners = [node], [trees]
+        extra = min(probes - 1, depth)
+        if extra > 0:
+            flip = np.argsort(np.abs(margin), axis=1)[:, :extra].ravel()
+            tree = np.repeat(trees, extra)
+            node = 2 * path[tree, flip] + 1 + (margin[tree, flip] <= 0)   # the other side of the split
+            inner = len(offsets[0]) - 1
+            for level in range(1, depth):
+                below = level > flip
+                at = np.minimum(node, inner)
+                step = 2 * node + 1 + (planes[tree, at] @ q - offsets[tree, at] > 0)
+                node = np.where(below, step, node)
+            leaves.append(node)
+            owners.append(tree)
+        leaf = np.concatenate(leaves) - (2 ** depth - 1)
+        tree = np.concatenate(owners)
+        starts = self._leaf_starts[leaf]
+        pos = segments(tree * len(self) + starts, self._leaf_starts[leaf + 1] - starts)
+        return np.unique(self._perms[pos])
+
+    def _top(self, rows: Optional[np.ndarray], q: np.ndarray, k: int,
+             exclude: Optional[int]) -> List[Tuple[str, float]]:
+        scores = self.vectors @ q if rows is None else self.vectors[rows] @ q
+        rows = np.arange(len(self)) if rows is None else rows
+        if exclude is not None:
+            scores = np.where(rows == exclude, -np.inf, scores)
+        k = min(k, len(rows) - (exclude is not None and exclude in rows))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.course_ids[rows[i]], float(scores[i])) for i in top]
+
+    def search(self, vector: np.ndarray, k: int = 10, probes: int = ANN_PROBES, exclude: Optional[str] = None,
+               **filters: str) -> List[Tuple[str, float]]:
+        """Approximate top-k (course_id, cosine) for `vector`, best first, among courses matching `filters`."""
+        q = np.asarray(vector, dtype=np.float32)
+        skip = self._row_of.get(exclude) if exclude else None
+        allowed = self._filter_rows(filters)
+        if allowed is not None and len(allowed) <= ANN_EXACT_BELOW:
+            return self._top(allowed, q, k, skip)
+        while True:
+            rows = self._candidates(q, probes)
+            for field, value in filters.items():
+                rows = rows[self.arrays[f"{field}_codes"][rows] == self._codes[field][value.strip().lower()]]
+            if len(rows) - (skip is not None) >= k or probes > self._depth:
+                return self._top(rows, q, k, skip)
+            probes *= 2
+
+    def exact(self, vector: np.ndarray, k: int = 10, exclude: Optional[str] = None,
+              **filters: str) -> List[Tuple[str, float]]:
+        """Exact top-k by a full scan (the reference for recall)."""
+        skip = self._row_of.get(exclude) if exclude else None
+        return self._top(self._filter_rows(filters), np.asarray(vector, dtype=np.float32), k, skip)
+
+    def similar(self, course_id: str, k: int = 10, probes: int = ANN_PROBES, **filters: str) -> List[Tuple[str, float]]:
+        """Approximate top-k courses most similar to `course_id` ([] for unknown ids)."""
+        vector = self.vector(course_id)
+        return [] if vector is None else self.search(vector, k, probes, exclude=course_id, **filters)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Approximate nearest-neighbor index over course vectors")
+    parser.add_argument("course_id", nargs="?", help="Print the courses most similar to this one")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--build", action="store_true", help="(Re)build the index from the catalog")
+    parser.add_argument("--probes", type=int, default=ANN_PROBES)
+    for field in FILTER_FIELDS:
+        parser.add_argument(f"--{field}")
+    args = parser.parse_args()
+
+    if args.build:
+        conn = open_conn(TARGET_DB)
+        build(conn)
+        conn.close()
+    if args.course_id:
+        filters = {f: getattr(args, f) for f in FILTER_FIELDS if getattr(args, f)}
+        for cid, score in AnnIndex().similar(args.course_id, k=args.k, probes=args.probes, **filters):
+            print(f"{score:.3f}  {cid}")
@@ -0,0 +1,105 @@
+"""
+Recall@10 and latency of the ANN index (ann.py) against exact search.
+
+    python -m unified_catalog.benchmarks.bench_ann --courses 1000000 --trees 4 8 16 --probes 1 2 4 8
+    python -m unified_catalog.benchmarks.bench_ann --index unified_catalog/unified_courses.ann
+
+Without --index, builds one forest per --trees value over synthetic course
+vectors (unit-length, clustered around --clusters topics, with source / level
+/ language values of realistic skew) in a temporary directory. Queries are the
+vectors of random courses (the course itself excluded); recall@10 is the
+overlap with AnnIndex.exact, averaged over --queries. Each probes setting is
+also run with a level filter and with a level + language filter (the latter
+usually small enough for the exact path, see ANN_EXACT_BELOW).
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from ..ann import AnnIndex, build_from_vectors
+
+FILTERS = {"none": {}, "level": {"level": "beginner"}, "level+language": {"level": "advanced", "language": "hindi"}}
+
+def synthetic_catalog(n: int, dim: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for lo in range(0, n, 100_000):
+        hi = min(n, lo + 100_000)
+        noise = rng.standard_normal((hi - lo, dim), dtype=np.float32)
+        chunk = centers[rng.integers(0, clusters, hi - lo)] + 0.6 * noise
+        vectors[lo:hi] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    pick = lambda options, p: [options[i] for i in rng.choice(len(options), n, p=p)]
+    values = {"source": pick(["coursera", "edx", "nptel"], [0.5, 0.3, 0.2]),
+              "level": pick(["beginner", "intermediate", "advanced", None], [0.45, 0.3, 0.15, 0.1]),
+              "language": pick(["english", "spanish", "hindi", "french", "chinese"], [0.7, 0.1, 0.1, 0.05, 0.05])}
+    return [f"c{i:07d}" for i in range(n)], vectors, values
+
+def measure(index: AnnIndex, queries: List[str], probes: List[int], k: int = 10) -> List[Dict]:
+    out = []
+    for name, filters in FILTERS.items():
+        exact, exact_s = {}, []
+        for cid in queries:
+            started = time.perf_counter()
+            exact[cid] = {c for c, _ in index.exact(index.vector(cid), k, exclude=cid, **filters)}
+            exact_s.append(time.perf_counter() - started)
+        for p in probes:
+            hits = total = 0
+            latency = []
+            for cid in queries:
+                started = time.perf_counter()
+                found = index.similar(cid, k, probes=p, **filters)
+                latency.append(time.perf_counter() - started)
+                hits += len({c for c, _ in found} & exact[cid])
+                total += len(exact[cid])
+            row = {"filter": name, "probes": p, "recall": round(hits / max(total, 1), 4),
+                   "ms_mean": round(np.mean(latency) * 1e3, 3), "ms_p95": round(np.percentile(latency, 95) * 1e3, 3),
+                   "exact_ms_mean": round(np.mean(exact_s) * 1e3, 3)}
+            print(f"  {name:15} probes={p:<3} recall@{k}={row['recall']:.3f}  {row['ms_mean']:7.3f} ms "
+                  f"(p95 {row['ms_p95']:7.3f})  exact {row['exact_ms_mean']:7.3f} ms", flush=True)
+            out.append(row)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--index", type=Path, help="Benchmark this saved index instead of synthetic vectors")
+    parser.add_argument("--courses", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--trees", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--leaf-size", type=int, default=64)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    rng = np.random.default_rng(args.seed + 1)
+    if args.index:
+        index = AnnIndex(args.index)
+        queries = [index.course_ids[i] for i in rng.choice(len(index), min(args.queries, len(index)), replace=False)]
+        print(f"{args.index}: {len(index)} courses, {index.meta['trees']} trees", flush=True)
+        results.append({"trees": index.meta["trees"], "rows": measure(index, queries, args.probes)})
+    else:
+        ids, vectors, values = synthetic_catalog(args.courses, args.dim, args.clusters, args.seed)
+        queries = [ids[i] for i in rng.choice(len(ids), args.queries, replace=False)]
+        for trees in args.trees:
+            with tempfile.TemporaryDirectory() as tmp:
+                started = time.perf_counter()
+                build_from_vectors(Path(tmp), ids, vectors, values, trees=trees, leaf_size=args.leaf_size,
+                                   seed=args.seed)
+                build_s = time.perf_counter() - started
+                print(f"{args.courses} courses, dim {args.dim}, {trees} trees: built in {build_s:.1f}s", flush=True)
+                rows = measure(AnnIndex(Path(tmp)), queries, args.probes)
+            results.append({"trees": trees, "build_s": round(build_s, 2), "rows": rows})
+    if args.json:
+        args.json.write_text(json.dumps({"courses": args.courses, "dim": args.dim, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
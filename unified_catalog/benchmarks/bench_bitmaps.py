@@ -0,0 +1,66 @@
+"""
+Boolean filter latency of the bitmap index (bitmaps.py) at catalog scale.
+
+    python -m unified_catalog.benchmarks.bench_bitmaps --courses 1000000
+
+Builds a BitmapIndex straight from synthetic postings (no database): skills
+and tags with Zipf-like popularity, a few levels, subjects and providers.
+The top ten skills land in roughly 3-20% of courses (bitsets), the long tail in
+a few hundred (arrays). Each query is timed best-of --repeat and reported per
+clause, next to the cardinality it returns.
+"""
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+from ..bitmaps import BitmapIndex
+
+QUERIES = [
+    "skill:s0",
+    "skill:s0 AND skill:s1",
+    "skill:s0 AND skill:s3 AND NOT skill:s2 AND level:beginner",
+    "(skill:s0 OR skill:s1 OR skill:s4) AND NOT level:advanced",
+    "skill:s0 AND skill:s500",
+    "skill:s700 OR skill:s900 OR tag:t300",
+    "(skill:s5 OR tag:t1) AND subject:sub3 AND NOT provider:p7",
+    "NOT skill:s0",
+]
+
+def synthetic_index(n: int, seed: int = 0, skills: int = 2000, tags: int = 500) -> BitmapIndex:
+    rng = np.random.default_rng(seed)
+    postings: Dict[str, Dict[str, np.ndarray]] = {"skill": {}, "tag": {}}
+    for field, prefix, count in (("skill", "s", skills), ("tag", "t", tags)):
+        for i in range(count):
+            size = max(1, min(n, int(n * 0.2 / (i + 1))))
+            postings[field][f"{prefix}{i}"] = np.unique(rng.integers(0, n, size, dtype=np.uint32))
+    for field, prefix, count in (("level", "", 3), ("subject", "sub", 20), ("provider", "p", 50)):
+        values = rng.integers(0, count, n)
+        names = ["beginner", "intermediate", "advanced"] if field == "level" else [f"{prefix}{i}" for i in range(count)]
+        postings[field] = {names[v]: np.flatnonzero(values == v).astype(np.uint32) for v in range(count)}
+    return BitmapIndex([f"c{i:07d}" for i in range(n)], postings)
+
+def _clauses(expr: str) -> int:
+    return sum(1 for token in expr.split() if ":" in token)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = synthetic_index(args.courses, seed=args.seed)
+    print(f"{args.courses} courses indexed in {time.perf_counter() - started:.2f}s")
+    for expr in QUERIES:
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            hits = len(index.query(expr))
+            best = min(best, time.perf_counter() - started)
+        print(f"{best * 1e3:7.3f} ms  {best * 1e3 / _clauses(expr):6.3f} ms/clause  {hits:>8}  {expr}")
+
+if __name__ == "__main__":
+    main()
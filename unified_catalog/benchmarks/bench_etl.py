@@ -0,0 +1,125 @@
+"""
+End-to-end ETL benchmark on synthetic sources (see synthetic.py), fully offline.
+
+    python -m unified_catalog.benchmarks.bench_etl --sizes 10000 100000 --json bench.json
+    python -m unified_catalog.benchmarks.bench_etl --sizes 10000 --baseline bench.json
+
+For each size, every source gets that many courses and etl.run loads them into
+a fresh target ("cold"), then loads the same data again ("rerun", every record
+unchanged). Per-source stage timings come from the ETL's own run report. With
+--baseline, each source/stage is compared against an earlier result file.
+"""
+import argparse
+import json
+import logging
+import platform
+import sqlite3
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .. import etl
+from ..logging_config import logger
+from .synthetic import BUILDERS
+
+SCENARIOS = ("cold", "rerun")
+
+def _version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=10).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+def _sources(data_dir: Path, n: int, seed: int) -> Dict[str, str]:
+    """Synthetic source DBs, reused from `data_dir` when already built."""
+    paths = {}
+    for src, build in BUILDERS.items():
+        path = data_dir / f"{src}-{n}-{seed}.db"
+        if not path.exists():
+            print(f"building {path.name} ...", flush=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.unlink(missing_ok=True)
+            build(tmp, n, seed=seed)
+            tmp.replace(path)
+        paths[src] = str(path)
+    return paths
+
+def run_benchmark(sizes: List[int], data_dir: Path, workers: int = 1, batch_size: Optional[int] = None,
+                  seed: int = 0) -> Dict:
+    runs = []
+    for n in sizes:
+        paths = _sources(data_dir, n, seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            target, report_path = Path(tmp) / "unified.db", Path(tmp) / "report.json"
+            for scenario in SCENARIOS:
+                etl.run(list(paths), batch_size=batch_size, workers=workers, target_db=target,
+                        source_paths=paths, report_path=report_path)
+                report = json.loads(report_path.read_text())
+                runs.append({"courses": n, "scenario": scenario, "wall_s": report["wall_s"],
+                             "peak_rss_mb": report["peak_rss_mb"], "writer": report.get("writer"),
+                             "sources": report["sources"]})
+                print(f"{n:>9} {scenario:6} {report['wall_s']:>8.2f}s  "
+                      + "  ".join(f"{src}={s['records_per_sec']:.0f}/s" for src, s in report["sources"].items()),
+                      flush=True)
+    return {
+        "version": _version(),
+        "recorded_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "workers": workers,
+        "batch_size": batch_size,
+        "seed": seed,
+        "runs": runs,
+    }
+
+def compare(result: Dict, baseline: Dict):
+    """Print per source/stage wall time against a baseline result (positive % = slower)."""
+    base = {(r["courses"], r["scenario"]): r for r in baseline.get("runs", [])}
+    print(f"\nvs baseline {baseline.get('version')} ({baseline.get('recorded_at')}):")
+    for key in ("workers", "batch_size", "seed"):
+        if baseline.get(key) != result.get(key):
+            print(f"  note: {key} differs ({baseline.get(key)} -> {result.get(key)})")
+    for run in result["runs"]:
+        old = base.get((run["courses"], run["scenario"]))
+        if not old:
+            continue
+        for src, stats in run["sources"].items():
+            prev = old["sources"].get(src)
+            if not prev:
+                continue
+            cells = []
+            for stage, st in stats["stages"].items():
+                was = prev["stages"].get(stage, {}).get("wall_s")
+                if was:
+                    cells.append(f"{stage} {(st['wall_s'] - was) / was:+.0%}")
+            print(f"{run['courses']:>9} {run['scenario']:6} {src:9} " + "  ".join(cells))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000], help="Courses per source")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=None, help="Fixed batch size (default: adaptive)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, help="Keep generated source DBs here between runs")
+    parser.add_argument("--json", type=Path, help="Write results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="Earlier --json result to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep per-batch ETL logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        result = run_benchmark(args.sizes, data_dir, workers=args.workers, batch_size=args.batch_size,
+                               seed=args.seed)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        compare(result, json.loads(args.baseline.read_text()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Peak Python memory of extract_edx / extract_nptel: preload vs streaming merge-join.
+
+    python -m unified_catalog.benchmarks.bench_extract_memory --sizes 2000 8000 32000
+
+Builds synthetic source DBs (see synthetic.py) in a temp dir, drains each extractor without
+keeping records and reports the tracemalloc peak. SQLite's own page cache
+and sorter are not Python allocations and are bounded by its cache settings.
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ..extractors import extract_edx, extract_nptel
+from .synthetic import build_edx, build_nptel
+
+def measure(extractor, path: Path, streaming: bool) -> dict:
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = 0
+    for _ in extractor(conn, streaming=streaming):
+        n += 1
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    conn.close()
+    return {"records": n, "peak_mb": round(peak / 2**20, 2), "seconds": round(elapsed, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[2000, 8000, 32000], help="Courses per source DB")
+    parser.add_argument("--fanout", type=int, default=20, help="Skill/tag rows (edX) or lessons (NPTEL) per course")
+    parser.add_argument("--json", type=Path, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            for name, build, extractor in [("edx", build_edx, extract_edx), ("nptel", build_nptel, extract_nptel)]:
+                path = Path(tmp) / f"{name}-{n}.db"
+                build(path, n, fanout=args.fanout)
+                for streaming in (False, True):
+                    row = {"source": name, "courses": n, "mode": "streaming" if streaming else "preload"}
+                    row.update(measure(extractor, path, streaming))
+                    results.append(row)
+                    print(f"{name:6} {n:>9} {row['mode']:10} peak={row['peak_mb']:>8.2f} MB  {row['seconds']:>7.3f}s")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Per-record packing cost of loader.bulk_upsert (JSON columns, content hash, source_map payload).
+
+    python -m unified_catalog.benchmarks.bench_pack --courses 20000 --json pack.json
+    python -m unified_catalog.benchmarks.bench_pack --courses 20000 --baseline pack.json [--backend json]
+
+Normalized records come from the real extractors over synthetic sources (see
+synthetic.py). Each source is upserted into a fresh target ("cold": every
+record is packed and gets a compressed source_map version) and then again
+("rerun": packed and hashed, nothing written). Reports the `pack` stage of
+bulk_upsert's StageTimer in microseconds per record, best of --repeat.
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from .. import loader
+from ..extractors import extract_coursera, extract_edx, extract_nptel
+from ..logging_config import logger
+from ..metrics import StageTimer
+from .synthetic import BUILDERS
+
+EXTRACTORS = {"coursera": extract_coursera, "edx": extract_edx, "nptel": extract_nptel}
+SCENARIOS = ("cold", "rerun")
+
+def _records(data_dir: Path, src: str, n: int, seed: int) -> List[Dict]:
+    path = data_dir / f"{src}-{n}-{seed}.db"
+    if not path.exists():
+        BUILDERS[src](path, n, seed=seed)
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    records = list(EXTRACTORS[src](conn))
+    conn.close()
+    return records
+
+def _pack_us(records: List[Dict], target: Path, batch_size: int) -> Dict[str, float]:
+    """Per-record pack time of a cold load and an unchanged rerun into `target`."""
+    out = {}
+    conn = sqlite3.connect(str(target))
+    loader.ensure_schema(conn)
+    for scenario in SCENARIOS:
+        timer = StageTimer()
+        loader.bulk_upsert(conn, records, batch_size=batch_size, timer=timer)
+        out[scenario] = timer.stages["pack"]["wall_s"] / len(records) * 1e6
+    conn.close()
+    return out
+
+def run_benchmark(n: int, data_dir: Path, batch_size: int = 500, repeat: int = 3, seed: int = 0) -> Dict:
+    results = {}
+    for src in BUILDERS:
+        records = _records(data_dir, src, n, seed)
+        best = {s: float("inf") for s in SCENARIOS}
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                for scenario, us in _pack_us(records, Path(tmp) / "u.db", batch_size).items():
+                    best[scenario] = min(best[scenario], us)
+        results[src] = {s: round(us, 2) for s, us in best.items()}
+        print(f"{src:9} {len(records):>8} records  "
+              + "  ".join(f"{s}={us:7.2f} us/record" for s, us in results[src].items()), flush=True)
+    # Trees from before the pluggable backend always packed with the stdlib encoder
+    return {"courses": n, "batch_size": batch_size, "json_backend": getattr(loader, "JSON_BACKEND_NAME", "json"),
+            "pack_us_per_record": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20000, help="Courses per source")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=["auto", "orjson", "json"], default="auto",
+                        help="JSON encoder to pack with (see config.JSON_BACKEND)")
+    parser.add_argument("--data-dir", type=Path, help="Keep generated source DBs here between runs")
+    parser.add_argument("--json", type=Path, help="Write results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="Earlier --json result to compare against")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    if args.backend != "auto":
+        loader.JSON_BACKEND_NAME = loader.resolve_json_backend(args.backend)
+        loader.json_dumps = loader._json_dumps_orjson if args.backend == "orjson" else loader._json_dumps_stdlib
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        result = run_benchmark(args.courses, data_dir, batch_size=args.batch_size, repeat=args.repeat,
+                               seed=args.seed)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        base = json.loads(args.baseline.read_text())
+        print(f"\nvs baseline ({base.get('json_backend')} -> {result['json_backend']}):")
+        for src, now in result["pack_us_per_record"].items():
+            was = base["pack_us_per_record"].get(src, {})
+            print(f"{src:9} " + "  ".join(f"{s} {was[s]:.2f} -> {us:.2f} us ({(us - was[s]) / was[s]:+.0%})"
+                                          for s, us in now.items() if was.get(s)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Batch scoring time of the quiz-weakness recommender (quiz_recs.py).
+
+    python -m unified_catalog.benchmarks.bench_quiz_recs --users 100000 --labels 50 --courses 200000
+
+Builds, in a temporary directory, a quiz-app DB (questions in --labels label
+families, --answers answered questions per user, each user with its own
+chance of answering each family right) and a catalog holding just the skill /
+tag side tables (every course linked to 1-5 of a few thousand skills, skewed
+towards popular ones), with a lookup table mapping every family to three
+skills and a tag. Then times each stage of recommend() for every user, and
+storing the result in quiz_recommendations.
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ..loader import ensure_schema
+from ..quiz_recs import label_coverage, load_label_map, recommend, score_users, store_recommendations, weaknesses
+
+QUIZ_SCHEMA = """
+CREATE TABLE questions (id INTEGER PRIMARY KEY, quiz_id INTEGER, label_id TEXT);
+CREATE TABLE results (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, quiz_id INTEGER NOT NULL);
+CREATE TABLE result_per_question (id INTEGER PRIMARY KEY, result_id INTEGER NOT NULL, question_id INTEGER NOT NULL,
+                                  points INTEGER DEFAULT 0);
+"""
+
+def _family(i: int) -> str:
+    """Letters-only family name (label ids are the name + a question number)."""
+    return "".join(chr(65 + (i // 26 ** p) % 26) for p in range(3))
+
+def build_quiz_db(path: Path, users: int, labels: int, answers: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(str(path))
+    conn.executescript(QUIZ_SCHEMA)
+    per_label = 20
+    conn.executemany("INSERT INTO questions (id, quiz_id, label_id) VALUES (?, ?, ?)",
+                     [(l * per_label + q + 1, l + 1, f"{_family(l)}{q + 1:03d}")
+                      for l in range(labels) for q in range(per_label)])
+    attempt = 10   # questions per result
+    n_results = users * answers // attempt
+    result_user = np.repeat(np.arange(1, users + 1), answers // attempt)
+    conn.executemany("INSERT INTO results (id, user_id, quiz_id) VALUES (?, ?, 1)",
+                     zip(range(1, n_results + 1), result_user.tolist()))
+    ability = rng.beta(4, 2, size=(users, labels))   # chance of a right answer, per user and family
+    result_id = np.repeat(np.arange(1, n_results + 1), attempt)
+    question = rng.integers(0, labels * per_label, n_results * attempt)
+    right = rng.random(len(question)) < ability[result_user[result_id - 1] - 1, question // per_label]
+    conn.executemany("INSERT INTO result_per_question (result_id, question_id, points) VALUES (?, ?, ?)",
+                     zip(result_id.tolist(), (question + 1).tolist(), right.astype(int).tolist()))
+    conn.commit()
+    return conn
+
+def build_catalog(path: Path, courses: int, labels: int, seed: int = 0):
+    """Side tables only; returns the connection and a lookup table over its skills and tags."""
+    rng = np.random.default_rng(seed + 1)
+    conn = sqlite3.connect(str(path))
+    ensure_schema(conn)
+    n_skills, n_tags = 4000, 1000
+    conn.executemany("INSERT INTO skills (skill_id, name) VALUES (?, ?)", ((i, f"Skill {i}") for i in range(n_skills)))
+    conn.executemany("INSERT INTO tags (tag_id, name) VALUES (?, ?)", ((i, f"tag {i}") for i in range(n_tags)))
+    popular = 1 / np.arange(1, n_skills + 1) ** 0.8
+    skill_links = {(c, int(s)) for c in range(courses)
+                   for s in rng.choice(n_skills, rng.integers(1, 6), p=popular / popular.sum())}
+    tag_links = {(c, int(t)) for c in range(courses) for t in rng.integers(0, n_tags, 2)}
+    conn.executemany("INSERT INTO course_skills (course_id, skill_id) VALUES (?, ?)",
+                     ((f"c{c:07d}", s) for c, s in sorted(skill_links)))
+    conn.executemany("INSERT INTO course_tags (course_id, tag_id) VALUES (?, ?)",
+                     ((f"c{c:07d}", t) for c, t in sorted(tag_links)))
+    conn.commit()
+    label_map = {_family(l): {"skills": [f"skill {s}" for s in rng.choice(n_skills // 4, 3, replace=False)],
+                              "tags": [f"TAG {rng.integers(0, n_tags)}"]} for l in range(labels)}
+    return conn, label_map
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--labels", type=int, default=50)
+    parser.add_argument("--answers", type=int, default=30, help="Answered questions per user")
+    parser.add_argument("--courses", type=int, default=200_000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        quiz = build_quiz_db(Path(tmp) / "quiz.db", args.users, args.labels, args.answers, args.seed)
+        conn, label_map = build_catalog(Path(tmp) / "u.db", args.courses, args.labels, args.seed)
+        print(f"built {args.users} users x {args.answers} answers, {args.courses} courses "
+              f"in {time.perf_counter() - started:.1f}s", flush=True)
+        (Path(tmp) / "labels.json").write_text(json.dumps(label_map))
+        label_map = load_label_map(Path(tmp) / "labels.json")
+        labels = sorted(label_map)
+
+        timings = {}
+        started = time.perf_counter()
+        weak = weaknesses(quiz, labels, label_map)
+        timings["weaknesses_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        course_ids, cover = label_coverage(conn, labels, label_map)
+        timings["coverage_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        scored = sum(len(users) for users, _, _ in score_users(weak, cover, args.k))
+        timings["scoring_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        recs = recommend(conn, quiz, k=args.k, label_map=label_map)
+        timings["recommend_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        store_recommendations(conn, recs)
+        timings["store_s"] = time.perf_counter() - started
+
+    result = {"users": args.users, "labels": args.labels, "answers": args.answers, "courses": args.courses,
+              "users_scored": scored, "weak_pairs": int(len(weak[0])), "candidate_courses": len(course_ids),
+              **{k: round(v, 3) for k, v in timings.items()}}
+    for key, value in result.items():
+        print(f"  {key:18} {value}")
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
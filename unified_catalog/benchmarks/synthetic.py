@@ -0,0 +1,219 @@
+"""
+Synthetic Coursera / edX / NPTEL source DBs for benchmarks, built offline.
+
+    python -m unified_catalog.benchmarks.synthetic --courses 100000 --out /tmp/sources
+
+Schemas mirror the scrapers in course-scraper/ (including edX's UNIQUE child
+constraints), and values look like what they scrape: mixed-case levels,
+free-text durations, JSON lists, professor strings vs JSON arrays, missing
+fields, and some course titles shared across platforms. Output is
+deterministic for a given seed and size.
+"""
+import argparse
+import json
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator
+
+TOPICS = [
+    "machine learning", "data science", "python programming", "web development", "cloud computing",
+    "cyber security", "digital marketing", "financial accounting", "organic chemistry", "linear algebra",
+    "thermodynamics", "signal processing", "project management", "public health", "climate science",
+    "operating systems", "compiler design", "microeconomics", "human anatomy", "graphic design",
+    "deep learning", "blockchain", "supply chain", "quantum computing", "robotics",
+]
+TITLE_PREFIXES = ["Introduction to", "Foundations of", "Advanced", "Applied", "Principles of",
+                  "Hands-on", "A Practical Guide to", "Fundamentals of", ""]
+TITLE_SUFFIXES = ["", "", "for Beginners", "with Python", "in Practice", "I", "II", "Specialization"]
+SKILLS = [
+    "Python", "SQL", "Statistics", "Machine Learning", "Data Analysis", "JavaScript", "React", "AWS",
+    "Linux", "Excel", "Communication", "Leadership", "Calculus", "Probability", "TensorFlow", "R",
+    "Git", "Docker", "Networking", "Cryptography", "Accounting", "Marketing", "Chemistry", "Biology",
+]
+PARTNERS = ["Stanford University", "Google", "IBM", "University of Michigan", "DeepLearning.AI",
+            "Duke University", "Meta", "Johns Hopkins University", "Imperial College London"]
+EDX_OWNERS = ["MITx", "HarvardX", "BerkeleyX", "DelftX", "IBM", "UQx", "GTx", "LinuxFoundationX"]
+INSTITUTES = ["IIT Madras", "IIT Bombay", "IIT Kharagpur", "IIT Delhi", "IISc Bangalore", "IIT Kanpur"]
+DIFFICULTIES = ["Beginner", "INTERMEDIATE", "Advanced", "Mixed", "beginner level", None]
+EDX_LEVELS = ["Introductory", "Intermediate", "Advanced", None]
+DURATIONS = ["1 - 4 Weeks", "1 - 3 Months", "3 - 6 Months", "Less Than 2 Hours", "4 weeks", "approx. 10 hours", None]
+WORDS = ("learn understand apply build analyze design model evaluate concepts methods tools systems "
+         "problems projects theory practice data algorithms networks structures processes").split()
+
+_BASE_TIME = datetime(2025, 1, 1)
+
+def _title(rng: random.Random, i: int, shared_every: int) -> str:
+    # Every `shared_every`-th course gets a title that other sources reuse (cross-source duplicates)
+    if shared_every and i % shared_every == 0:
+        topic = TOPICS[(i // shared_every) % len(TOPICS)]
+        return f"Introduction to {topic.title()} {i // shared_every % 97}"
+    parts = [rng.choice(TITLE_PREFIXES), rng.choice(TOPICS).title(), rng.choice(TITLE_SUFFIXES)]
+    return " ".join(p for p in parts if p) + f" {i}"
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+def _stamp(rng: random.Random) -> str:
+    return (_BASE_TIME + timedelta(minutes=rng.randrange(60 * 24 * 365))).isoformat()
+
+def build_coursera(path: Path, n_courses: int, seed: int = 0, shared_every: int = 50):
+    rng = random.Random(f"coursera-{seed}")
+    conn = sqlite3.connect(str(path))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coursera_courses (
+            id TEXT PRIMARY KEY, name TEXT, url TEXT, product_type TEXT, partners_json TEXT,
+            skills_json TEXT, rating REAL, num_ratings INTEGER, difficulty TEXT, duration TEXT,
+            tagline TEXT, fetched_at TEXT
+        )
+    """)
+
+    def rows() -> Iterator[tuple]:
+        for i in range(n_courses):
+            cid = f"crs-{i:08x}"
+            yield (
+                cid, _title(rng, i, shared_every), f"https://www.coursera.org/learn/{cid}",
+                rng.choice(["COURSE", "SPECIALIZATION", "PROFESSIONAL CERTIFICATE"]),
+                json.dumps(rng.sample(PARTNERS, rng.randint(1, 2))),
+                json.dumps(rng.sample(SKILLS, rng.randint(0, 8))) if rng.random() > 0.05 else None,
+                round(rng.uniform(3.5, 5.0), 1) if rng.random() > 0.1 else None,
+                rng.randint(0, 200000),
+                rng.choice(DIFFICULTIES), rng.choice(DURATIONS), _text(rng, rng.randint(8, 30)), _stamp(rng),
+            )
+
+    conn.executemany("INSERT INTO coursera_courses VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows())
+    conn.commit()
+    conn.close()
+
+def build_edx(path: Path, n_courses: int, seed: int = 0, shared_every: int = 50, fanout: int = 6):
+    """edX courses plus skills/tags (about `fanout` rows each per course), staff and owners."""
+    rng = random.Random(f"edx-{seed}")
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS courses (
+            id TEXT PRIMARY KEY, title TEXT, description TEXT, subject TEXT, level TEXT, language TEXT,
+            weeks_to_complete INTEGER, availability TEXT, marketing_url TEXT, card_image_url TEXT
+        );
+        CREATE TABLE IF NOT EXISTS skills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, course_id TEXT, skill TEXT, category TEXT, subcategory TEXT,
+            UNIQUE(course_id, skill, category, subcategory) ON CONFLICT IGNORE
+        );
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, course_id TEXT, tag TEXT,
+            UNIQUE(course_id, tag) ON CONFLICT IGNORE
+        );
+        CREATE TABLE IF NOT EXISTS staff (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, course_id TEXT, staff_key TEXT,
+            UNIQUE(course_id, staff_key) ON CONFLICT IGNORE
+        );
+        CREATE TABLE IF NOT EXISTS owners (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, course_id TEXT, name TEXT,
+            UNIQUE(course_id, name) ON CONFLICT IGNORE
+        );
+    """)
+    courses, skills, tags, staff, owners = [], [], [], [], []
+
+    def flush():
+        conn.executemany("INSERT INTO courses VALUES (?,?,?,?,?,?,?,?,?,?)", courses)
+        conn.executemany("INSERT INTO skills (course_id, skill, category, subcategory) VALUES (?,?,?,?)", skills)
+        conn.executemany("INSERT INTO tags (course_id, tag) VALUES (?,?)", tags)
+        conn.executemany("INSERT INTO staff (course_id, staff_key) VALUES (?,?)", staff)
+        conn.executemany("INSERT INTO owners (course_id, name) VALUES (?,?)", owners)
+        for buf in (courses, skills, tags, staff, owners):
+            buf.clear()
+
+    for i in range(n_courses):
+        cid = f"course-v1:{rng.choice(EDX_OWNERS)}+X{i:07d}+2025"
+        topic = rng.choice(TOPICS)
+        courses.append((
+            cid, _title(rng, i, shared_every), _text(rng, rng.randint(30, 120)), topic.title(),
+            rng.choice(EDX_LEVELS), rng.choice(["English", "English", "English", "Spanish", "French"]),
+            rng.choice([None, 4, 6, 8, 10, 12]), rng.choice(["Current", "Upcoming", "Archived"]),
+            f"https://www.edx.org/learn/{cid}", f"https://prod-discovery.edx-cdn.org/{i}.jpg" if i % 3 else None,
+        ))
+        for skill in rng.sample(SKILLS, rng.randint(0, min(fanout, len(SKILLS)))):
+            skills.append((cid, skill, "Technology", topic.title()))
+        for tag in rng.sample(TOPICS, rng.randint(0, min(fanout, len(TOPICS)))):
+            tags.append((cid, tag))
+        for j in range(rng.randint(0, 3)):
+            staff.append((cid, f"staff-{rng.randrange(20000)}"))
+        owners.append((cid, rng.choice(EDX_OWNERS)))
+        if len(courses) >= 5000:
+            flush()
+    flush()
+    conn.commit()
+    conn.close()
+
+def build_nptel(path: Path, n_courses: int, seed: int = 0, shared_every: int = 50, fanout: int = 8):
+    """NPTEL courses with about `fanout` course_metadata lessons each."""
+    rng = random.Random(f"nptel-{seed}")
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS courses (
+            course_id TEXT PRIMARY KEY, title TEXT, institute TEXT, professor TEXT, content_type TEXT,
+            discipline_id TEXT, current_run INTEGER, self_paced INTEGER, url TEXT,
+            scraped INTEGER DEFAULT 0, last_updated TEXT
+        );
+        CREATE TABLE IF NOT EXISTS course_metadata (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, course_id TEXT, lesson_number INTEGER, lesson_title TEXT,
+            concepts_json TEXT, raw_concepts_text TEXT, fetched_at TEXT
+        );
+    """)
+    courses, lessons = [], []
+
+    def flush():
+        conn.executemany("INSERT INTO courses VALUES (?,?,?,?,?,?,?,?,?,?,?)", courses)
+        conn.executemany(
+            "INSERT INTO course_metadata (course_id, lesson_number, lesson_title, concepts_json, "
+            "raw_concepts_text, fetched_at) VALUES (?,?,?,?,?,?)", lessons,
+        )
+        courses.clear()
+        lessons.clear()
+
+    for i in range(n_courses):
+        cid = f"{106 + i % 3}{i:07d}"
+        prof = f"Prof. {rng.choice('ABCDEFGHJKLMNPRS')}. {rng.choice(['Rao', 'Iyer', 'Gupta', 'Sen', 'Das'])}"
+        professor = json.dumps([prof, "Prof. Co-Instructor"]) if rng.random() < 0.3 else prof
+        courses.append((
+            cid, _title(rng, i, shared_every), rng.choice(INSTITUTES), professor,
+            rng.choice(["Video", "Web"]), str(rng.randint(101, 130)), rng.randint(0, 1), rng.randint(0, 1),
+            f"https://nptel.ac.in/courses/{cid}", 1, _stamp(rng),
+        ))
+        for j in range(rng.randint(0, fanout)):
+            concepts = rng.sample(TOPICS, 2) + [f"concept {rng.randrange(3000)}"]
+            lessons.append((
+                cid, j + 1, f"Lecture {j + 1}", json.dumps(concepts) if rng.random() > 0.2 else None,
+                "; ".join(rng.sample(WORDS, 3)) if rng.random() < 0.5 else None, _stamp(rng),
+            ))
+        if len(courses) >= 5000:
+            flush()
+    flush()
+    conn.commit()
+    conn.close()
+
+BUILDERS = {"coursera": build_coursera, "edx": build_edx, "nptel": build_nptel}
+
+def build_sources(out_dir: Path, n_courses: int, seed: int = 0, sources=tuple(BUILDERS)) -> Dict[str, Path]:
+    """Build one DB per source with `n_courses` courses each; returns {source: path}."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for src in sources:
+        path = out_dir / f"{src}-{n_courses}-{seed}.db"
+        if path.exists():
+            path.unlink()
+        BUILDERS[src](path, n_courses, seed=seed)
+        paths[src] = path
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build synthetic Coursera/edX/NPTEL source DBs")
+    parser.add_argument("--courses", type=int, default=10000, help="Courses per source")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, required=True, help="Output directory")
+    parser.add_argument("--sources", nargs="*", default=list(BUILDERS))
+    args = parser.parse_args()
+
+    for src, path in build_sources(args.out, args.courses, seed=args.seed, sources=args.sources).items():
+        print(f"{src:9} {path}")
@@ -0,0 +1,302 @@
+"""
+In-memory inverted bitmap index over the unified catalog.
+
+Courses get dense ordinals (course_id order), and every skill, tag, subject,
+level, provider and source value maps to the set of ordinals that carry it.
+Sets are compressed the way roaring containers are: a sorted uint32 array
+while they hold fewer than n/32 courses, a bitset of uint64 words beyond
+that. Boolean operations pick the cheap path per pair of representations
+(array AND bitset probes one bit per array element, bitset AND bitset is a
+word-wise AND), so a clause costs O(smaller set) or O(n/64) words.
+
+    index = BitmapIndex.build(conn)
+    hits = index.query('skill:python AND skill:statistics AND NOT skill:r AND level:beginner')
+    len(hits)                       # cardinality
+    index.course_ids_of(hits, limit=20)
+
+Queries combine `field:value` terms (values quoted when they contain spaces:
+skill:"machine learning") with AND, OR, NOT and parentheses; adjacent terms
+are ANDed. Values match case-insensitively. Bitmaps can also be combined
+directly: index.get("skill", "python") & ~index.get("skill", "r").
+
+An index is a snapshot of one catalog version (loader.catalog_version);
+CatalogReader.bitmaps() rebuilds it after the ETL changes the catalog.
+"""
+import re
+import sqlite3
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .loader import LIVE_TABLE, SIDE_TABLES, catalog_version
+
+# Query field -> unified_courses column, or the side table holding the values
+COLUMN_FIELDS = {"subject": "subject", "level": "level", "provider": "provider", "source": "source"}
+SIDE_FIELDS = {"skill": "skills", "tag": "tags"}
+FIELDS = tuple(SIDE_FIELDS) + tuple(COLUMN_FIELDS)
+
+_ARRAY_MAX_FRACTION = 32   # arrays hold fewer than n/32 ordinals (32 bits each vs 1 bit per course)
+
+# ---------- Bitmaps ----------
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words: np.ndarray) -> int:
+        return int(np.bitwise_count(words).sum())
+else:   # numpy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> int:
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+def _bit_values(ords: np.ndarray) -> np.ndarray:
+    return np.left_shift(np.uint64(1), (ords & 63).astype(np.uint64))
+
+def _word_masks(ords: np.ndarray):
+    """Word indexes touched by sorted `ords` and the OR of their bits within each word."""
+    idx = (ords >> 6).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, idx[1:] != idx[:-1]]) if len(idx) else np.zeros(0, dtype=np.int64)
+    return idx[starts], np.bitwise_or.reduceat(_bit_values(ords), starts) if len(idx) else np.zeros(0, np.uint64)
+
+def _test_bits(words: np.ndarray, ords: np.ndarray) -> np.ndarray:
+    return (words[ords >> 6] & _bit_values(ords)) != 0
+
+class Bitmap:
+    """
+    A set of course ordinals in [0, n): `ords` (sorted uint32) or `words`
+    (uint64 bitset), never both. Operators build new bitmaps: & | - ~ and len().
+    """
+    __slots__ = ("n", "ords", "words")
+
+    def __init__(self, n: int, ords: Optional[np.ndarray] = None, words: Optional[np.ndarray] = None):
+        self.n = n
+        self.ords = ords
+        self.words = words
+
+    @classmethod
+    def from_ordinals(cls, n: int, ords: np.ndarray) -> "Bitmap":
+        """Bitmap of sorted, unique ordinals in the smaller representation."""
+        ords = np.asarray(ords, dtype=np.uint32)
+        if len(ords) * _ARRAY_MAX_FRACTION < n:
+            return cls(n, ords=ords)
+        words = np.zeros((n + 63) // 64, dtype=np.uint64)
+        idx, masks = _word_masks(ords)
+        words[idx] = masks
+        return cls(n, words=words)
+
+    def _dense(self) -> np.ndarray:
+        if self.words is not None:
+            return self.words
+        words = np.zeros((self.n + 63) // 64, dtype=np.uint64)
+        idx, masks = _word_masks(self.ords)
+        words[idx] = masks
+        return words
+
+    def ordinals(self) -> np.ndarray:
+        """Sorted member ordinals."""
+        if self.ords is not None:
+            return self.ords
+        bits = np.unpackbits(self.words.astype("<u8").view(np.uint8), bitorder="little")
+        return np.flatnonzero(bits).astype(np.uint32)
+
+    def __len__(self) -> int:
+        return len(self.ords) if self.ords is not None else _popcount(self.words)
+
+    def __contains__(self, ordinal: int) -> bool:
+        if self.ords is not None:
+            i = np.searchsorted(self.ords, ordinal)
+            return bool(i < len(self.ords) and self.ords[i] == ordinal)
+        return bool(self.words[ordinal >> 6] >> np.uint64(ordinal & 63) & np.uint64(1))
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        a, b = (self, other) if self.ords is not None or other.ords is None else (other, self)
+        if a.ords is None:
+            return Bitmap(self.n, words=a.words & b.words)
+        if b.ords is not None:
+            return Bitmap(self.n, ords=np.intersect1d(a.ords, b.ords, assume_unique=True))
+        return Bitmap(self.n, ords=a.ords[_test_bits(b.words, a.ords)])
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        if self.ords is not None and other.ords is not None:
+            return Bitmap.from_ordinals(self.n, np.union1d(self.ords, other.ords))
+        a, b = (self, other) if self.words is not None else (other, self)
+        if b.words is not None:
+            return Bitmap(self.n, words=a.words | b.words)
+        words = a.words.copy()
+        idx, masks = _word_masks(b.ords)
+        words[idx] |= masks
+        return Bitmap(self.n, words=words)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        """AND NOT."""
+        if self.ords is not None:
+            if other.ords is not None:
+                return Bitmap(self.n, ords=np.setdiff1d(self.ords, other.ords, assume_unique=True))
+            return Bitmap(self.n, ords=self.ords[~_test_bits(other.words, self.ords)])
+        if other.words is not None:
+            return Bitmap(self.n, words=self.words & ~other.words)
+        words = self.words.copy()
+        idx, masks = _word_masks(other.ords)
+        words[idx] &= ~masks
+        return Bitmap(self.n, words=words)
+
+    def __invert__(self) -> "Bitmap":
+        return Bitmap.universe(self.n) - self
+
+    @classmethod
+    def universe(cls, n: int) -> "Bitmap":
+        words = np.full((n + 63) // 64, np.iinfo(np.uint64).max, dtype=np.uint64)
+        if n % 64:
+            words[-1] = (np.uint64(1) << np.uint64(n % 64)) - np.uint64(1)
+        return cls(n, words=words)
+
+    def __repr__(self):
+        kind = "array" if self.ords is not None else "bitset"
+        return f"Bitmap({len(self)} of {self.n}, {kind})"
+
+# ---------- Index ----------
+
+def _key(value) -> str:
+    return str(value).strip().lower()
+
+class BitmapIndex:
+    """Field -> value -> Bitmap over the courses of one catalog snapshot."""
+
+    def __init__(self, course_ids: Sequence[str], postings: Dict[str, Dict[str, np.ndarray]], version: int = 0):
+        """`postings`: field -> lower-cased value -> sorted course ordinals."""
+        self.course_ids = list(course_ids)
+        self.n = len(self.course_ids)
+        self.version = version
+        self.bitmaps: Dict[str, Dict[str, Bitmap]] = {
+            field: {value: Bitmap.from_ordinals(self.n, ords) for value, ords in values.items()}
+            for field, values in postings.items()
+        }
+        self._empty = Bitmap(self.n, ords=np.zeros(0, dtype=np.uint32))
+
+    @classmethod
+    def build(cls, conn: sqlite3.Connection) -> "BitmapIndex":
+        """Index unified_courses and its skill/tag side tables, read in one snapshot."""
+        own_txn = not conn.in_transaction
+        if own_txn:
+            conn.execute("BEGIN")
+        try:
+            version = catalog_version(conn)
+            cols = ", ".join(COLUMN_FIELDS.values())
+            course_ids, postings = [], {field: defaultdict(list) for field in FIELDS}
+            for ordinal, (cid, *values) in enumerate(conn.execute(
+                f"SELECT course_id, {cols} FROM {LIVE_TABLE} ORDER BY course_id"
+            )):
+                course_ids.append(cid)
+                for field, value in zip(COLUMN_FIELDS, values):
+                    if value is not None and str(value).strip():
+                        postings[field][_key(value)].append(ordinal)
+            ordinal_of = {cid: i for i, cid in enumerate(course_ids)}
+            for field, table in SIDE_FIELDS.items():
+                _, values_table, id_col, links, _ = next(t for t in SIDE_TABLES if t[1] == table)
+                names = {vid: _key(name) for vid, name in conn.execute(f"SELECT {id_col}, name FROM {values_table}")}
+                # Links come in course_id order, so every value's ordinals arrive sorted
+                for cid, vid in conn.execute(f"SELECT course_id, {id_col} FROM {links} ORDER BY course_id"):
+                    postings[field][names[vid]].append(ordinal_of[cid])
+        finally:
+            if own_txn:
+                conn.rollback()
+        return cls(course_ids, {f: {v: np.unique(np.array(o, dtype=np.uint32)) for v, o in values.items()}
+                                for f, values in postings.items()}, version)
+
+    def get(self, field: str, value: str) -> Bitmap:
+        if field not in self.bitmaps:
+            raise ValueError(f"Unknown bitmap field '{field}' (expected one of {', '.join(FIELDS)})")
+        return self.bitmaps[field].get(_key(value), self._empty)
+
+    def all(self) -> Bitmap:
+        return Bitmap.universe(self.n)
+
+    def values(self, field: str) -> Dict[str, int]:
+        """Cardinality of every value of `field`."""
+        return {value: len(bm) for value, bm in self.bitmaps[field].items()}
+
+    def course_ids_of(self, bitmap: Bitmap, limit: Optional[int] = None) -> List[str]:
+        ords = bitmap.ordinals()
+        return [self.course_ids[i] for i in (ords if limit is None else ords[:limit])]
+
+    def query(self, expr: str) -> Bitmap:
+        """Evaluate a boolean query string (see module docstring)."""
+        return _Parser(self, expr).parse()
+
+# ---------- Query parsing ----------
+
+_TOKEN_RE = re.compile(r'\s*(?:(?P<paren>[()])|(?P<field>\w+):(?:"(?P<quoted>[^"]*)"|(?P<value>[^\s()"]+))'
+                       r'|(?P<word>[^\s()]+))')
+
+class _Parser:
+    """Recursive descent: expr := and (OR and)*; and := unary ([AND] unary)*; unary := NOT unary | atom."""
+
+    def __init__(self, index: BitmapIndex, text: str):
+        self.index = index
+        self.tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            m = _TOKEN_RE.match(text, pos)
+            if not m or m.end() == pos:
+                raise ValueError(f"Cannot parse query at: {text[pos:]!r}")
+            pos = m.end()
+            if m.group("paren"):
+                self.tokens.append(m.group("paren"))
+            elif m.group("field"):
+                value = m.group("quoted") if m.group("quoted") is not None else m.group("value")
+                self.tokens.append((m.group("field").lower(), value))
+            else:
+                word = m.group("word").upper()
+                if word not in ("AND", "OR", "NOT"):
+                    raise ValueError(f"Expected field:value, AND, OR or NOT, got {m.group('word')!r}")
+                self.tokens.append(word)
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self):
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def parse(self) -> Bitmap:
+        if not self.tokens:
+            raise ValueError("Empty query")
+        result = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected {self._peek()!r} in query")
+        return result
+
+    def _or(self) -> Bitmap:
+        result = self._and()
+        while self._peek() == "OR":
+            self._take()
+            result = result | self._and()
+        return result
+
+    def _and(self) -> Bitmap:
+        result = self._unary()
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self._take()
+            if self._peek() == "NOT":   # a AND NOT b is a - b, no complement needed
+                self._take()
+                result = result - self._unary()
+            else:
+                result = result & self._unary()
+        return result
+
+    def _unary(self) -> Bitmap:
+        token = self._take()
+        if token == "NOT":
+            return ~self._unary()
+        if token == "(":
+            result = self._or()
+            if self._take() != ")":
+                raise ValueError("Missing ')' in query")
+            return result
+        if isinstance(token, tuple):
+            return self.index.get(*token)
+        raise ValueError(f"Unexpected {token!r} in query")
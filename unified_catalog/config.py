@@ -17,10 +17,110 @@ TARGET_DB = UNIFIED_DIR / "unified_courses.db"
 
 # Logging
 LOG_FILE = UNIFIED_DIR / "logs" / "etl_merge.log"
+RUN_REPORT_FILE = UNIFIED_DIR / "logs" / "etl_run_report.json"   # per-stage timings of the last run
 
 # ETL tuning
 BATCH_SIZE = 500
 DRY_RUN_DEFAULT = False
+WORKERS_DEFAULT = 1        # >1 runs each source's extractor in its own process
+QUEUE_MAX_BATCHES = 8      # bound on batches buffered between extraction and the writer (per queue)
+STREAMING_EXTRACT = False  # merge-join child tables cursor by cursor instead of preloading them
+
+# Background writer (writer.py): unless --batch-size is given, commit batches start
+# at BATCH_SIZE and adapt within [WRITER_MIN_BATCH, WRITER_MAX_BATCH] so that one
+# batch's write + commit takes about WRITER_TARGET_COMMIT_S
+WRITER_TARGET_COMMIT_S = 0.25
+WRITER_MIN_BATCH = 100
+WRITER_MAX_BATCH = 20000
+
+# JSON encoder of loader._pack_record: "auto" uses orjson when it is installed,
+# else the stdlib; both write identical text, so hashes do not depend on it
+JSON_BACKEND = "auto"
+
+# source_map keeps a compressed raw version per content change; older versions
+# beyond this many per course are pruned on write (None keeps every version)
+SOURCE_MAP_RETENTION = 3
+
+# Near-duplicate detection (dedup.py): MINHASH_PERMUTATIONS = LSH_BANDS * rows per band.
+# Candidates sharing a band bucket are kept when their estimated Jaccard similarity
+# reaches DEDUP_THRESHOLD; buckets larger than DEDUP_MAX_BUCKET are treated as noise.
+# Changed courses are signed and matched DEDUP_CHUNK at a time (bounded memory).
+# Changing the hashing parameters needs one `python -m unified_catalog.dedup --full`.
+DEDUP_AFTER_LOAD = False
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 32
+DEDUP_THRESHOLD = 0.7
+DEDUP_MAX_BUCKET = 200
+DEDUP_CROSS_SOURCE_ONLY = True
+DEDUP_CHUNK = 5000
+
+# Content-based similar courses (similar.py): TF-IDF over title words (counted
+# SIMILAR_TITLE_WEIGHT times), description, tags and skills, saved under SIMILAR_DIR.
+# Refreshes re-vectorize changed courses against the fitted IDF; once more than
+# SIMILAR_REFIT_FRACTION of the fitted rows changed, the next refresh refits.
+SIMILAR_AFTER_LOAD = False
+SIMILAR_DIR = TARGET_DB.with_suffix(".similar")
+SIMILAR_TITLE_WEIGHT = 2
+SIMILAR_REFIT_FRACTION = 0.2
+
+# Materialized related courses (neighbors.py): the NEIGHBORS_K best neighbors of every
+# course in course_neighbors, scored as a NEIGHBOR_WEIGHTS blend of the TF-IDF cosine
+# (similar.py), the cosine of the skill sets and a same-provider bonus (only between
+# courses that share text or skills). Rows are scored in blocks of about
+# NEIGHBORS_BLOCK_CELLS course pairs on NEIGHBORS_WORKERS processes (None: one per core).
+# Terms in at least NEIGHBORS_DENSE_DF of the courses (at most NEIGHBORS_DENSE_TERMS
+# of them; 4 bytes per course each) are scored as a dense matrix product.
+# Changing K or the weights makes the next refresh recompute every course.
+NEIGHBORS_AFTER_LOAD = False
+NEIGHBORS_K = 20
+NEIGHBOR_WEIGHTS = {"text": 0.6, "skills": 0.3, "provider": 0.1}
+NEIGHBORS_BLOCK_CELLS = 4_000_000
+NEIGHBORS_WORKERS = None
+NEIGHBORS_DENSE_DF = 0.01
+NEIGHBORS_DENSE_TERMS = 128
+
+# Approximate nearest neighbors (ann.py): the TF-IDF vectors of similar.py randomly
+# projected to ANN_DIM dimensions and indexed by ANN_TREES random-projection trees
+# with leaves of at most ANN_LEAF_SIZE courses, saved under ANN_DIR. A query visits
+# ANN_PROBES leaves per tree (more probes: better recall, slower queries); filtered
+# queries that match at most ANN_EXACT_BELOW courses are answered by an exact scan.
+# ANN_AFTER_LOAD rebuilds the index (there are no incremental updates) after each ETL load.
+ANN_AFTER_LOAD = False
+ANN_DIR = TARGET_DB.with_suffix(".ann")
+ANN_DIM = 128
+ANN_TREES = 16
+ANN_LEAF_SIZE = 64
+ANN_PROBES = 8
+ANN_EXACT_BELOW = 20000
+
+# Quiz-weakness recommendations (quiz_recs.py): answers in the quiz app's QUIZ_DB are
+# pooled per QUIZ_LABEL_MAP entry (label id, or its letter prefix: "PROG004" -> "PROG")
+# into a mastery of (correct + QUIZ_PRIOR_CORRECT) / (answers + QUIZ_PRIOR_ANSWERS);
+# a user's QUIZ_WEAKEST_LABELS labels furthest below QUIZ_MASTERY_TARGET pick the
+# courses, whose coverage of a label weighs its skills and tags by QUIZ_TERM_WEIGHTS
+# (each label's QUIZ_COURSES_PER_LABEL best courses are its candidates; None: all).
+# Users are scored in blocks of about QUIZ_BLOCK_CELLS (user, course) pairs.
+QUIZ_DB = BASE / "demo-quiz-app" / "backend" / "quiz_system.db"
+QUIZ_LABEL_MAP = UNIFIED_DIR / "quiz_labels.json"
+QUIZ_RECS_K = 10
+QUIZ_PRIOR_CORRECT = 1
+QUIZ_PRIOR_ANSWERS = 2
+QUIZ_MASTERY_TARGET = 0.8
+QUIZ_WEAKEST_LABELS = 3
+QUIZ_TERM_WEIGHTS = {"skills": 1.0, "tags": 0.5}
+QUIZ_COURSES_PER_LABEL = 200
+QUIZ_BLOCK_CELLS = 4_000_000
+
+# Bounded memo caches of the transform.py normalizers (distinct inputs kept per function)
+TRANSFORM_CACHE_SIZE = 16384
+
+# Catalog read API (reader.py): cached query results per CatalogReader, dropped
+# whenever the ETL bumps the catalog version
+READER_CACHE_SIZE = 4096
+
+# Columnar export (export.py)
+EXPORT_DIR = UNIFIED_DIR / "exports"
+EXPORT_BATCH_ROWS = 50000   # rows per Arrow record batch / Parquet row group
 
 # Safety toggles
 FAIL_FAST = False          # stop on first extractor error
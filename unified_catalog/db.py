@@ -1,5 +1,6 @@
 import sqlite3
 from contextlib import contextmanager
+from pathlib import Path
 from .config import TARGET_DB
 
 PRAGMAS = [
@@ -24,6 +25,24 @@ def open_conn(path=None) -> sqlite3.Connection:
     conn.commit()
     return conn
 
+# Read-only connections skip the pragmas that write (journal mode, sync)
+READONLY_PRAGMAS = [
+    ("PRAGMA temp_store=MEMORY;",),
+    ("PRAGMA mmap_size=30000000000;",),
+]
+
+def open_readonly(path=None, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Connection that can only read (URI mode=ro), with mmap'd page access."""
+    uri = Path(path or TARGET_DB).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    for (stmt,) in READONLY_PRAGMAS:
+        try:
+            conn.execute(stmt)
+        except Exception:
+            pass
+    return conn
+
 @contextmanager
 def transaction(conn: sqlite3.Connection):
     try:
@@ -0,0 +1,362 @@
+"""
+Cross-source near-duplicate detection for the unified catalog.
+
+Each course gets a MinHash signature over its normalized title, description,
+provider and skills. Signatures are cut into LSH bands; courses sharing a band
+bucket are candidates, and candidates whose estimated Jaccard similarity
+reaches DEDUP_THRESHOLD are stored as duplicate pairs. Connected components of
+the pairs form `course_clusters`. Only courses whose content_hash changed since
+the previous pass are re-signed and re-matched, DEDUP_CHUNK at a time, and only
+the clusters they touch are rewritten, so a pass costs O(changed) with memory
+bounded by the chunk size.
+"""
+import argparse
+import json
+import re
+import sqlite3
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import (
+    TARGET_DB, MINHASH_PERMUTATIONS, LSH_BANDS, DEDUP_THRESHOLD, DEDUP_MAX_BUCKET, DEDUP_CROSS_SOURCE_ONLY,
+    DEDUP_CHUNK,
+)
+from .db import open_conn, transaction
+from .loader import LIVE_TABLE
+from .logging_config import logger
+
+DEDUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS course_minhash (
+    course_id TEXT PRIMARY KEY,
+    source TEXT,
+    content_hash TEXT,        -- unified_courses.content_hash the signature was built from
+    signature BLOB            -- uint32[MINHASH_PERMUTATIONS]; NULL when the course has no text
+);
+CREATE TABLE IF NOT EXISTS course_lsh_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    course_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, course_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_lsh_bands_course ON course_lsh_bands(course_id);
+CREATE TABLE IF NOT EXISTS course_duplicate_pairs (
+    course_a TEXT NOT NULL,   -- course_a < course_b
+    course_b TEXT NOT NULL,
+    similarity REAL,
+    PRIMARY KEY (course_a, course_b)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_duplicate_pairs_b ON course_duplicate_pairs(course_b);
+CREATE TABLE IF NOT EXISTS course_clusters (
+    course_id TEXT PRIMARY KEY,
+    cluster_id TEXT NOT NULL,  -- smallest course_id in the cluster
+    cluster_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_course_clusters_cluster ON course_clusters(cluster_id);
+"""
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or the this to with your you".split()
+)
+_DESCRIPTION_WORDS = 200   # long descriptions add noise, not signal
+
+# ---------- Signatures ----------
+
+def words(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens of `text` without stopwords (shared with similar.py)."""
+    return [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+
+def shingles(title: Optional[str], description: Optional[str], provider: Optional[str],
+             skills_json: Optional[str]) -> Set[str]:
+    """Feature set of a course: title words, word bigrams of title+description, provider and skills."""
+    title_words = words(title)
+    text = title_words + words(description)[:_DESCRIPTION_WORDS]
+    out = {f"t:{w}" for w in title_words}
+    out.update(f"{a} {b}" for a, b in zip(text, text[1:]))
+    if provider:
+        out.add("p:" + " ".join(words(provider)))
+    for skill in json.loads(skills_json or "[]"):
+        out.add("s:" + " ".join(words(skill)))
+    return out
+
+# Fixed seed: signatures and buckets must stay comparable across runs
+_rng = np.random.default_rng(20240901)
+_A = _rng.integers(1, 2**63, size=MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2**63, size=MINHASH_PERMUTATIONS // LSH_BANDS, dtype=np.uint64) | np.uint64(1)
+_SIGN_CHUNK = 512   # courses per vectorized block (~70 features each -> a few MB of temporaries)
+
+def minhash_signatures(feature_sets: List[Set[str]]) -> np.ndarray:
+    """
+    MinHash signatures (multiply-shift hashing of crc32 feature ids), one
+    uint32 row per feature set, computed a block of courses at a time.
+    Every set must be non-empty.
+    """
+    out = np.empty((len(feature_sets), MINHASH_PERMUTATIONS), dtype=np.uint32)
+    for start in range(0, len(feature_sets), _SIGN_CHUNK):
+        block = feature_sets[start:start + _SIGN_CHUNK]
+        ids = np.fromiter((zlib.crc32(f.encode("utf-8")) for fs in block for f in fs), dtype=np.uint64)
+        offsets = np.cumsum([0] + [len(fs) for fs in block[:-1]])
+        hashed = (ids[:, None] * _A + _B) >> np.uint64(32)
+        out[start:start + len(block)] = np.minimum.reduceat(hashed, offsets, axis=0)
+    return out
+
+def band_buckets(signatures: np.ndarray) -> np.ndarray:
+    """(n, LSH_BANDS) signed 64-bit bucket ids: a wrapping polynomial hash of each band's rows."""
+    rows = signatures.astype(np.uint64).reshape(len(signatures), LSH_BANDS, MINHASH_PERMUTATIONS // LSH_BANDS)
+    return (rows * _BAND_MIX).sum(axis=2, dtype=np.uint64).view(np.int64)
+
+def _similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.count_nonzero(sig_a == sig_b)) / sig_a.size
+
+# ---------- Incremental pass ----------
+
+def ensure_dedup_schema(conn: sqlite3.Connection):
+    conn.executescript(DEDUP_SCHEMA)
+    conn.commit()
+
+def _mark_stale(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """
+    Fill temp.dedup_stale with the courses whose signature is missing or
+    outdated (removed = 0) and the signed courses that no longer exist
+    (removed = 1), then drop their signatures, bands and duplicate pairs.
+    Returns (changed, removed) counts.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dedup_stale (course_id TEXT PRIMARY KEY, removed INTEGER NOT NULL)")
+    conn.execute("DELETE FROM dedup_stale")
+    changed = conn.execute(f"""
+        INSERT INTO dedup_stale (course_id, removed)
+        SELECT u.course_id, 0 FROM {LIVE_TABLE} u LEFT JOIN course_minhash m ON m.course_id = u.course_id
+        WHERE m.course_id IS NULL OR m.content_hash IS NOT u.content_hash
+    """).rowcount
+    removed = conn.execute(f"""
+        INSERT INTO dedup_stale (course_id, removed)
+        SELECT m.course_id, 1 FROM course_minhash m
+        WHERE NOT EXISTS (SELECT 1 FROM {LIVE_TABLE} u WHERE u.course_id = m.course_id)
+    """).rowcount
+    stale = "(SELECT course_id FROM temp.dedup_stale)"
+    conn.execute(f"DELETE FROM course_lsh_bands WHERE course_id IN {stale}")
+    conn.execute(f"DELETE FROM course_duplicate_pairs WHERE course_a IN {stale}")
+    conn.execute(f"DELETE FROM course_duplicate_pairs WHERE course_b IN {stale}")
+    conn.execute(f"DELETE FROM course_minhash WHERE course_id IN {stale}")
+    return changed, removed
+
+def _stale_chunks(conn: sqlite3.Connection, size: int) -> Iterator[List[tuple]]:
+    """The re-sign candidates of temp.dedup_stale with their text, `size` courses at a time."""
+    last = 0
+    while True:
+        rows = conn.execute(f"""
+            SELECT s.rowid, u.course_id, u.source, u.content_hash, u.title, u.description, u.provider, u.skills_json
+            FROM temp.dedup_stale s JOIN {LIVE_TABLE} u ON u.course_id = s.course_id
+            WHERE s.rowid > ? AND s.removed = 0 ORDER BY s.rowid LIMIT ?
+        """, (last, size)).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [r[1:] for r in rows]
+
+def _sign(conn: sqlite3.Connection, changed: List[tuple]) -> Dict[str, np.ndarray]:
+    """Store signatures and LSH bands of `changed` courses; returns the signatures of those with text."""
+    features = [shingles(title, description, provider, skills_json)
+                for _, _, _, title, description, provider, skills_json in changed]
+    signed = [i for i, fs in enumerate(features) if fs]   # courses without text get no signature
+    sig_matrix = minhash_signatures([features[i] for i in signed])
+    signatures: Dict[str, np.ndarray] = {changed[i][0]: sig for i, sig in zip(signed, sig_matrix)}
+    conn.executemany(
+        "INSERT INTO course_minhash (course_id, source, content_hash, signature) VALUES (?, ?, ?, ?)",
+        [(cid, source, content_hash, signatures[cid].tobytes() if cid in signatures else None)
+         for cid, source, content_hash, *_ in changed],
+    )
+    conn.executemany(
+        "INSERT INTO course_lsh_bands (band, bucket, course_id) VALUES (?, ?, ?)",
+        ((band, bucket, changed[i][0])
+         for i, buckets in zip(signed, band_buckets(sig_matrix).tolist())
+         for band, bucket in enumerate(buckets)),
+    )
+    return signatures
+
+def _candidate_pairs(conn: sqlite3.Connection, changed: Set[str]) -> Set[Tuple[str, str]]:
+    """Pairs sharing a band bucket where at least one side was just re-signed."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dedup_changed (course_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM dedup_changed")
+    conn.executemany("INSERT INTO dedup_changed VALUES (?)", [(cid,) for cid in changed])
+    rows = conn.execute("""
+        WITH hit AS (
+            SELECT DISTINCT l.band, l.bucket FROM dedup_changed c
+            JOIN course_lsh_bands l ON l.course_id = c.course_id
+        ), shared AS (
+            SELECT h.band, h.bucket FROM hit h
+            JOIN course_lsh_bands b ON b.band = h.band AND b.bucket = h.bucket
+            GROUP BY h.band, h.bucket HAVING COUNT(*) > 1
+        )
+        SELECT b.band, b.bucket, b.course_id, m.source
+        FROM shared s
+        JOIN course_lsh_bands b ON b.band = s.band AND b.bucket = s.bucket
+        JOIN course_minhash m ON m.course_id = b.course_id
+    """)
+    buckets: Dict[tuple, List[tuple]] = defaultdict(list)
+    for band, bucket, cid, source in rows:
+        buckets[(band, bucket)].append((cid, source))
+
+    pairs, oversized = set(), 0
+    for members in buckets.values():
+        if len(members) > DEDUP_MAX_BUCKET:
+            oversized += 1
+            continue
+        for i, (a, src_a) in enumerate(members):
+            for b, src_b in members[i + 1:]:
+                if DEDUP_CROSS_SOURCE_ONLY and src_a == src_b:
+                    continue
+                if a in changed or b in changed:
+                    pairs.add((a, b) if a < b else (b, a))
+    if oversized:
+        logger.warning("Dedup skipped %d LSH buckets larger than %d", oversized, DEDUP_MAX_BUCKET)
+    return pairs
+
+def _match(conn: sqlite3.Connection, signatures: Dict[str, np.ndarray]) -> Tuple[int, int]:
+    """Store the duplicate pairs of just re-signed courses; returns (candidates, pairs)."""
+    candidates = _candidate_pairs(conn, set(signatures))
+    missing = {cid for pair in candidates for cid in pair if cid not in signatures}
+    for chunk in (list(missing)[i:i + 500] for i in range(0, len(missing), 500)):
+        for cid, blob in conn.execute(
+            f"SELECT course_id, signature FROM course_minhash "
+            f"WHERE course_id IN ({','.join('?' * len(chunk))})", chunk,
+        ):
+            signatures[cid] = np.frombuffer(blob, dtype=np.uint32)
+
+    pair_rows = []
+    for a, b in candidates:
+        sim = _similarity(signatures[a], signatures[b])
+        if sim >= DEDUP_THRESHOLD:
+            pair_rows.append((a, b, sim))
+    conn.executemany(
+        "INSERT OR REPLACE INTO course_duplicate_pairs (course_a, course_b, similarity) VALUES (?, ?, ?)",
+        pair_rows,
+    )
+    return len(candidates), len(pair_rows)
+
+def _components(pairs: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """Union-find over duplicate pairs: root (the smallest course_id) -> members."""
+    parent: Dict[str, str] = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)   # root is always the smallest id
+
+    members: Dict[str, List[str]] = defaultdict(list)
+    for cid in parent:
+        members[find(cid)].append(cid)
+    return members
+
+def _write_clusters(conn: sqlite3.Connection, members: Dict[str, List[str]]):
+    conn.executemany(
+        "INSERT INTO course_clusters (course_id, cluster_id, cluster_size) VALUES (?, ?, ?)",
+        [(cid, root, len(ids)) for root, ids in members.items() for cid in ids],
+    )
+
+def _rebuild_clusters(conn: sqlite3.Connection) -> int:
+    """Rewrite course_clusters from all duplicate pairs. Returns the number of rows written."""
+    conn.execute("DELETE FROM course_clusters")
+    members = _components(conn.execute("SELECT course_a, course_b FROM course_duplicate_pairs"))
+    _write_clusters(conn, members)
+    return sum(len(ids) for ids in members.values())
+
+# Courses whose cluster may have changed: re-signed or removed courses that are in
+# a pair now or were in a cluster, and the other members of their old clusters
+AFFECTED_SQL = """
+SELECT c2.course_id FROM temp.dedup_stale s
+JOIN course_clusters c1 ON c1.course_id = s.course_id
+JOIN course_clusters c2 ON c2.cluster_id = c1.cluster_id
+UNION
+SELECT p.course_a FROM temp.dedup_stale s JOIN course_duplicate_pairs p ON p.course_a = s.course_id
+UNION
+SELECT p.course_b FROM temp.dedup_stale s JOIN course_duplicate_pairs p ON p.course_b = s.course_id
+"""
+
+def _update_clusters(conn: sqlite3.Connection) -> int:
+    """
+    Rewrite only the clusters that can have changed: the components of the
+    current pair graph reachable from the courses of AFFECTED_SQL (pairs
+    between other courses are untouched, so their clusters are too).
+    Returns the number of course_clusters rows rewritten or dropped.
+    """
+    seen = {r[0] for r in conn.execute(AFFECTED_SQL)}
+    frontier, pairs = list(seen), []
+    while frontier:
+        reached = []
+        for i in range(0, len(frontier), 500):
+            chunk = frontier[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for a, b in conn.execute(f"SELECT course_a, course_b FROM course_duplicate_pairs "
+                                     f"WHERE course_a IN ({marks}) UNION "
+                                     f"SELECT course_a, course_b FROM course_duplicate_pairs "
+                                     f"WHERE course_b IN ({marks})", chunk + chunk):
+                pairs.append((a, b))
+                for cid in (a, b):
+                    if cid not in seen:
+                        seen.add(cid)
+                        reached.append(cid)
+        frontier = reached
+    conn.executemany("DELETE FROM course_clusters WHERE course_id = ?", [(cid,) for cid in seen])
+    _write_clusters(conn, _components(pairs))
+    return len(seen)
+
+def update_clusters(conn: sqlite3.Connection, full: bool = False, chunk: int = DEDUP_CHUNK) -> Dict[str, int]:
+    """
+    Bring signatures, duplicate pairs and course_clusters up to date with
+    unified_courses in one transaction, re-signing and matching changed
+    courses `chunk` at a time and rewriting only the clusters they touch.
+    With `full`, everything is re-signed (needed after changing the
+    MinHash/LSH parameters) and course_clusters is rebuilt.
+    """
+    ensure_dedup_schema(conn)
+    candidates = pairs = 0
+    with transaction(conn):
+        if full:
+            for table in ("course_minhash", "course_lsh_bands", "course_duplicate_pairs"):
+                conn.execute(f"DELETE FROM {table}")
+        changed, removed = _mark_stale(conn)
+        # A pair of two changed courses is found once, when the later one's chunk is matched
+        for rows in _stale_chunks(conn, chunk):
+            signatures = _sign(conn, rows)
+            if signatures:
+                found, kept = _match(conn, signatures)
+                candidates += found
+                pairs += kept
+        reclustered = _rebuild_clusters(conn) if full else _update_clusters(conn)
+        clusters = conn.execute("SELECT COUNT(DISTINCT cluster_id) FROM course_clusters").fetchone()[0]
+
+    stats = {"signed": changed, "removed": removed, "candidates": candidates, "pairs": pairs,
+             "reclustered": reclustered, "clusters": clusters}
+    logger.info("Dedup: re-signed %d courses, removed %d, %d candidate pairs -> %d new duplicate pairs, "
+                "%d courses reclustered, %d clusters", changed, removed, candidates, pairs, reclustered, clusters)
+    return stats
+
+def duplicates_of(conn: sqlite3.Connection, course_id: str) -> List[str]:
+    """Other members of the course's cluster (empty when it has no known duplicates)."""
+    rows = conn.execute(
+        "SELECT c2.course_id FROM course_clusters c1 JOIN course_clusters c2 ON c2.cluster_id = c1.cluster_id "
+        "WHERE c1.course_id = ? AND c2.course_id != ? ORDER BY c2.course_id",
+        (course_id, course_id),
+    )
+    return [r[0] for r in rows]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect near-duplicate courses across sources")
+    parser.add_argument("--full", action="store_true", help="Re-sign every course instead of only changed ones")
+    args = parser.parse_args()
+
+    conn = open_conn(TARGET_DB)
+    update_clusters(conn, full=args.full)
+    conn.close()
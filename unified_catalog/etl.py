@@ -1,22 +1,61 @@
 import argparse
+import cProfile
+import multiprocessing as mp
 import os
+import queue as queue_mod
 import sqlite3
-from typing import Iterator, Dict, List
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterator, Dict, List, Optional, Tuple
 
 from .config import (
     COURSERA_DB,
     EDX_DB,
     NPTEL_DB,
     TARGET_DB,
+    RUN_REPORT_FILE,
     BATCH_SIZE,
     DRY_RUN_DEFAULT,
+    WORKERS_DEFAULT,
+    QUEUE_MAX_BATCHES,
+    STREAMING_EXTRACT,
+    DEDUP_AFTER_LOAD,
+    SIMILAR_AFTER_LOAD,
+    NEIGHBORS_AFTER_LOAD,
+    ANN_AFTER_LOAD,
     FAIL_FAST,
     SKIP_MISSING_SOURCES,
 )
 from .logging_config import logger
 from .db import open_conn
-from .loader import ensure_schema, bulk_upsert
-from .extractors import extract_coursera, extract_edx, extract_nptel
+from .loader import (
+    LIVE_TABLE,
+    STAGING_TABLE,
+    ensure_schema,
+    begin_rebuild,
+    abort_rebuild,
+    finish_rebuild,
+    load_watermarks,
+    save_watermarks,
+    load_checkpoint,
+    clear_checkpoint,
+    merge_partition_db,
+    drop_fts_triggers,
+)
+from .extractors import (
+    get_stages,
+    read_high_water,
+    parse_filters,
+    parse_partition,
+    record_matches,
+    count_pushed_down,
+)
+from .metrics import StageTimer, peak_rss_mb, write_run_report
+from .writer import BatchSizer, BackgroundWriter
 
 def _exists(path) -> bool:
     try:
@@ -24,26 +63,23 @@ def _exists(path) -> bool:
     except Exception:
         return False
 
-def run(sources: List[str], dry_run: bool = DRY_RUN_DEFAULT, batch_size: int = BATCH_SIZE):
-    logger.info("ETL start — sources=%s dry_run=%s target=%s", sources, dry_run, TARGET_DB)
-
-    # Connect target & ensure schema
-    tgt = open_conn(TARGET_DB)
-    ensure_schema(tgt)
-
-    # For each source, open conn if present & extract
-    # Stream into loader in batches to keep memory bounded
+def _resolve_sources(sources: List[str], source_paths: Optional[Dict[str, str]] = None) -> List[Tuple[str, str]]:
+    """
+    Map CLI source names to (source, db_path) jobs, applying the
+    unknown-source and SKIP_MISSING_SOURCES rules. `source_paths`
+    overrides the configured DB path per source.
+    """
+    jobs = []
     for src in sources:
         src_l = src.lower().strip()
-        if src_l == "coursera":
+        if source_paths and src_l in source_paths:
+            path = source_paths[src_l]
+        elif src_l == "coursera":
             path = COURSERA_DB
-            extractor = extract_coursera
         elif src_l == "edx":
             path = EDX_DB
-            extractor = extract_edx
         elif src_l == "nptel":
             path = NPTEL_DB
-            extractor = extract_nptel
         else:
             logger.error("Unknown source: %s (skipping)", src)
             continue
@@ -55,41 +91,137 @@ def run(sources: List[str], dry_run: bool = DRY_RUN_DEFAULT, batch_size: int = B
                 continue
             else:
                 raise FileNotFoundError(msg)
+        jobs.append((src_l, str(path)))
+    return jobs
+
+def _new_stats() -> Dict[str, int]:
+    return {"records": 0, "inserted": 0, "updated": 0, "unchanged": 0, "filtered": 0}
+
+def _add_stats(total: Dict[str, int], part: Dict[str, int]):
+    for k, v in part.items():
+        total[k] += v
+
+def _log_source_stats(src: str, stats: Dict[str, int]):
+    logger.info("Source %s: %d records (inserted=%d updated=%d unchanged=%d filtered out=%d)", src,
+                stats["records"], stats["inserted"], stats["updated"], stats["unchanged"], stats["filtered"])
+
+def _log_preview(src: str, count: int, preview: List[Dict]):
+    logger.info("[DRY RUN] %s produced %d normalized records. Preview:\n  1) %s\n  2) %s\n  3) %s",
+                src, count,
+                preview[0] if len(preview) > 0 else None,
+                preview[1] if len(preview) > 1 else None,
+                preview[2] if len(preview) > 2 else None)
+
+def _batches(src: str, src_conn: sqlite3.Connection, since: Optional[Dict[str, object]], streaming: bool,
+             batch_size: int, timer: StageTimer, filters: Optional[Dict[str, Tuple[str, ...]]] = None,
+             stats: Optional[Dict[str, int]] = None, after: Optional[str] = None,
+             partition: Optional[Tuple[int, int]] = None) -> Iterator[List[Dict]]:
+    """
+    Normalized record batches, timing raw reads ("extract") apart from normalization ("transform").
+    Records failing `filters` are dropped before they are yielded and counted
+    in stats["filtered"], together with the rows the source query skipped.
+    Batches are ordered by source_course_id; `after` resumes past a checkpoint key
+    and `partition` (k, n) restricts the source to one hash partition.
+    """
+    rows_fn, normalize_batch = get_stages(src)
+    with timer.stage("extract"):
+        skipped = count_pushed_down(src_conn, src, since, filters, after, partition)
+        rows = rows_fn(src_conn, since=since, streaming=streaming, filters=filters, after=after, partition=partition)
+    if stats is not None:
+        stats["filtered"] += skipped
+    while True:
+        with timer.stage("extract"):
+            raw = list(islice(rows, batch_size))
+        if not raw:
+            return
+        with timer.stage("transform"):
+            batch = normalize_batch(raw)
+            if filters:
+                kept = [r for r in batch if record_matches(r, filters)]
+                if stats is not None:
+                    stats["filtered"] += len(batch) - len(kept)
+                batch = kept
+        if batch:
+            yield batch
+
+def _resume_point(tgt: sqlite3.Connection, src: str,
+                  resume: bool) -> Tuple[Optional[str], int, Optional[Dict[str, object]]]:
+    """
+    (key to continue after, batches already committed, high-water marks the
+    interrupted run began with) for a source; (None, 0, None) starts over.
+    """
+    checkpoint = load_checkpoint(tgt, src) if resume else None
+    if not checkpoint:
+        return None, 0, None
+    after, batch_no, marks = checkpoint
+    logger.info("Resuming source=%s after key %r (batch %d committed)", src, after, batch_no)
+    if marks is None:
+        logger.warning("Checkpoint of source=%s predates stored marks; its watermarks stay as they were", src)
+    return after, batch_no, marks or {}
 
+def _source_profile(timer: StageTimer, wall: float, peak_rss: Optional[float]) -> Dict:
+    return {"wall_s": round(wall, 4), "peak_rss_mb": peak_rss, "stages": timer.as_dict()}
+
+def _source_finisher(src: str, stats: Dict[str, int], timer: StageTimer, started: float,
+                     marks: Dict[str, object], on_source_done: Callable, profiles: Dict[str, Dict],
+                     peak_rss: Optional[float] = None) -> Callable:
+    """Callback the writer runs once every batch of `src` is committed."""
+    def done(conn: sqlite3.Connection, _src: str):
+        rss = peak_rss_mb() if peak_rss is None else max(peak_rss, peak_rss_mb() or 0)
+        profiles[src] = _source_profile(timer, time.perf_counter() - started, rss)
+        _log_source_stats(src, stats)
+        on_source_done(conn, src, marks)
+    return done
+
+@dataclass
+class RunOptions:
+    """Extraction options of one run, shared by the serial and parallel drivers and their workers."""
+    batch_size: int = BATCH_SIZE
+    incremental: bool = False
+    streaming: bool = STREAMING_EXTRACT
+    filters: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    resume: bool = False
+    partition: Optional[Tuple[int, int]] = None
+    profile_dir: Optional[Path] = None   # cProfile dumps of worker processes
+
+def _run_serial(tgt: sqlite3.Connection, jobs: List[Tuple[str, str]], dry_run: bool, opts: RunOptions,
+                writer: Optional[BackgroundWriter],
+                on_source_done: Callable[[sqlite3.Connection, str, Dict[str, object]], None],
+                profiles: Dict[str, Dict]) -> Dict[str, Dict[str, int]]:
+    report: Dict[str, Dict[str, int]] = {}
+    for src, path in jobs:
         logger.info("Processing source=%s DB=%s", src, path)
-        src_conn = sqlite3.connect(str(path))
+        src_conn = sqlite3.connect(path)
         src_conn.row_factory = sqlite3.Row
+        timer = StageTimer()
+        started = time.perf_counter()
 
         try:
-            generator = extractor(src_conn)
-
+            since = load_watermarks(tgt, src) if opts.incremental else None
+            after, batch_no, marks = _resume_point(tgt, src, opts.resume)
+            if marks is None:
+                marks = read_high_water(src_conn, src)
+            stats = _new_stats()
+            preview: List[Dict] = []
+            if writer:
+                writer.begin_source(src, stats, timer, batch_no, marks)
+            # Hand batches to the writer thread (dry run: count and keep a few samples)
+            for batch in _batches(src, src_conn, since, opts.streaming, opts.batch_size, timer, opts.filters, stats,
+                                  after, opts.partition):
+                if dry_run:
+                    preview.extend(batch[:3 - len(preview)])
+                elif src in writer.failed:
+                    raise RuntimeError(f"writes for source={src} failed; stopping its extraction")
+                else:
+                    writer.put(src, batch)
+                stats["records"] += len(batch)
             if dry_run:
-                # Count and log some samples without writing
-                preview = []
-                count = 0
-                for rec in generator:
-                    if count < 3:
-                        preview.append(rec)
-                    count += 1
-                logger.info("[DRY RUN] %s produced %d normalized records. Preview:\n  1) %s\n  2) %s\n  3) %s",
-                            src, count,
-                            preview[0] if len(preview) > 0 else None,
-                            preview[1] if len(preview) > 1 else None,
-                            preview[2] if len(preview) > 2 else None)
+                _log_preview(src, stats["records"], preview)
+                profiles[src] = _source_profile(timer, time.perf_counter() - started, peak_rss_mb())
             else:
-                # Stream into upsert in batches
-                buffer: List[Dict] = []
-                c = 0
-                for rec in generator:
-                    buffer.append(rec)
-                    if len(buffer) >= batch_size:
-                        bulk_upsert(tgt, buffer, batch_size=batch_size)
-                        c += len(buffer)
-                        buffer.clear()
-                if buffer:
-                    bulk_upsert(tgt, buffer, batch_size=batch_size)
-                    c += len(buffer)
-                logger.info("Source %s: inserted/updated %d records", src, c)
+                writer.end_source(src, _source_finisher(src, stats, timer, started, marks, on_source_done,
+                                                        profiles))
+            report[src] = stats
 
         except Exception as e:
             logger.exception("Extractor failed for source=%s: %s", src, e)
@@ -97,9 +229,356 @@ def run(sources: List[str], dry_run: bool = DRY_RUN_DEFAULT, batch_size: int = B
                 raise
         finally:
             src_conn.close()
+    return report
+
+# ---------- Parallel mode ----------
+# Each source runs in its own process and ships batches of normalized records
+# over a bounded queue; the parent process relays them to the writer thread,
+# which is the only one that ever writes to the target DB. Workers are spawned,
+# not forked: forking while the writer thread holds a lock (logging, SQLite)
+# could leave the child waiting on it forever.
+_MP = mp.get_context("spawn")
+
+def _extract_worker(src: str, path: str, out_q, opts: RunOptions, since: Optional[Dict[str, object]],
+                    after: Optional[str] = None, marks: Optional[Dict[str, object]] = None):
+    profile_path = str(opts.profile_dir / f"etl_profile_{src}.prof") if opts.profile_dir else None
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler:
+        profiler.enable()
+    src_conn = sqlite3.connect(path)
+    src_conn.row_factory = sqlite3.Row
+    timer = StageTimer()
+    try:
+        # The marks go first, so the parent can checkpoint them with the first batch
+        out_q.put(("marks", src, read_high_water(src_conn, src) if marks is None else marks))
+        counts = {"filtered": 0}
+        for batch in _batches(src, src_conn, since, opts.streaming, opts.batch_size, timer, opts.filters, counts,
+                              after, opts.partition):
+            out_q.put(("batch", src, batch))
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        # Extract/transform timings, filter counts and this process's peak RSS
+        out_q.put(("done", src, (timer.stages, peak_rss_mb(), counts["filtered"])))
+    except Exception:
+        out_q.put(("error", src, traceback.format_exc()))
+    finally:
+        src_conn.close()
+
+def _run_parallel(tgt: sqlite3.Connection, jobs: List[Tuple[str, str]], dry_run: bool, opts: RunOptions,
+                  writer: Optional[BackgroundWriter],
+                  on_source_done: Callable[[sqlite3.Connection, str, Dict[str, object]], None],
+                  workers: int, profiles: Dict[str, Dict]) -> Dict[str, Dict[str, int]]:
+    out_q = _MP.Queue(maxsize=QUEUE_MAX_BATCHES)
+    pending = list(jobs)
+    running: Dict[str, mp.process.BaseProcess] = {}
+    report: Dict[str, Dict[str, int]] = {}
+    previews: Dict[str, List[Dict]] = {}
+    timers: Dict[str, StageTimer] = {}
+    started: Dict[str, float] = {}
+    batch_nos: Dict[str, int] = {}
+    marks: Dict[str, Dict[str, object]] = {}
+    failed = set()
+
+    def start_next():
+        while pending and len(running) < workers:
+            src, path = pending.pop(0)
+            logger.info("Processing source=%s DB=%s (worker process)", src, path)
+            since = load_watermarks(tgt, src) if opts.incremental else None
+            after, batch_nos[src], resumed_marks = _resume_point(tgt, src, opts.resume)
+            proc = _MP.Process(target=_extract_worker, args=(src, path, out_q, opts, since, after, resumed_marks),
+                               name=f"etl-{src}", daemon=True)
+            proc.start()
+            running[src] = proc
+            report[src] = _new_stats()
+            previews[src] = []
+            timers[src] = StageTimer()
+            started[src] = time.perf_counter()
+
+    def fail(src: str, detail: str):
+        running.pop(src).join()
+        failed.add(src)
+        logger.error("Extractor failed for source=%s:\n%s", src, detail)
+        if FAIL_FAST:
+            for proc in running.values():
+                proc.terminate()
+            raise RuntimeError(f"Extractor failed for source={src}")
+
+    try:
+        start_next()
+        while running:
+            try:
+                kind, src, payload = out_q.get(timeout=1.0)
+            except queue_mod.Empty:
+                # A worker that died without reporting (e.g. OOM-killed) would
+                # otherwise leave the writer waiting forever.
+                for src, proc in list(running.items()):
+                    if not proc.is_alive() and proc.exitcode != 0:
+                        fail(src, f"worker exited with code {proc.exitcode}")
+                start_next()
+                continue
+
+            if src in failed or (writer and src in writer.failed):
+                # Drain whatever a source whose writes already failed still sends
+                if kind in ("done", "error"):
+                    running.pop(src).join()
+            elif kind == "marks":
+                marks[src] = payload
+                if writer:
+                    writer.begin_source(src, report[src], timers[src], batch_nos[src], payload)
+            elif kind == "batch":
+                if dry_run:
+                    preview = previews[src]
+                    preview.extend(payload[:3 - len(preview)])
+                else:
+                    writer.put(src, payload)
+                report[src]["records"] += len(payload)
+            elif kind == "done":
+                running.pop(src).join()
+                worker_stages, peak_rss, filtered = payload
+                timers[src].merge(worker_stages)
+                report[src]["filtered"] += filtered
+                if dry_run:
+                    profiles[src] = _source_profile(timers[src], time.perf_counter() - started[src], peak_rss)
+                    _log_preview(src, report[src]["records"], previews[src])
+                else:
+                    writer.end_source(src, _source_finisher(src, report[src], timers[src], started[src],
+                                                            marks[src], on_source_done, profiles, peak_rss))
+            else:
+                fail(src, payload)
+            start_next()
+    finally:
+        for proc in running.values():
+            proc.terminate()
+            proc.join()
+        out_q.close()
+    return {src: stats for src, stats in report.items() if src not in failed}
 
-    tgt.close()
-    logger.info("ETL finished.")
+def run(sources: List[str], dry_run: bool = DRY_RUN_DEFAULT, batch_size: Optional[int] = None,
+        workers: int = WORKERS_DEFAULT, incremental: bool = False,
+        streaming: bool = STREAMING_EXTRACT, rebuild: bool = False,
+        dedup: bool = DEDUP_AFTER_LOAD, similar: bool = SIMILAR_AFTER_LOAD,
+        neighbors: bool = NEIGHBORS_AFTER_LOAD, ann: bool = ANN_AFTER_LOAD, profile: bool = False,
+        report_path: Optional[Path] = None, target_db: Optional[Path] = None,
+        source_paths: Optional[Dict[str, str]] = None, where: Optional[List[str]] = None,
+        resume: bool = False, partition: Optional[Tuple[int, int]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Extract, normalize and upsert `sources` into TARGET_DB (or `target_db`).
+
+    `incremental` extracts only courses touched since the last run's
+    high-water marks; `rebuild` loads into a staging table swapped in only if
+    every source succeeds; `where` filters records (extractors.parse_filters);
+    `resume` continues after the last committed batch checkpoint; `partition`
+    (k, n) loads hash partition k of n into its own DB for merge_partitions.
+    `dedup` / `similar` / `neighbors` / `ann` run the derived-data passes afterwards.
+    Timings go to the JSON run report at `report_path` (cProfile dumps with
+    `profile`). Returns per-source counts (inserted/updated/unchanged/filtered).
+    """
+    if rebuild and incremental:
+        logger.warning("--rebuild reloads every row; ignoring --incremental")
+        incremental = False
+    if rebuild and resume:
+        logger.warning("--rebuild starts from an empty staging table; ignoring --resume")
+        resume = False
+    rebuild = rebuild and not dry_run
+    target_db = target_db or TARGET_DB
+    if partition:
+        target_db = partition_db_path(target_db, *partition)
+        if dedup or similar or neighbors or ann:
+            logger.warning("--dedup/--similar/--neighbors/--ann run on the merged catalog; ignoring them for "
+                           "partition %d/%d", *partition)
+            dedup = similar = neighbors = ann = False
+    filters = parse_filters(where)
+    adaptive = batch_size is None
+    batch_size = batch_size or BATCH_SIZE
+    logger.info("ETL start — sources=%s dry_run=%s incremental=%s rebuild=%s target=%s workers=%s",
+                sources, dry_run, incremental, rebuild, target_db, workers)
+
+    started_at, wall0, cpu0 = datetime.utcnow(), time.perf_counter(), time.process_time()
+    profiles: Dict[str, Dict] = {}
+    if report_path is None and partition:
+        report_path = RUN_REPORT_FILE.with_name(f"{RUN_REPORT_FILE.stem}.part-{partition[0]}-of-{partition[1]}.json")
+    report_path = Path(report_path or RUN_REPORT_FILE)
+    profile_dir = report_path.parent if profile else None
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        profiler.enable()
+
+    # Connect target & ensure schema
+    tgt = open_conn(target_db)
+    ensure_schema(tgt)
+    if partition:
+        drop_fts_triggers(tgt)   # staging DBs are merged, never searched
+        tgt.commit()
+
+    # Watermarks of a rebuild only count once the new table is swapped in
+    # (called on the writer thread, with its connection, once a source's last batch is committed)
+    pending_marks: Dict[str, Dict[str, object]] = {}
+    if rebuild:
+        def on_source_done(conn: sqlite3.Connection, src: str, marks: Dict[str, object]):
+            pending_marks[src] = marks
+    else:
+        def on_source_done(conn: sqlite3.Connection, src: str, marks: Dict[str, object]):
+            save_watermarks(conn, src, marks)
+            clear_checkpoint(conn, src)
+    table = STAGING_TABLE if rebuild else LIVE_TABLE
+    writer: Optional[BackgroundWriter] = None
+
+    # Stream into loader in batches to keep memory bounded
+    try:
+        jobs = _resolve_sources(sources, source_paths)
+        if "source" in filters:
+            jobs = [(src, path) for src, path in jobs if src in filters["source"]]
+        if rebuild:
+            begin_rebuild(tgt)
+        try:
+            if not dry_run:
+                writer = BackgroundWriter(target_db, table, BatchSizer(batch_size, adaptive=adaptive),
+                                          profile_path=profile_dir / "etl_profile_writer.prof" if profile else None)
+            opts = RunOptions(batch_size=batch_size, incremental=incremental, streaming=streaming,
+                              filters=filters, resume=resume, partition=partition, profile_dir=profile_dir)
+            if workers > 1 and len(jobs) > 1:
+                report = _run_parallel(tgt, jobs, dry_run, opts, writer, on_source_done, workers, profiles)
+            else:
+                report = _run_serial(tgt, jobs, dry_run, opts, writer, on_source_done, profiles)
+            if writer:
+                writer.close()
+                report = {src: stats for src, stats in report.items() if src not in writer.failed}
+        except BaseException:
+            if writer:
+                writer.close(raise_error=False)
+            if rebuild:
+                abort_rebuild(tgt)
+            raise
+        if rebuild:
+            failed = [src for src, _ in jobs if src not in report]
+            if failed:
+                logger.error("Rebuild aborted, live catalog left untouched — failed sources: %s", failed)
+                abort_rebuild(tgt)
+            else:
+                finish_rebuild(tgt, [src for src, _ in jobs])
+                for src, marks in pending_marks.items():
+                    save_watermarks(tgt, src, marks)
+                logger.info("Rebuild swapped in for sources=%s", [src for src, _ in jobs])
+        if not dry_run:
+            _post_load(tgt, target_db, dedup, similar, neighbors, ann)
+    finally:
+        tgt.close()
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(str(profile_dir / "etl_profile.prof"))
+            logger.info("cProfile stats written to %s", profile_dir / "etl_profile.prof")
+    totals = _new_stats()
+    for stats in report.values():
+        _add_stats(totals, stats)
+    logger.info("ETL finished — %d records (inserted=%d updated=%d unchanged=%d filtered out=%d)",
+                totals["records"], totals["inserted"], totals["updated"], totals["unchanged"], totals["filtered"])
+
+    sources_report = {}
+    writer_report = writer.summary() if writer else None
+    if writer_report:
+        sizes = writer_report["batch_sizes"]
+        logger.info("Writer: %d records at %.0f/s, busy %.2fs, queue depth max %d/%d (mean %.1f), "
+                    "commit batches %s..%s (mean %s, %s)",
+                    writer_report["records_written"], writer_report["records_per_sec"] or 0,
+                    writer_report["busy_s"], writer_report["queue_depth_max"], writer_report["queue_max"],
+                    writer_report["queue_depth_mean"], sizes["min"], sizes["max"], sizes["mean"],
+                    "adaptive" if sizes["adaptive"] else "fixed")
+    for src, stats in report.items():
+        prof = profiles.get(src, {})
+        wall = prof.get("wall_s") or 0.0
+        sources_report[src] = {**stats, "records_per_sec": round(stats["records"] / wall, 1) if wall else None,
+                               **prof}
+        logger.info("Source %s timings: %s (%.0f records/s)", src,
+                    " ".join(f"{name}={st['wall_s']:.2f}s" for name, st in prof.get("stages", {}).items()),
+                    sources_report[src]["records_per_sec"] or 0)
+    write_run_report(report_path, {
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.utcnow().isoformat(),
+        "options": {"sources": sources, "dry_run": dry_run, "batch_size": batch_size,
+                    "adaptive_batches": adaptive, "workers": workers, "incremental": incremental,
+                    "streaming": streaming, "rebuild": rebuild, "dedup": dedup, "similar": similar,
+                    "neighbors": neighbors, "ann": ann, "resume": resume,
+                    "partition": f"{partition[0]}/{partition[1]}" if partition else None,
+                    "where": {name: list(values) for name, values in filters.items()}},
+        "wall_s": round(time.perf_counter() - wall0, 4),
+        "cpu_s": round(time.process_time() - cpu0, 4),   # this (writer) process only
+        "peak_rss_mb": peak_rss_mb(),
+        "totals": totals,
+        "writer": writer_report,
+        "sources": sources_report,
+    })
+    return report
+
+def _post_load(tgt, target_db: Path, dedup: bool, similar: bool, neighbors: bool, ann: bool):
+    """Derived-data passes after a load (numpy is only needed for these); all but the ANN rebuild are incremental."""
+    if dedup:
+        from .dedup import update_clusters
+        update_clusters(tgt)
+    if similar or neighbors or ann:
+        from .similar import index_dir_for, refresh as refresh_similar
+        if neighbors:   # refreshes the similar-courses index first
+            from .neighbors import refresh_neighbors
+            refresh_neighbors(tgt, index_dir_for(target_db))
+        elif not ann:
+            refresh_similar(tgt, index_dir_for(target_db))
+        if ann:   # also refreshes the similar-courses index first
+            from .ann import build as build_ann, index_dir_for as ann_dir_for
+            build_ann(tgt, ann_dir_for(target_db), index_dir_for(target_db))
+
+# ---------- Hash-partitioned runs ----------
+def partition_db_path(target_db: Path, k: int, n: int) -> Path:
+    """Staging DB of work unit k of n, next to the catalog: unified_courses.part-3-of-8.db."""
+    target_db = Path(target_db)
+    return target_db.with_name(f"{target_db.stem}.part-{k}-of-{n}{target_db.suffix}")
+
+def merge_partitions(n: int, target_db: Optional[Path] = None, dedup: bool = DEDUP_AFTER_LOAD,
+                     similar: bool = SIMILAR_AFTER_LOAD, neighbors: bool = NEIGHBORS_AFTER_LOAD,
+                     ann: bool = ANN_AFTER_LOAD) -> Dict[str, int]:
+    """
+    Fold the staging DBs of units 1..n into the catalog (loader.merge_partition_db),
+    one ATTACH and transaction per unit; units that never ran are skipped with a
+    warning. The staging DBs are kept: they hold each unit's watermarks and
+    checkpoints for the next incremental or resumed partition run.
+    """
+    target_db = target_db or TARGET_DB
+    tgt = open_conn(target_db)
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+    try:
+        ensure_schema(tgt)
+        for k in range(1, n + 1):
+            part = partition_db_path(target_db, k, n)
+            if not part.exists():
+                logger.warning("Partition %d/%d has no staging DB (%s); skipping", k, n, part)
+                continue
+            stats = merge_partition_db(tgt, part)
+            logger.info("Merged partition %d/%d (inserted=%d updated=%d unchanged=%d)", k, n,
+                        stats["inserted"], stats["updated"], stats["unchanged"])
+            _add_stats(totals, stats)
+        _post_load(tgt, target_db, dedup, similar, neighbors, ann)
+    finally:
+        tgt.close()
+    return totals
+
+def _run_unit(args: Tuple[List[str], Tuple[int, int], Dict]) -> Dict[str, Dict[str, int]]:
+    sources, partition, kwargs = args
+    return run(sources, partition=partition, **kwargs)
+
+def run_partitioned(sources: List[str], n: int, processes: Optional[int] = None,
+                    target_db: Optional[Path] = None, dedup: bool = DEDUP_AFTER_LOAD,
+                    similar: bool = SIMILAR_AFTER_LOAD, neighbors: bool = NEIGHBORS_AFTER_LOAD,
+                    ann: bool = ANN_AFTER_LOAD, **kwargs) -> Dict[str, int]:
+    """
+    Run all n units of every source on this machine (up to `processes` at a
+    time, default one per core), then merge them into the catalog. Each unit
+    extracts its sources serially; `kwargs` go to run().
+    """
+    kwargs.update(workers=1, target_db=target_db)
+    units = [(sources, (k, n), kwargs) for k in range(1, n + 1)]
+    with mp.Pool(processes or min(n, os.cpu_count() or 1)) as pool:
+        pool.map(_run_unit, units)
+    return merge_partitions(n, target_db=target_db, dedup=dedup, similar=similar, neighbors=neighbors, ann=ann)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Merge Coursera/edX/NPTEL into a unified SQLite catalog")
@@ -107,7 +586,54 @@ if __name__ == "__main__":
                         help="Which sources to include (default: all)")
     parser.add_argument("--dry-run", action="store_true", default=DRY_RUN_DEFAULT,
                         help="Run extractors and log preview without writing to the target DB")
-    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Upsert batch size")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help=f"Fixed upsert batch size (default: adaptive, starting at {BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=WORKERS_DEFAULT,
+                        help="Extractor processes; >1 extracts sources in parallel with a single writer")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only extract rows changed since each source's last successful run")
+    parser.add_argument("--stream", action="store_true", default=STREAMING_EXTRACT,
+                        help="Merge-join child tables cursor by cursor (flat memory) instead of preloading them")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Bulk-load into an index-free staging table, index once, then atomically swap it in")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue sources an interrupted run left unfinished from their last committed batch")
+    parser.add_argument("--partition", metavar="K/N",
+                        help="Load only hash partition K of N (1-based) into its own staging DB")
+    parser.add_argument("--partitions", type=int, metavar="N",
+                        help="Run all N partitions on local cores, then merge them")
+    parser.add_argument("--merge-partitions", type=int, metavar="N",
+                        help="Only merge the staging DBs of partitions 1..N into the catalog")
+    parser.add_argument("--dedup", action="store_true", default=DEDUP_AFTER_LOAD,
+                        help="Update cross-source duplicate clusters (MinHash/LSH) after loading")
+    parser.add_argument("--similar", action="store_true", default=SIMILAR_AFTER_LOAD,
+                        help="Refresh the TF-IDF similar-courses index after loading")
+    parser.add_argument("--neighbors", action="store_true", default=NEIGHBORS_AFTER_LOAD,
+                        help="Refresh the course_neighbors table (and the similar-courses index) after loading")
+    parser.add_argument("--ann", action="store_true", default=ANN_AFTER_LOAD,
+                        help="Rebuild the approximate-nearest-neighbor index (ann.py) after loading")
+    parser.add_argument("--profile", action="store_true",
+                        help="Dump cProfile stats (etl_profile*.prof) next to the run report")
+    parser.add_argument("--where", action="append", default=[], metavar="FIELD=V1[,V2...]",
+                        help="Only load records whose field (source/language/subject/level) is one of the values "
+                             "or unknown; repeatable, e.g. --where language=english")
     args = parser.parse_args()
+    try:
+        parse_filters(args.where)
+        partition = parse_partition(args.partition) if args.partition else None
+    except ValueError as e:
+        parser.error(str(e))
 
-    run(args.sources, dry_run=args.dry_run, batch_size=args.batch_size)
+    if args.merge_partitions:
+        merge_partitions(args.merge_partitions, dedup=args.dedup, similar=args.similar, neighbors=args.neighbors,
+                         ann=args.ann)
+    elif args.partitions:
+        run_partitioned(args.sources, args.partitions, dedup=args.dedup, similar=args.similar,
+                        neighbors=args.neighbors, ann=args.ann, dry_run=args.dry_run, batch_size=args.batch_size,
+                        incremental=args.incremental, streaming=args.stream, rebuild=args.rebuild,
+                        profile=args.profile, where=args.where, resume=args.resume)
+    else:
+        run(args.sources, dry_run=args.dry_run, batch_size=args.batch_size, workers=args.workers,
+            incremental=args.incremental, streaming=args.stream, rebuild=args.rebuild, dedup=args.dedup,
+            similar=args.similar, neighbors=args.neighbors, ann=args.ann, profile=args.profile, where=args.where,
+            resume=args.resume, partition=partition)
@@ -0,0 +1,223 @@
+"""
+Columnar export of unified_courses to Parquet or Arrow IPC for analytics.
+
+Rows are streamed off SQLite in record batches, the JSON list columns become
+native list<string> columns, and by default the output is hive-partitioned by
+source (exports/source=edx/part-....parquet) so dataset readers can prune both
+columns and partitions:
+
+    import pyarrow.dataset as ds
+    ds.dataset("exports", format="parquet", partitioning="hive").to_table(columns=["title", "skills"])
+
+With `incremental`, only rows whose updated_at is newer than the previous
+export are written, as new part files; readers keep the row with the latest
+updated_at per course_id. Deletions are only picked up by a full export.
+Part files are written under hidden temporary names (.part-*.tmp, skipped by
+dataset readers) and renamed only once the whole export succeeded; a failed
+export deletes them and leaves the previous parts and state untouched.
+"""
+import argparse
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from .config import TARGET_DB, EXPORT_DIR, EXPORT_BATCH_ROWS
+from .db import open_conn
+from .loader import LIVE_TABLE
+from .logging_config import logger
+
+# (unified_courses column, exported name, arrow type); *_json list columns are decoded
+EXPORT_COLUMNS = [
+    ("course_id", "course_id", pa.string()),
+    ("source", "source", pa.string()),
+    ("source_course_id", "source_course_id", pa.string()),
+    ("title", "title", pa.string()),
+    ("description", "description", pa.string()),
+    ("url", "url", pa.string()),
+    ("provider", "provider", pa.string()),
+    ("instructors_json", "instructors", pa.list_(pa.string())),
+    ("subject", "subject", pa.string()),
+    ("level", "level", pa.string()),
+    ("language", "language", pa.string()),
+    ("duration_weeks", "duration_weeks", pa.int32()),
+    ("tags_json", "tags", pa.list_(pa.string())),
+    ("skills_json", "skills", pa.list_(pa.string())),
+    ("rating", "rating", pa.float64()),
+    ("ratings_count", "ratings_count", pa.int64()),
+    ("popularity", "popularity", pa.int64()),
+    ("image_url", "image_url", pa.string()),
+    ("created_at", "created_at", pa.string()),
+    ("updated_at", "updated_at", pa.string()),
+    ("extra_json", "extra_json", pa.string()),
+]
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+STATE_FILE = "_export_state.json"
+
+def _schema(partitioned: bool) -> pa.Schema:
+    return pa.schema([pa.field(name, typ) for _, name, typ in EXPORT_COLUMNS
+                      if not (partitioned and name == "source")])
+
+def _coerce(value, typ: pa.DataType):
+    """Best-effort cast for values SQLite's loose typing let through (e.g. '1,234' in an INTEGER column)."""
+    if value is None:
+        return None
+    try:
+        num = float(str(value).replace(",", ""))
+        if not math.isfinite(num):   # 'nan' / 'inf' parse as floats but fit no column
+            return None
+        return num if pa.types.is_floating(typ) else int(num)
+    except ValueError:
+        return None
+
+def _column(values: List, field: pa.Field, nulled: Dict[str, int]) -> pa.Array:
+    if pa.types.is_list(field.type):
+        return pa.array([json.loads(v) if v else [] for v in values], type=field.type)
+    try:
+        return pa.array(values, type=field.type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        coerced = [_coerce(v, field.type) for v in values]
+        lost = sum(1 for v, c in zip(values, coerced) if v is not None and c is None)
+        if lost:
+            nulled[field.name] = nulled.get(field.name, 0) + lost
+        return pa.array(coerced, type=field.type)
+
+def _record_batch(rows: List[tuple], schema: pa.Schema, positions: List[int],
+                  nulled: Dict[str, int]) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [_column(columns[pos], field, nulled) for pos, field in zip(positions, schema)], schema=schema,
+    )
+
+class _PartWriter:
+    """One output file, under a temporary name until `publish`; opened lazily so empty partitions produce no file."""
+
+    def __init__(self, path: Path, schema: pa.Schema, fmt: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.tmp_path = path.with_name(f".{path.name}.tmp")
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(str(self.tmp_path), schema, compression="zstd")
+        else:
+            self._writer = ipc.new_file(str(self.tmp_path), schema)
+
+    def write(self, batch: pa.RecordBatch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+    def publish(self):
+        self.tmp_path.replace(self.path)
+
+    def discard(self):
+        try:
+            self._writer.close()
+        except Exception:
+            pass
+        self.tmp_path.unlink(missing_ok=True)
+
+def _load_state(out_dir: Path) -> Dict:
+    path = out_dir / STATE_FILE
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+def _existing_parts(out_dir: Path, ext: str) -> List[Path]:
+    """Part files of previous exports (only files this module writes)."""
+    return list(out_dir.glob(f"**/part-*{ext}"))
+
+def export_catalog(db_path=None, out_dir=None, fmt: str = "parquet", partition_by_source: bool = True,
+                   incremental: bool = False, batch_rows: int = EXPORT_BATCH_ROWS) -> Dict:
+    """
+    Stream unified_courses into `out_dir` as Parquet or Arrow IPC files.
+    A full export replaces the previous part files; an incremental one appends
+    part files holding rows updated since the last export recorded in
+    `out_dir/_export_state.json`. Returns {"rows": n, "files": [...]}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {sorted(FORMATS)})")
+    ext = FORMATS[fmt]
+    out_dir = Path(out_dir or EXPORT_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = _load_state(out_dir)
+    if incremental and state and (state.get("format") != fmt or state.get("partitioned") != partition_by_source):
+        raise ValueError(f"{out_dir} holds a different export layout; run a full export first")
+    since = state.get("updated_at") if incremental else None
+
+    conn = open_conn(db_path or TARGET_DB)
+    conn.row_factory = None
+    schema = _schema(partition_by_source)
+    select = ", ".join(col for col, _, _ in EXPORT_COLUMNS)
+    names = [name for _, name, _ in EXPORT_COLUMNS]
+    positions = [names.index(field.name) for field in schema]
+    where, params = (" WHERE updated_at > ?", [since]) if since else ("", [])
+    order = " ORDER BY source" if partition_by_source else ""
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+
+    # A full export replaces earlier parts, but only once the new ones are complete
+    stale = [] if incremental else _existing_parts(out_dir, ext)
+    source_pos, updated_pos = names.index("source"), names.index("updated_at")
+    writers: Dict[str, _PartWriter] = {}
+    rows_written, high_water = 0, since
+    nulled: Dict[str, int] = {}   # exported name -> unparseable values written as NULL
+    try:
+        cur = conn.execute(f"SELECT {select} FROM {LIVE_TABLE}" + where + order, params)
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            # Split the batch per source; rows arrive ordered by source when partitioning
+            groups: Dict[Optional[str], List[tuple]] = {}
+            for row in rows:
+                groups.setdefault(row[source_pos] if partition_by_source else None, []).append(row)
+            for source, group in groups.items():
+                writer = writers.get(source)
+                if writer is None:
+                    sub = out_dir / f"source={source}" if partition_by_source else out_dir
+                    writer = writers[source] = _PartWriter(sub / f"part-{stamp}{ext}", schema, fmt)
+                writer.write(_record_batch(group, schema, positions, nulled))
+            rows_written += len(rows)
+            batch_max = max((r[updated_pos] for r in rows if r[updated_pos]), default=None)
+            if batch_max and (high_water is None or batch_max > high_water):
+                high_water = batch_max
+        for writer in writers.values():
+            writer.close()
+    except BaseException:
+        # Leave no half-written parts: the previous export stays as it was
+        for writer in writers.values():
+            writer.discard()
+        raise
+    finally:
+        conn.close()
+
+    for writer in writers.values():
+        writer.publish()
+    for part in stale:
+        part.unlink()
+    (out_dir / STATE_FILE).write_text(json.dumps({
+        "format": fmt, "partitioned": partition_by_source, "updated_at": high_water,
+        "exported_at": datetime.utcnow().isoformat(),
+    }, indent=2), encoding="utf-8")
+    files = [str(w.path) for w in writers.values()]
+    for name, count in sorted(nulled.items()):
+        logger.warning("Export: %d unparseable value(s) in column %s written as NULL", count, name)
+    logger.info("Exported %d rows to %d %s file(s) under %s%s", rows_written, len(files), fmt, out_dir,
+                f" (changed since {since})" if since else "")
+    return {"rows": rows_written, "files": files}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export unified_courses to Parquet / Arrow IPC")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--out", default=str(EXPORT_DIR), help="Output directory")
+    parser.add_argument("--no-partition", action="store_true", help="Write a single file instead of source=<x>/ parts")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append only rows updated since the previous export into the same directory")
+    parser.add_argument("--batch-rows", type=int, default=EXPORT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    export_catalog(out_dir=args.out, fmt=args.format, partition_by_source=not args.no_partition,
+                   incremental=args.incremental, batch_rows=args.batch_rows)
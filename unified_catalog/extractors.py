@@ -1,229 +1,583 @@
 import os
 import sqlite3
+import zlib
 from datetime import datetime
-from typing import Dict, Iterable, Iterator, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .logging_config import logger
+from .config import BATCH_SIZE
 from .transform import (
     parse_json_field,
-    merge_unique_lists,
-    normalize_level,
-    parse_weeks,
+    parse_json_field_batch,
+    merge_unique_lists_batch,
+    normalize_level_batch,
+    parse_weeks_batch,
 )
 
-# ---------- Helper: safe column access ----------
-def _col(row: sqlite3.Row, name: str, fallback_cols: List[str] = None):
-    if name in row.keys():
-        return row[name]
-    if fallback_cols:
-        for alt in fallback_cols:
-            if alt in row.keys():
-                return row[alt]
-    return None
+# ---------- Column plans ----------
+# Source columns are declared as data: one entry per extracted field, in the
+# order the extractor unpacks them; a tuple lists fallbacks (first present wins).
+# The plan is compiled once per query from cursor.description into a positional
+# SELECT list (absent columns read as NULL) and rows come back as plain tuples,
+# so adding a field costs no per-row lookups.
+
+COURSERA_COLUMNS = [
+    "id", "name", "url", "product_type", "partners_json", "skills_json", "rating",
+    ("num_ratings", "numProductRatings"), "difficulty", ("duration", "productDuration"),
+    "tagline", "fetched_at",
+]
+
+EDX_COURSE_COLUMNS = [
+    "id", "title", "description", "subject", "level", "language",
+    "weeks_to_complete", "availability", "marketing_url", "card_image_url",
+]
+
+NPTEL_COURSE_COLUMNS = [
+    "course_id", "title", "institute", "professor", "content_type", "discipline_id",
+    "current_run", "self_paced", "url", "last_updated",
+]
+
+def _compile_plan(conn: sqlite3.Connection, table: str, columns: List) -> str:
+    """Resolve declared columns against `table` into a SELECT list in declaration order."""
+    probe = conn.execute(f"SELECT * FROM {table} LIMIT 0")
+    present = {d[0] for d in probe.description}
+    exprs = []
+    for spec in columns:
+        candidates = (spec,) if isinstance(spec, str) else spec
+        exprs.append(next((f'"{c}"' for c in candidates if c in present), "NULL"))
+    return ", ".join(exprs)
+
+def _tuple_cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur
+
+# ---------- Incremental extraction ----------
+# High-water marks per source as (table, column, course key column). A course is
+# re-extracted when any of its rows in these tables moved past the stored mark.
+WATERMARK_COLUMNS = {
+    "coursera": [
+        ("coursera_courses", "fetched_at", "id"),
+    ],
+    "edx": [
+        ("courses", "rowid", "id"),          # scraper never updates courses, only appends
+        ("skills", "id", "course_id"),
+        ("tags", "id", "course_id"),
+        ("staff", "id", "course_id"),
+        ("owners", "id", "course_id"),
+    ],
+    "nptel": [
+        ("courses", "last_updated", "course_id"),
+        ("course_metadata", "id", "course_id"),
+    ],
+}
+
+def _existing_tables(conn: sqlite3.Connection) -> set:
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+def read_high_water(conn: sqlite3.Connection, source: str) -> Dict[str, object]:
+    """Current high-water marks of a source DB, keyed 'table.column'."""
+    tables = _existing_tables(conn)
+    marks: Dict[str, object] = {}
+    for tbl, col, _ in WATERMARK_COLUMNS[source]:
+        if tbl not in tables:
+            continue
+        value = conn.execute(f"SELECT MAX({col}) FROM {tbl}").fetchone()[0]
+        if value is not None:
+            marks[f"{tbl}.{col}"] = value
+    return marks
+
+def _since_clause(conn: sqlite3.Connection, source: str, since: Optional[Dict[str, object]],
+                  key_col: str):
+    """
+    SQL suffix restricting a query to courses touched past the marks in `since`.
+    Returns ("", []) for a full extraction. Tables without a stored mark were
+    empty or absent last time, so all of their rows count as new.
+    """
+    if not since:
+        return "", []
+    tables = _existing_tables(conn)
+    parts: List[str] = []
+    params: List[object] = []
+    for tbl, col, key in WATERMARK_COLUMNS[source]:
+        if tbl not in tables:
+            continue
+        mark = since.get(f"{tbl}.{col}")
+        if mark is None:
+            parts.append(f"SELECT {key} FROM {tbl}")
+        else:
+            parts.append(f"SELECT {key} FROM {tbl} WHERE {col} > ?")
+            params.append(mark)
+    if not parts:
+        return "", []
+    return f" WHERE {key_col} IN ({' UNION '.join(parts)})", params
+
+# ---------- Filters ----------
+# `--where field=v1,v2` filters on unified record fields. Matching is
+# case-insensitive and a missing (NULL) value passes, like
+# helpers.clean_non_english_records. Fields that map straight onto a column of
+# the source's course table are pushed into the source SQL; every filter is
+# checked again on the normalized record (record_matches), which covers fields
+# that only exist after normalization (e.g. level).
+FILTER_FIELDS = ("source", "language", "subject", "level")
+
+# source -> (course table, course key, {filter field: course table column})
+PUSHDOWN_COLUMNS = {
+    "coursera": ("coursera_courses", "id", {}),
+    "edx": ("courses", "id", {"language": "language", "subject": "subject"}),
+    "nptel": ("courses", "course_id", {"subject": "discipline_id"}),
+}
+
+def parse_filters(exprs: Iterable[str]) -> Dict[str, Tuple[str, ...]]:
+    """Parse ["language=english", "level=beginner,intermediate"]; repeated fields must match all."""
+    filters: Dict[str, Tuple[str, ...]] = {}
+    for expr in exprs or []:
+        field, sep, values = expr.partition("=")
+        field = field.strip().lower()
+        if not sep or field not in FILTER_FIELDS:
+            raise ValueError(f"Bad filter {expr!r}: expected field=value[,value...] with field in {FILTER_FIELDS}")
+        allowed = tuple(dict.fromkeys(v.strip().lower() for v in values.split(",") if v.strip()))
+        if not allowed:
+            raise ValueError(f"Bad filter {expr!r}: no values")
+        if field in filters:
+            allowed = tuple(v for v in filters[field] if v in allowed)
+        filters[field] = allowed
+    return filters
+
+def record_matches(record: Dict, filters: Optional[Dict[str, Tuple[str, ...]]]) -> bool:
+    for field, allowed in (filters or {}).items():
+        value = record.get(field)
+        if value is not None and str(value).lower() not in allowed:
+            return False
+    return True
+
+def _pushdown_conditions(conn: sqlite3.Connection, source: str,
+                         filters: Optional[Dict[str, Tuple[str, ...]]]) -> Tuple[List[str], List[object]]:
+    table, _, columns = PUSHDOWN_COLUMNS[source]
+    conds: List[str] = []
+    params: List[object] = []
+    if not filters:
+        return conds, params
+    present = {d[0] for d in conn.execute(f"SELECT * FROM {table} LIMIT 0").description}
+    for field, allowed in filters.items():
+        col = columns.get(field)
+        if col in present:
+            conds.append(f'("{col}" IS NULL OR LOWER("{col}") IN ({", ".join("?" * len(allowed))}))')
+            params.extend(allowed)
+    return conds, params
+
+def _where(conn: sqlite3.Connection, source: str, since: Optional[Dict[str, object]],
+           filters: Optional[Dict[str, Tuple[str, ...]]], key_col: str, on_courses: bool = True,
+           after: Optional[str] = None, partition: Optional[Tuple[int, int]] = None):
+    """
+    _since_clause plus the pushed-down filters. For child tables
+    (`on_courses` False) the filters apply through the parent course.
+    With `after`, only keys whose text form sorts after it (resume point);
+    with `partition` (k, n), only the keys of hash partition k of n.
+    """
+    where, params = _since_clause(conn, source, since, key_col)
+    conds, fparams = _pushdown_conditions(conn, source, filters)
+    if conds and not on_courses:
+        table, course_key, _ = PUSHDOWN_COLUMNS[source]
+        conds = [f"{key_col} IN (SELECT {course_key} FROM {table} WHERE {' AND '.join(conds)})"]
+    if after is not None:
+        conds.append(f"CAST({key_col} AS TEXT) > ?")
+        fparams.append(after)
+    if partition is not None:
+        cond, cparams = _partition_condition(conn, key_col, partition)
+        conds.append(cond)
+        fparams.extend(cparams)
+    if not conds:
+        return where, params
+    return (where + " AND " if where else " WHERE ") + " AND ".join(conds), params + fparams
+
+def count_pushed_down(conn: sqlite3.Connection, source: str, since: Optional[Dict[str, object]],
+                      filters: Optional[Dict[str, Tuple[str, ...]]], after: Optional[str] = None,
+                      partition: Optional[Tuple[int, int]] = None) -> int:
+    """Courses the pushed-down filters keep out of the source query (for the run report)."""
+    conds, fparams = _pushdown_conditions(conn, source, filters)
+    if not conds:
+        return 0
+    table, key, _ = PUSHDOWN_COLUMNS[source]
+    where, params = _where(conn, source, since, None, key, after=after, partition=partition)
+    where = (where + " AND " if where else " WHERE ") + f"NOT ({' AND '.join(conds)})"
+    return conn.execute(f"SELECT COUNT(*) FROM {table}" + where, params + fparams).fetchone()[0]
+
+# ---------- Hash partitions ----------
+# A source can be split into N work units by a stable hash of source_course_id
+# (crc32, identical on every machine, unlike hash()). Unit k of N (1-based) owns
+# the keys with crc32(key) % N == k - 1; the predicate runs inside SQLite
+# through a registered function, so each unit only reads its own rows.
+
+def partition_of(key, n: int) -> int:
+    """0-based hash partition of a source_course_id."""
+    return zlib.crc32(str(key).encode("utf-8")) % n
+
+def parse_partition(spec: str) -> Tuple[int, int]:
+    """'3/8' -> (3, 8): unit 3 of 8, units numbered from 1."""
+    try:
+        k, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Bad partition {spec!r}: expected K/N, e.g. 3/8")
+    if not 1 <= k <= n:
+        raise ValueError(f"Bad partition {spec!r}: need 1 <= K <= N")
+    return k, n
+
+def _partition_condition(conn: sqlite3.Connection, key_col: str, partition: Tuple[int, int]):
+    conn.create_function("etl_partition", 2, partition_of, deterministic=True)
+    k, n = partition
+    return f"etl_partition(CAST({key_col} AS TEXT), ?) = ?", [n, k - 1]
+
+# ---------- Streaming merge-join ----------
+# Parent and child tables are read ordered by the text form of the course key
+# (CAST keeps SQLite's ordering identical to Python str comparison even when
+# ids were stored as integers), so children can be consumed cursor by cursor
+# instead of being preloaded into dicts. SQLite's sorter spills to disk, so
+# memory stays flat however many child rows there are.
+
+def _ordered_child(conn: sqlite3.Connection, sql: str, params: List[object]) -> Iterator[tuple]:
+    """Execute `sql` (first column is the text course key, ordered) on a fresh cursor."""
+    cur = _tuple_cursor(conn)
+    cur.execute(sql, params)
+    return cur
+
+def _merge_join(parents: Iterable, parent_key, children: List[Iterable[tuple]]) -> Iterator[tuple]:
+    """
+    Walk `parents` alongside each child iterator, all ordered by the same text key.
+    Yields (parent_row, [child rows of that parent per child iterator]).
+    Child rows whose key has no parent (orphans) are skipped.
+    """
+    iters = [iter(c) for c in children]
+    heads = [next(it, None) for it in iters]
+    for row in parents:
+        key = parent_key(row)
+        groups = []
+        for i, it in enumerate(iters):
+            head = heads[i]
+            while head is not None and head[0] < key:
+                head = next(it, None)
+            group = []
+            while head is not None and head[0] == key:
+                group.append(head)
+                head = next(it, None)
+            heads[i] = head
+            groups.append(group)
+        yield row, groups
+
+# ---------- Batch normalization ----------
+def _normalize_in_batches(rows: Iterable, normalize_batch, filters: Optional[Dict[str, Tuple[str, ...]]] = None,
+                          size: int = BATCH_SIZE) -> Iterator[Dict]:
+    """Feed `rows` through `normalize_batch` in chunks of `size`, yielding the records that match `filters`."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        batch = normalize_batch(chunk)
+        yield from (r for r in batch if record_matches(r, filters)) if filters else batch
 
 # ---------- EDX ----------
-def extract_edx(edx_conn: sqlite3.Connection) -> Iterator[Dict]:
+EDX_CHILD_TABLES = [
+    ("skills", "skill"),
+    ("tags", "tag"),
+    ("staff", "staff_key"),
+    ("owners", "name"),
+]
+
+def edx_rows(edx_conn: sqlite3.Connection, since: Optional[Dict[str, object]] = None,
+             streaming: bool = False, filters: Optional[Dict[str, Tuple[str, ...]]] = None,
+             after: Optional[str] = None, partition: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[tuple, List[List]]]:
     """
+    Raw edX rows as (course_row, [skills, tags, staff, owners]); see extract_edx.
+
     Expects edX schema:
       courses(id PK, title, description, subject, level, language, weeks_to_complete, availability, marketing_url, card_image_url)
       skills(id, course_id, skill, category, subcategory)
       tags(id, course_id, tag)
       staff(id, course_id, staff_key)
       owners(id, course_id, name)
+
+    `since` (marks from read_high_water) limits extraction to courses whose
+    rows in any of these tables changed after those marks. `filters` (from
+    parse_filters) are pushed into the queries where they map onto a column.
+    Courses come out ordered by the text form of id; `after` skips ids up to
+    and including it (resuming from a checkpoint) and `partition` (k, n) keeps
+    only hash partition k of n.
+
+    With `streaming`, child tables are merge-joined cursor by cursor instead of
+    preloaded.
     """
-    cur = edx_conn.cursor()
-    cur.execute("SELECT * FROM courses")
-    courses = cur.fetchall()
-
-    # Preload skills/tags/staff/owners as dicts -> course_id : list
-    skills_map: Dict[str, List[str]] = {}
-    tags_map: Dict[str, List[str]] = {}
-    staff_map: Dict[str, List[str]] = {}
-    owner_map: Dict[str, List[str]] = {}
-
-    for tbl, col, dest in [
-        ("skills", "skill", skills_map),
-        ("tags", "tag", tags_map),
-        ("staff", "staff_key", staff_map),
-        ("owners", "name", owner_map),
-    ]:
-        try:
-            q = f"SELECT course_id, {col} FROM {tbl}"
-            for row in cur.execute(q):
-                cid = str(row[0])
-                val = row[1]
-                dest.setdefault(cid, []).append(val)
-        except sqlite3.OperationalError:
-            # Table might not exist
-            logger.warning("edX table %s missing; continuing", tbl)
-
-    for row in courses:
-        cid = str(_col(row, "id"))
-        title = _col(row, "title")
-        desc = _col(row, "description")
-        subject = _col(row, "subject")
-        level = normalize_level(_col(row, "level"))
-        language = _col(row, "language")
-        weeks = parse_weeks(_col(row, "weeks_to_complete"))
-        url = _col(row, "marketing_url")
-        image = _col(row, "card_image_url")
-
-        tags = merge_unique_lists(tags_map.get(cid, []))
-        skills = merge_unique_lists(skills_map.get(cid, []))
-        instructors = merge_unique_lists(staff_map.get(cid, []))
-        providers = merge_unique_lists(owner_map.get(cid, []))
-
-        rec = {
-            "source": "edx",
-            "source_course_id": cid,
-            "title": title,
-            "description": desc,
-            "url": url,
-            "provider": ", ".join(providers) if providers else None,
-            "instructors": instructors,
-            "subject": subject,
-            "level": level,
-            "language": language,
-            "duration_weeks": weeks,
-            "tags": tags,
-            "skills": skills,
-            "rating": None,
-            "ratings_count": None,
-            "popularity": None,
-            "image_url": image,
-            "extra": {
-                "availability": _col(row, "availability"),
-            },
-        }
-        yield rec
+    cur = _tuple_cursor(edx_conn)
+    select = _compile_plan(edx_conn, "courses", EDX_COURSE_COLUMNS)
+    where, params = _where(edx_conn, "edx", since, filters, "id", after=after, partition=partition)
+    child_where, child_params = _where(edx_conn, "edx", since, filters, "course_id", on_courses=False,
+                                       after=after, partition=partition)
+
+    if streaming:
+        courses = cur.execute(f"SELECT {select} FROM courses" + where + " ORDER BY CAST(id AS TEXT)", params)
+        children = []
+        for tbl, col in EDX_CHILD_TABLES:
+            try:
+                q = f"SELECT CAST(course_id AS TEXT) AS k, {col} FROM {tbl}" + child_where + " ORDER BY k"
+                children.append(_ordered_child(edx_conn, q, child_params))
+            except sqlite3.OperationalError:
+                logger.warning("edX table %s missing; continuing", tbl)
+                children.append([])
+        joined = (
+            (row, [[r[1] for r in group] for group in groups])
+            for row, groups in _merge_join(courses, lambda r: str(r[0]), children)
+        )
+    else:
+        cur.execute(f"SELECT {select} FROM courses" + where + " ORDER BY CAST(id AS TEXT)", params)
+        courses = cur.fetchall()
+
+        # Preload skills/tags/staff/owners as dicts -> course_id : list
+        maps: List[Dict[str, List[str]]] = []
+        for tbl, col in EDX_CHILD_TABLES:
+            dest: Dict[str, List[str]] = {}
+            try:
+                q = f"SELECT course_id, {col} FROM {tbl}" + child_where
+                for cid, val in cur.execute(q, child_params):
+                    dest.setdefault(str(cid), []).append(val)
+            except sqlite3.OperationalError:
+                # Table might not exist
+                logger.warning("edX table %s missing; continuing", tbl)
+            maps.append(dest)
+        joined = ((row, [m.get(str(row[0]), []) for m in maps]) for row in courses)
+    yield from joined
+
+def normalize_edx_batch(items: List[Tuple[tuple, List[List]]]) -> List[Dict]:
+    """Normalize a batch of edx_rows items, column by column."""
+    if not items:
+        return []
+    rows, children = zip(*items)
+    (cids, titles, descs, subjects, levels, languages, weeks_raw,
+     availability, urls, images) = zip(*rows)
+    skill_vals, tag_vals, staff_vals, owner_vals = zip(*children)
+
+    tags = merge_unique_lists_batch(tag_vals)
+    skills = merge_unique_lists_batch(skill_vals)
+    instructors = merge_unique_lists_batch(staff_vals)
+    providers = merge_unique_lists_batch(owner_vals)
+    levels = normalize_level_batch(levels)
+    weeks = parse_weeks_batch(weeks_raw)
+
+    return [{
+        "source": "edx",
+        "source_course_id": str(cids[i]),
+        "title": titles[i],
+        "description": descs[i],
+        "url": urls[i],
+        "provider": ", ".join(providers[i]) if providers[i] else None,
+        "instructors": instructors[i],
+        "subject": subjects[i],
+        "level": levels[i],
+        "language": languages[i],
+        "duration_weeks": weeks[i],
+        "tags": tags[i],
+        "skills": skills[i],
+        "rating": None,
+        "ratings_count": None,
+        "popularity": None,
+        "image_url": images[i],
+        "extra": {
+            "availability": availability[i],
+        },
+    } for i in range(len(rows))]
+
+def normalize_edx(item: Tuple[tuple, List[List]]) -> Dict:
+    return normalize_edx_batch([item])[0]
+
+def extract_edx(edx_conn: sqlite3.Connection, since: Optional[Dict[str, object]] = None,
+                streaming: bool = False, filters: Optional[Dict[str, Tuple[str, ...]]] = None) -> Iterator[Dict]:
+    """Normalized edX records: edx_rows -> normalize_edx_batch."""
+    return _normalize_in_batches(edx_rows(edx_conn, since=since, streaming=streaming, filters=filters),
+                                 normalize_edx_batch, filters)
 
 # ---------- Coursera ----------
-def extract_coursera(coursera_conn: sqlite3.Connection) -> Iterator[Dict]:
+def coursera_rows(coursera_conn: sqlite3.Connection, since: Optional[Dict[str, object]] = None,
+                  streaming: bool = False, filters: Optional[Dict[str, Tuple[str, ...]]] = None,
+                  after: Optional[str] = None, partition: Optional[Tuple[int, int]] = None) -> Iterator[tuple]:
     """
+    Raw coursera_courses rows; see extract_coursera.
+
     Expects single table: coursera_courses with (at least)
       id (PK), name, url, product_type, partners_json, skills_json, rating,
       num_ratings OR numProductRatings, difficulty, duration/productDuration, tagline, fetched_at
+
+    `since` limits extraction to rows fetched after the stored mark. Rows come
+    out ordered by the text form of id; `after` skips ids up to and including it
+    and `partition` (k, n) keeps only hash partition k of n.
+    Coursera has no child tables, so rows are always streamed off the cursor
+    and `streaming` is accepted only for a uniform extractor signature.
     """
-    cur = coursera_conn.cursor()
+    cur = _tuple_cursor(coursera_conn)
     try:
-        cur.execute("SELECT * FROM coursera_courses")
+        select = _compile_plan(coursera_conn, "coursera_courses", COURSERA_COLUMNS)
+        where, params = _where(coursera_conn, "coursera", since, filters, "id", after=after, partition=partition)
+        cur.execute(f"SELECT {select} FROM coursera_courses" + where + " ORDER BY CAST(id AS TEXT)", params)
     except sqlite3.OperationalError as e:
         logger.error("Coursera table 'coursera_courses' not found: %s", e)
         return
+    yield from cur
 
-    for row in cur.fetchall():
-        cid = str(_col(row, "id"))
-        title = _col(row, "name")
-        url = _col(row, "url")
-        product_type = _col(row, "product_type")
-        partners_json = _col(row, "partners_json")
-        skills_json = _col(row, "skills_json")
-        rating = _col(row, "rating")
-        ratings_count = _col(row, "num_ratings", ["numProductRatings"])
-        difficulty = normalize_level(_col(row, "difficulty"))
-        duration_raw = _col(row, "duration", ["productDuration"])
-        tagline = _col(row, "tagline")
-        fetched_at = _col(row, "fetched_at")
-
-        partners = parse_json_field(partners_json)
-        provider = ", ".join(partners) if partners else None
-        skills = parse_json_field(skills_json)
-
-        weeks = parse_weeks(duration_raw)
-        rec = {
-            "source": "coursera",
-            "source_course_id": cid,
-            "title": title,
-            "description": tagline,
-            "url": url,
-            "provider": provider,
-            "instructors": [],
-            "subject": None,
-            "level": difficulty,
-            "language": None,
-            "duration_weeks": weeks,
-            "tags": [],     # Coursera tags not scraped separately — keep empty
-            "skills": skills,
-            "rating": rating,
-            "ratings_count": ratings_count,
-            "popularity": None,
-            "image_url": None,
-            "extra": {
-                "product_type": product_type,
-                "fetched_at": fetched_at,
-            },
-        }
-        yield rec
+def normalize_coursera_batch(rows: List[tuple]) -> List[Dict]:
+    """Normalize a batch of coursera_rows, column by column."""
+    if not rows:
+        return []
+    (cids, titles, urls, product_types, partners_json, skills_json, ratings,
+     ratings_counts, difficulties, duration_raw, taglines, fetched_at) = zip(*rows)
+    partners = parse_json_field_batch(partners_json)
+    skills = parse_json_field_batch(skills_json)
+    levels = normalize_level_batch(difficulties)
+    weeks = parse_weeks_batch(duration_raw)
+
+    return [{
+        "source": "coursera",
+        "source_course_id": str(cids[i]),
+        "title": titles[i],
+        "description": taglines[i],
+        "url": urls[i],
+        "provider": ", ".join(partners[i]) if partners[i] else None,
+        "instructors": [],
+        "subject": None,
+        "level": levels[i],
+        "language": None,
+        "duration_weeks": weeks[i],
+        "tags": [],     # Coursera tags not scraped separately — keep empty
+        "skills": skills[i],
+        "rating": ratings[i],
+        "ratings_count": ratings_counts[i],
+        "popularity": None,
+        "image_url": None,
+        "extra": {
+            "product_type": product_types[i],
+            "fetched_at": fetched_at[i],
+        },
+    } for i in range(len(rows))]
+
+def normalize_coursera(row: tuple) -> Dict:
+    return normalize_coursera_batch([row])[0]
+
+def extract_coursera(coursera_conn: sqlite3.Connection, since: Optional[Dict[str, object]] = None,
+                     streaming: bool = False, filters: Optional[Dict[str, Tuple[str, ...]]] = None) -> Iterator[Dict]:
+    """Normalized Coursera records: coursera_rows -> normalize_coursera_batch."""
+    return _normalize_in_batches(coursera_rows(coursera_conn, since=since, streaming=streaming, filters=filters),
+                                 normalize_coursera_batch, filters)
 
 # ---------- NPTEL ----------
-def extract_nptel(nptel_conn: sqlite3.Connection) -> Iterator[Dict]:
+def _lesson_concepts(concepts_json, raw_concepts_text) -> List[str]:
+    tags = []
+    if concepts_json:
+        tags.extend(parse_json_field(concepts_json))
+    if raw_concepts_text:
+        tags.extend(parse_json_field(raw_concepts_text))
+    return tags
+
+def nptel_rows(nptel_conn: sqlite3.Connection, since: Optional[Dict[str, object]] = None,
+               streaming: bool = False, filters: Optional[Dict[str, Tuple[str, ...]]] = None,
+               after: Optional[str] = None, partition: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[tuple, List[str]]]:
     """
+    Raw NPTEL rows as (course_row, lesson concepts); see extract_nptel.
+
     NPTEL schema:
       courses(course_id PK, title, institute, professor, content_type, discipline_id,
               current_run, self_paced, url, scraped, last_updated)
       course_metadata(id, course_id FK, lesson_number, lesson_title, concepts_json, raw_concepts_text, fetched_at)
+
+    `since` limits extraction to courses updated, or given new lessons, after the stored marks.
+    Courses come out ordered by the text form of course_id; `after` skips
+    ids up to and including it and `partition` (k, n) keeps only hash
+    partition k of n. With `streaming`, lessons are merge-joined
+    cursor by cursor instead of preloaded.
     """
-    cur = nptel_conn.cursor()
+    cur = _tuple_cursor(nptel_conn)
     try:
-        cur.execute("SELECT * FROM courses")
+        select = _compile_plan(nptel_conn, "courses", NPTEL_COURSE_COLUMNS)
+        where, params = _where(nptel_conn, "nptel", since, filters, "course_id", after=after,
+                               partition=partition)
+        child_where, child_params = _where(nptel_conn, "nptel", since, filters, "course_id", on_courses=False,
+                                           after=after, partition=partition)
+        cur.execute(f"SELECT {select} FROM courses" + where + " ORDER BY CAST(course_id AS TEXT)", params)
     except sqlite3.OperationalError as e:
         logger.error("NPTEL table 'courses' not found: %s", e)
         return
-    courses = cur.fetchall()
 
-    # Collect concepts per course
-    concepts: Dict[str, List[str]] = {}
-    try:
-        for row in cur.execute("SELECT course_id, concepts_json, raw_concepts_text FROM course_metadata"):
-            cid = str(row["course_id"])
-            tags = []
-            if row["concepts_json"]:
-                tags.extend(parse_json_field(row["concepts_json"]))
-            if row["raw_concepts_text"]:
-                tags.extend(parse_json_field(row["raw_concepts_text"]))
-            if tags:
-                concepts.setdefault(cid, []).extend(tags)
-    except sqlite3.OperationalError:
-        # course_metadata might be empty/missing
-        pass
-
-    for row in courses:
-        cid = str(_col(row, "course_id"))
-        title = _col(row, "title")
-        institute = _col(row, "institute")
-        professor = _col(row, "professor")
-        url = _col(row, "url")
-        provider = institute
-        instructors = parse_json_field(professor) if professor else ([professor] if professor else [])
-
-        tags = merge_unique_lists(concepts.get(cid, []))
-
-        rec = {
-            "source": "nptel",
-            "source_course_id": cid,
-            "title": title,
-            "description": None,
-            "url": url,
-            "provider": provider,
-            "instructors": instructors,
-            "subject": _col(row, "discipline_id"),
-            "level": None,
-            "language": None,
-            "duration_weeks": None,
-            "tags": tags,
-            "skills": [],  # not explicitly modeled
-            "rating": None,
-            "ratings_count": None,
-            "popularity": None,
-            "image_url": None,
-            "extra": {
-                "content_type": _col(row, "content_type"),
-                "current_run": _col(row, "current_run"),
-                "self_paced": _col(row, "self_paced"),
-                "last_updated": _col(row, "last_updated"),
-            },
-        }
-        yield rec
+    if streaming:
+        try:
+            q = ("SELECT CAST(course_id AS TEXT) AS k, concepts_json, raw_concepts_text FROM course_metadata"
+                 + child_where + " ORDER BY k")
+            lessons = _ordered_child(nptel_conn, q, child_params)
+        except sqlite3.OperationalError:
+            # course_metadata might be empty/missing
+            lessons = []
+        joined = (
+            (row, [t for lesson in group for t in _lesson_concepts(lesson[1], lesson[2])])
+            for row, (group,) in _merge_join(cur, lambda r: str(r[0]), [lessons])
+        )
+    else:
+        courses = cur.fetchall()
+
+        # Collect concepts per course
+        concepts: Dict[str, List[str]] = {}
+        try:
+            q = "SELECT course_id, concepts_json, raw_concepts_text FROM course_metadata" + child_where
+            for cid, concepts_json, raw_concepts_text in cur.execute(q, child_params):
+                tags = _lesson_concepts(concepts_json, raw_concepts_text)
+                if tags:
+                    concepts.setdefault(str(cid), []).extend(tags)
+        except sqlite3.OperationalError:
+            # course_metadata might be empty/missing
+            pass
+        joined = ((row, concepts.get(str(row[0]), [])) for row in courses)
+
+    yield from joined
+
+def normalize_nptel_batch(items: List[Tuple[tuple, List[str]]]) -> List[Dict]:
+    """Normalize a batch of nptel_rows items, column by column."""
+    if not items:
+        return []
+    rows, course_concepts = zip(*items)
+    (cids, titles, institutes, professors, content_types, discipline_ids,
+     current_runs, self_paced, urls, last_updated) = zip(*rows)
+    instructors = parse_json_field_batch([p if p else None for p in professors])
+    tags = merge_unique_lists_batch(course_concepts)
+
+    return [{
+        "source": "nptel",
+        "source_course_id": str(cids[i]),
+        "title": titles[i],
+        "description": None,
+        "url": urls[i],
+        "provider": institutes[i],
+        "instructors": instructors[i],
+        "subject": discipline_ids[i],
+        "level": None,
+        "language": None,
+        "duration_weeks": None,
+        "tags": tags[i],
+        "skills": [],  # not explicitly modeled
+        "rating": None,
+        "ratings_count": None,
+        "popularity": None,
+        "image_url": None,
+        "extra": {
+            "content_type": content_types[i],
+            "current_run": current_runs[i],
+            "self_paced": self_paced[i],
+            "last_updated": last_updated[i],
+        },
+    } for i in range(len(rows))]
+
+def normalize_nptel(item: Tuple[tuple, List[str]]) -> Dict:
+    return normalize_nptel_batch([item])[0]
+
+def extract_nptel(nptel_conn: sqlite3.Connection, since: Optional[Dict[str, object]] = None,
+                  streaming: bool = False, filters: Optional[Dict[str, Tuple[str, ...]]] = None) -> Iterator[Dict]:
+    """Normalized NPTEL records: nptel_rows -> normalize_nptel_batch."""
+    return _normalize_in_batches(nptel_rows(nptel_conn, since=since, streaming=streaming, filters=filters),
+                                 normalize_nptel_batch, filters)
 
 # ---------- Convenience dispatcher ----------
 def get_extractor(source_name: str):
@@ -235,3 +589,17 @@ def get_extractor(source_name: str):
     if name == "nptel":
         return extract_nptel
     raise ValueError(f"Unknown source: {source_name}")
+
+# Row readers and batch normalizers, for callers that time or batch the two halves separately
+EXTRACT_STAGES = {
+    "edx": (edx_rows, normalize_edx_batch),
+    "coursera": (coursera_rows, normalize_coursera_batch),
+    "nptel": (nptel_rows, normalize_nptel_batch),
+}
+
+def get_stages(source_name: str):
+    """(rows_fn, normalize_batch_fn) for a source; extract == normalize_batch_fn over chunks of rows_fn(...)."""
+    try:
+        return EXTRACT_STAGES[source_name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown source: {source_name}")
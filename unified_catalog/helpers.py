@@ -1,4 +1,5 @@
 import sqlite3
+import zlib
 
 DB_PATH = "unified_courses.db"   # change if needed
 
@@ -14,9 +15,44 @@ def clean_non_english_records(db_path=DB_PATH):
     """)
 
     deleted = cur.rowcount
+    # Let catalog readers drop cached results (see loader.bump_catalog_version)
+    if deleted and cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'catalog_meta'").fetchone():
+        cur.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'")
     conn.commit()
     conn.close()
     print(f"✅ Deleted {deleted} non-English records")
 
+def compact_source_map(db_path=DB_PATH, keep=3):
+    """
+    One-off cleanup for catalogs built before source_map was versioned:
+    compress legacy JSON payloads, keep only the newest `keep` rows per
+    course and VACUUM so the file shrinks back to about one snapshot.
+    Run the ETL once first so ensure_schema has added the new columns.
+    """
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+
+    cur.execute("""
+        DELETE FROM source_map WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY course_id ORDER BY id DESC) AS rn
+                FROM source_map
+            ) WHERE rn > ?
+        );
+    """, (keep,))
+    pruned = cur.rowcount
+
+    legacy = cur.execute(
+        "SELECT id, raw_record_json FROM source_map WHERE raw_record_z IS NULL AND raw_record_json IS NOT NULL"
+    ).fetchall()
+    cur.executemany(
+        "UPDATE source_map SET raw_record_z = ?, raw_record_json = NULL WHERE id = ?",
+        [(zlib.compress(raw.encode("utf-8")), row_id) for row_id, raw in legacy],
+    )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    print(f"✅ Pruned {pruned} old source_map rows, compressed {len(legacy)} legacy payloads")
+
 if __name__ == "__main__":
     clean_non_english_records()
@@ -1,14 +1,28 @@
+import hashlib
 import json
 import sqlite3
+import string
+import zlib
 from datetime import datetime
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from .config import SOURCE_MAP_RETENTION, JSON_BACKEND
 from .logging_config import logger
+from .metrics import StageTimer
 from .db import transaction
 
-UNIFIED_SCHEMA = """
-CREATE TABLE IF NOT EXISTS unified_courses (
-    course_id TEXT PRIMARY KEY,      -- 'source:source_course_id'
+try:
+    import orjson
+except ImportError:   # optional; packing falls back to the stdlib encoder
+    orjson = None
+
+LIVE_TABLE = "unified_courses"
+STAGING_TABLE = "unified_courses_rebuild"   # bulk-loaded by etl --rebuild, then swapped in
+
+UNIFIED_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    row_id INTEGER PRIMARY KEY,      -- declared rowid that course_fts is keyed on (VACUUM and dumps keep it)
+    course_id TEXT NOT NULL UNIQUE,  -- 'source:source_course_id'
     source TEXT NOT NULL,            -- 'edx' | 'coursera' | 'nptel'
     source_course_id TEXT NOT NULL,
     title TEXT,
@@ -28,38 +42,127 @@ CREATE TABLE IF NOT EXISTS unified_courses (
     image_url TEXT,
     created_at TEXT,
     updated_at TEXT,
-    extra_json TEXT                  -- misc source-specific dictionary
+    extra_json TEXT,                 -- misc source-specific dictionary
+    content_hash TEXT                -- hash of the normalized fields; unchanged records are not rewritten
+);
+"""
+
+# Secondary indexes of unified_courses; a rebuild creates them once, after loading
+UNIFIED_INDEX_SQL = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_unified_source_pair ON unified_courses(source, source_course_id);",
+    "CREATE INDEX IF NOT EXISTS idx_unified_title ON unified_courses(title);",
+    "CREATE INDEX IF NOT EXISTS idx_unified_subject ON unified_courses(subject);",
+    "CREATE INDEX IF NOT EXISTS idx_unified_level ON unified_courses(level);",
+]
+
+# Normalized copies of the JSON list columns, kept in sync by bulk_upsert:
+# (json column, value table, value id column, link table, position in _pack_record)
+SIDE_TABLES = [
+    ("skills_json", "skills", "skill_id", "course_skills", 13),
+    ("tags_json", "tags", "tag_id", "course_tags", 12),
+    ("instructors_json", "instructors", "instructor_id", "course_instructors", 7),
+]
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def nocase(text: str) -> str:
+    """`text` folded the way SQLite's NOCASE collation compares it (ASCII letters only): 'É' stays 'É'."""
+    return text.translate(_ASCII_LOWER)
+
+# Full-text index over unified_courses (external content: the FTS table stores
+# only the index and reads text back through row_id for snippets)
+FTS_TABLE = "course_fts"
+FTS_COLUMNS = ["title", "description", "provider", "tags_json", "skills_json"]
+_FTS_COLS = ", ".join(FTS_COLUMNS)
+_FTS_NEW = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_FTS_OLD = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+FTS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    {_FTS_COLS},
+    content='{LIVE_TABLE}', content_rowid='row_id',
+    tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
 );
+"""
+
+# Triggers on unified_courses; DROP TABLE removes them, so a rebuild re-creates them
+UNIFIED_TRIGGER_SQL = [
+    "CREATE TRIGGER IF NOT EXISTS trg_unified_delete_side AFTER DELETE ON unified_courses BEGIN "
+    + " ".join(f"DELETE FROM {links} WHERE course_id = old.course_id;" for _, _, _, links, _ in SIDE_TABLES)
+    + " END;",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_unified_fts_insert AFTER INSERT ON {LIVE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLS}) VALUES (new.row_id, {_FTS_NEW});
+    END;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_unified_fts_delete AFTER DELETE ON {LIVE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLS}) VALUES ('delete', old.row_id, {_FTS_OLD});
+    END;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_unified_fts_update AFTER UPDATE OF {_FTS_COLS} ON {LIVE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLS}) VALUES ('delete', old.row_id, {_FTS_OLD});
+        INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLS}) VALUES (new.row_id, {_FTS_NEW});
+    END;""",
+]
 
-CREATE UNIQUE INDEX IF NOT EXISTS idx_unified_source_pair
-ON unified_courses(source, source_course_id);
+FTS_TRIGGERS = ("trg_unified_fts_insert", "trg_unified_fts_delete", "trg_unified_fts_update")
 
-CREATE INDEX IF NOT EXISTS idx_unified_title ON unified_courses(title);
-CREATE INDEX IF NOT EXISTS idx_unified_subject ON unified_courses(subject);
-CREATE INDEX IF NOT EXISTS idx_unified_level ON unified_courses(level);
+UNIFIED_SCHEMA = UNIFIED_TABLE_SQL.format(table=LIVE_TABLE) + "\n".join(UNIFIED_INDEX_SQL) + """
 
 CREATE TABLE IF NOT EXISTS source_map (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     course_id TEXT NOT NULL,         -- FK-ish to unified_courses.course_id
     source TEXT NOT NULL,
     source_course_id TEXT NOT NULL,
-    raw_record_json TEXT,
-    recorded_at TEXT
+    raw_record_json TEXT,            -- legacy uncompressed payload (rows written before raw_record_z)
+    recorded_at TEXT,
+    content_hash TEXT,               -- unified_courses.content_hash of this version
+    raw_record_z BLOB                -- zlib-compressed JSON of the normalized record
 );
 CREATE INDEX IF NOT EXISTS idx_source_map_course ON source_map(course_id);
-"""
 
-INSERT_SQL = """
-INSERT INTO unified_courses (
+CREATE TABLE IF NOT EXISTS etl_watermarks (
+    source TEXT NOT NULL,            -- 'edx' | 'coursera' | 'nptel'
+    mark TEXT NOT NULL,              -- 'table.column' in the source DB
+    value,                           -- high-water value (text timestamp or integer id)
+    updated_at TEXT,
+    PRIMARY KEY (source, mark)
+);
+
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,            -- 'version': bumped by every commit that changes unified_courses;
+                                     -- 'neighbors_params': what course_neighbors was computed with
+    value
+);
+
+CREATE TABLE IF NOT EXISTS etl_checkpoints (
+    source TEXT PRIMARY KEY,         -- source of an unfinished run
+    last_key TEXT NOT NULL,          -- last committed source_course_id (extraction is ordered by it)
+    batch INTEGER NOT NULL,          -- number of that batch within the run
+    updated_at TEXT,
+    marks TEXT                       -- JSON high-water marks read when the run began
+);
+""" + "\n".join(f"""
+CREATE TABLE IF NOT EXISTS {values} (
+    {id_col} INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE   -- interned value
+);
+CREATE TABLE IF NOT EXISTS {links} (
+    course_id TEXT NOT NULL,
+    {id_col} INTEGER NOT NULL,
+    PRIMARY KEY (course_id, {id_col})
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_{links}_value ON {links}({id_col}, course_id);
+""" for _, values, id_col, links, _ in SIDE_TABLES) + FTS_SQL + "\n".join(UNIFIED_TRIGGER_SQL)
+
+INSERT_SQL_TEMPLATE = """
+INSERT INTO {table} (
     course_id, source, source_course_id, title, description, url, provider,
     instructors_json, subject, level, language, duration_weeks,
     tags_json, skills_json, rating, ratings_count, popularity, image_url,
-    created_at, updated_at, extra_json
+    created_at, updated_at, extra_json, content_hash
 ) VALUES (
     ?,?,?,?,?,?,
     ?,?,?,?,?,
     ?,?,?,?, ?,?,?,
-    ?,?,?
+    ?,?,?,?
 )
 ON CONFLICT(course_id) DO UPDATE SET
     title=excluded.title,
@@ -78,66 +181,473 @@ ON CONFLICT(course_id) DO UPDATE SET
     popularity=excluded.popularity,
     image_url=excluded.image_url,
     updated_at=excluded.updated_at,
-    extra_json=excluded.extra_json
+    extra_json=excluded.extra_json,
+    content_hash=excluded.content_hash
 ;
 """
+INSERT_SQL = INSERT_SQL_TEMPLATE.format(table=LIVE_TABLE)
 
 INSERT_SOURCE_MAP_SQL = """
-INSERT INTO source_map (course_id, source, source_course_id, raw_record_json, recorded_at)
-VALUES (?, ?, ?, ?, ?);
+INSERT INTO source_map (course_id, source, source_course_id, content_hash, raw_record_z, recorded_at)
+VALUES (?, ?, ?, ?, ?, ?);
+"""
+
+# Keep only the newest `keep` versions of one course
+PRUNE_SOURCE_MAP_SQL = """
+DELETE FROM source_map
+WHERE course_id = ?
+  AND id NOT IN (SELECT id FROM source_map WHERE course_id = ? ORDER BY id DESC LIMIT ?);
 """
 
+# Columns added after the first release; ALTERed into older unified DBs
+ADDED_COLUMNS = {
+    "unified_courses": [("content_hash", "TEXT")],
+    "source_map": [("content_hash", "TEXT"), ("raw_record_z", "BLOB")],
+    "etl_checkpoints": [("marks", "TEXT")],
+}
+
 def ensure_schema(conn: sqlite3.Connection):
     cur = conn.cursor()
+    tables = {r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for table, columns in ADDED_COLUMNS.items():
+        existing = [r[1] for r in cur.execute(f"PRAGMA table_info({table})")]
+        if not existing:
+            continue  # fresh DB, created below with all columns
+        for name, decl in columns:
+            if name not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+    conn.commit()
+    if LIVE_TABLE in tables and "row_id" not in [r[1] for r in cur.execute(f"PRAGMA table_info({LIVE_TABLE})")]:
+        _add_row_id(conn)
     cur.executescript(UNIFIED_SCHEMA)
     conn.commit()
+    if LIVE_TABLE in tables and "course_skills" not in tables:
+        # Catalog predates the side tables: backfill them once
+        with transaction(conn):
+            rebuild_side_tables(conn)
+    if LIVE_TABLE in tables and FTS_TABLE not in tables:
+        rebuild_search_index(conn)
+        conn.commit()
+
+def _add_row_id(conn: sqlite3.Connection):
+    """
+    Copy a catalog from before row_id into the current layout, keeping each
+    course's implicit rowid as its row_id so the existing course_fts stays valid.
+    ensure_schema re-creates the indexes and triggers dropped with the old table.
+    """
+    cols = ", ".join(r[1] for r in conn.execute(f"PRAGMA table_info({LIVE_TABLE})"))
+    migrated = f"{LIVE_TABLE}_migrate"
+    with transaction(conn):
+        conn.execute(f"DROP TABLE IF EXISTS {migrated}")
+        conn.execute(UNIFIED_TABLE_SQL.format(table=migrated))
+        conn.execute(f"INSERT INTO {migrated} (row_id, {cols}) SELECT rowid, {cols} FROM {LIVE_TABLE}")
+        conn.execute(f"DROP TABLE {LIVE_TABLE}")
+        conn.execute(f"ALTER TABLE {migrated} RENAME TO {LIVE_TABLE}")
+    logger.info("Added row_id to unified_courses")
+
+def rebuild_search_index(conn: sqlite3.Connection):
+    """Re-index course_fts from unified_courses (after a swap or backfill)."""
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+def drop_fts_triggers(conn: sqlite3.Connection):
+    """
+    Stop maintaining course_fts row by row (for bulk writes followed by
+    rebuild_search_index, or partition staging DBs that are never searched).
+    ensure_schema / finish_rebuild create the triggers again.
+    """
+    for name in FTS_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+def rebuild_side_tables(conn: sqlite3.Connection):
+    """Re-derive every side table from the JSON columns of unified_courses (caller owns the transaction)."""
+    for json_col, values, id_col, links, _ in SIDE_TABLES:
+        conn.execute(f"DELETE FROM {links}")
+        conn.execute(f"INSERT OR IGNORE INTO {values}(name) "
+                     f"SELECT j.value FROM {LIVE_TABLE} u, json_each(u.{json_col}) j")
+        conn.execute(f"INSERT OR IGNORE INTO {links}(course_id, {id_col}) "
+                     f"SELECT u.course_id, v.{id_col} FROM {LIVE_TABLE} u, json_each(u.{json_col}) j "
+                     f"JOIN {values} v ON v.name = j.value")
+
+def _sync_side_tables(cur: sqlite3.Cursor, changed: List[List]):
+    """Replace the side-table links of freshly written packed records."""
+    for _, values, id_col, links, pos in SIDE_TABLES:
+        cur.executemany(f"DELETE FROM {links} WHERE course_id = ?", [(p[0],) for p in changed])
+        cur.executemany(f"INSERT OR IGNORE INTO {values}(name) SELECT value FROM json_each(?)",
+                        [(p[pos],) for p in changed])
+        cur.executemany(f"INSERT OR IGNORE INTO {links}(course_id, {id_col}) "
+                        f"SELECT ?, v.{id_col} FROM json_each(?) j JOIN {values} v ON v.name = j.value",
+                        [(p[0], p[pos]) for p in changed])
+
+def course_ids_for_value(conn: sqlite3.Connection, kind: str, name: str) -> List[str]:
+    """Course ids linked to a skill/tag/instructor (`kind` is the value table), case-insensitive."""
+    for _, values, id_col, links, _ in SIDE_TABLES:
+        if values == kind:
+            rows = conn.execute(
+                f"SELECT l.course_id FROM {values} v JOIN {links} l ON l.{id_col} = v.{id_col} WHERE v.name = ?",
+                (name,),
+            )
+            return [r[0] for r in rows]
+    raise ValueError(f"Unknown side table: {kind}")
+
+def begin_rebuild(conn: sqlite3.Connection):
+    """Create an empty staging copy of unified_courses with no secondary indexes."""
+    with transaction(conn):
+        conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        conn.execute(UNIFIED_TABLE_SQL.format(table=STAGING_TABLE))
 
-def _pack_record(rec: Dict) -> List:
+def abort_rebuild(conn: sqlite3.Connection):
+    with transaction(conn):
+        conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+
+def finish_rebuild(conn: sqlite3.Connection, rebuilt_sources: Iterable[str]):
+    """
+    Swap the staging table in place of unified_courses in one transaction.
+    Rows of sources that were not rebuilt are carried over first, then the
+    secondary indexes are built once over the complete table. WAL readers keep
+    seeing the old catalog until the commit, never a half-built one.
+    """
+    rebuilt = list(rebuilt_sources)
+    # Carried-over rows get fresh row_ids after the staged ones; the index is rebuilt below
+    cols = ", ".join(r[1] for r in conn.execute(f"PRAGMA table_info({STAGING_TABLE})") if r[1] != "row_id")
+    with transaction(conn):
+        conn.execute(
+            f"INSERT INTO {STAGING_TABLE} ({cols}) SELECT {cols} FROM {LIVE_TABLE} "
+            f"WHERE source NOT IN ({','.join('?' * len(rebuilt))})",
+            rebuilt,
+        )
+        conn.execute(f"DROP TABLE {LIVE_TABLE}")
+        conn.execute(f"ALTER TABLE {STAGING_TABLE} RENAME TO {LIVE_TABLE}")
+        for stmt in UNIFIED_INDEX_SQL + UNIFIED_TRIGGER_SQL:
+            conn.execute(stmt)
+        rebuild_side_tables(conn)
+        rebuild_search_index(conn)
+        bump_catalog_version(conn)
+
+# ---------- Partition merge ----------
+# Hash-partitioned runs (etl.run(partition=...)) load into their own staging
+# DBs; merging ATTACHes one and folds its new or changed rows (by content_hash)
+# into the live table through the normal upsert, so created_at, side tables,
+# the search index and source_map retention end up exactly as for a direct load.
+# Merged rows are stamped updated_at = merge time, when they reach the catalog,
+# so incremental exports (export.py) pick them up like any other change.
+# Staging DBs carry no search index (etl drops their FTS triggers).
+
+MERGE_COLUMNS = [
+    "course_id", "source", "source_course_id", "title", "description", "url", "provider",
+    "instructors_json", "subject", "level", "language", "duration_weeks",
+    "tags_json", "skills_json", "rating", "ratings_count", "popularity", "image_url",
+    "created_at", "updated_at", "extra_json", "content_hash",
+]   # INSERT_SQL order, so fetched rows are packed records
+
+def merge_partition_db(conn: sqlite3.Connection, part_path, retention: Optional[int] = SOURCE_MAP_RETENTION,
+                       chunk: int = 5000) -> Dict[str, int]:
+    """
+    Fold the unified_courses / source_map rows of a partition staging DB into
+    this catalog in one transaction. Returns {"inserted": n, "updated": n, "unchanged": n}.
+    """
+    conn.execute("ATTACH DATABASE ? AS part", (str(part_path),))
+    try:
+        with transaction(conn):
+            cur = conn.cursor()
+            cur.execute("DROP TABLE IF EXISTS temp.merge_ids")
+            cur.execute(f"""
+                CREATE TEMP TABLE merge_ids AS
+                SELECT p.course_id, u.course_id IS NULL AS is_new
+                FROM part.{LIVE_TABLE} p LEFT JOIN main.{LIVE_TABLE} u ON u.course_id = p.course_id
+                WHERE u.course_id IS NULL OR u.content_hash IS NOT p.content_hash
+            """)
+            total = cur.execute(f"SELECT COUNT(*) FROM part.{LIVE_TABLE}").fetchone()[0]
+            inserted, changed = cur.execute("SELECT COALESCE(SUM(is_new), 0), COUNT(*) FROM temp.merge_ids").fetchone()
+            live = cur.execute(f"SELECT COUNT(*) FROM main.{LIVE_TABLE}").fetchone()[0]
+            # Past about a fifth of the catalog, one FTS rebuild is cheaper than per-row trigger upkeep
+            reindex = changed * 5 > live + inserted
+            if reindex:
+                drop_fts_triggers(conn)
+
+            rows = conn.execute(f"SELECT {', '.join('p.' + c for c in MERGE_COLUMNS)} FROM part.{LIVE_TABLE} p "
+                                f"JOIN temp.merge_ids m ON m.course_id = p.course_id")
+            now, updated_pos = datetime.utcnow().isoformat(), MERGE_COLUMNS.index("updated_at")
+            while True:
+                packed = [list(r) for r in rows.fetchmany(chunk)]
+                if not packed:
+                    break
+                for r in packed:
+                    r[updated_pos] = now
+                cur.executemany(INSERT_SQL, packed)
+                _sync_side_tables(cur, packed)
+            if reindex:
+                rebuild_search_index(conn)
+                for stmt in UNIFIED_TRIGGER_SQL:
+                    cur.execute(stmt)
+
+            # Current version of each merged course (the newest source_map row of the partition)
+            cur.execute("""
+                INSERT INTO main.source_map (course_id, source, source_course_id, raw_record_json, recorded_at,
+                                             content_hash, raw_record_z)
+                SELECT s.course_id, s.source, s.source_course_id, s.raw_record_json, s.recorded_at,
+                       s.content_hash, s.raw_record_z
+                FROM part.source_map s JOIN temp.merge_ids m ON m.course_id = s.course_id
+                WHERE s.id = (SELECT MAX(id) FROM part.source_map WHERE course_id = s.course_id)
+                ORDER BY s.id
+            """)
+            if retention:
+                cur.execute("SELECT course_id FROM temp.merge_ids")
+                ids = [r[0] for r in cur.fetchall()]
+                cur.executemany(PRUNE_SOURCE_MAP_SQL, [(cid, cid, retention) for cid in ids])
+            cur.execute("DROP TABLE temp.merge_ids")
+            if changed:
+                bump_catalog_version(conn)
+    finally:
+        conn.execute("DETACH DATABASE part")
+    return {"inserted": inserted, "updated": changed - inserted, "unchanged": total - changed}
+
+# Readers (reader.CatalogReader) cache query results per catalog version
+BUMP_VERSION_SQL = """
+INSERT INTO catalog_meta (key, value) VALUES ('version', 1)
+ON CONFLICT(key) DO UPDATE SET value = value + 1;
+"""
+
+def bump_catalog_version(conn: sqlite3.Connection):
+    """Mark unified_courses as changed (call inside the writing transaction)."""
+    conn.execute(BUMP_VERSION_SQL)
+
+def catalog_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+    return row[0] if row else 0
+
+def load_watermarks(conn: sqlite3.Connection, source: str) -> Dict[str, object]:
+    rows = conn.execute("SELECT mark, value FROM etl_watermarks WHERE source = ?", (source,))
+    return {mark: value for mark, value in rows}
+
+def save_watermarks(conn: sqlite3.Connection, source: str, marks: Dict[str, object]):
+    """Record the high-water marks a successful extraction of `source` reached."""
     now = datetime.utcnow().isoformat()
-    course_id = f"{rec['source']}:{rec['source_course_id']}"
-    instructors_json = json.dumps(rec.get("instructors") or [], ensure_ascii=False)
-    tags_json = json.dumps(rec.get("tags") or [], ensure_ascii=False)
-    skills_json = json.dumps(rec.get("skills") or [], ensure_ascii=False)
-    extra_json = json.dumps(rec.get("extra") or {}, ensure_ascii=False)
-
-    return [
-        course_id, rec.get("source"), rec.get("source_course_id"),
+    with transaction(conn):
+        conn.executemany(
+            """
+            INSERT INTO etl_watermarks (source, mark, value, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(source, mark) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at
+            """,
+            [(source, mark, value, now) for mark, value in marks.items()],
+        )
+
+# ---------- Checkpoints ----------
+# Written in the same transaction as each live-table batch, so after a crash
+# the checkpoint names exactly the last batch that made it to disk. Cleared
+# when the source finishes; `etl.run(resume=True)` continues after last_key and,
+# once done, saves the marks the interrupted run began with (rows before
+# last_key that changed since then are only picked up by the next run).
+
+CHECKPOINT_SQL = """
+INSERT INTO etl_checkpoints (source, last_key, batch, updated_at, marks) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(source) DO UPDATE SET last_key=excluded.last_key, batch=excluded.batch, updated_at=excluded.updated_at
+"""
+
+def load_checkpoint(conn: sqlite3.Connection, source: str) -> Optional[Tuple[str, int, Optional[Dict[str, object]]]]:
+    """(last_key, batch, high-water marks the run began with) of an unfinished run of `source`, or None."""
+    row = conn.execute("SELECT last_key, batch, marks FROM etl_checkpoints WHERE source = ?", (source,)).fetchone()
+    return (row[0], row[1], json.loads(row[2]) if row[2] is not None else None) if row else None
+
+def clear_checkpoint(conn: sqlite3.Connection, source: str):
+    with transaction(conn):
+        conn.execute("DELETE FROM etl_checkpoints WHERE source = ?", (source,))
+
+# ---------- Record packing ----------
+# The stdlib encoder's compact, non-ASCII-escaped text is the canonical form of
+# JSON columns and content hashes. orjson writes the same text except for floats
+# in exponent form (1e16 vs 1e+16) or not finite (null vs NaN); objects holding
+# one of those go through the stdlib, so hashes do not depend on the backend.
+
+def _json_dumps_stdlib(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _floats_print_alike(obj) -> bool:
+    """False if `obj` holds a float (value or key) that orjson prints differently from the stdlib."""
+    if isinstance(obj, dict):
+        if not all(type(k) is str for k in obj) and not _floats_print_alike(list(obj)):
+            return False
+        obj = obj.values()
+    elif not isinstance(obj, (list, tuple)):
+        obj = (obj,)
+    for v in obj:
+        t = type(v)
+        if t is str or v is None or t is int or t is bool:
+            continue
+        if isinstance(v, float):
+            if not (v == 0 or 1e-4 <= abs(v) < 1e16):   # NaN fails both tests
+                return False
+        elif isinstance(v, (dict, list, tuple)) and not _floats_print_alike(v):
+            return False
+    return True
+
+def _json_dumps_orjson(obj) -> str:
+    if not _floats_print_alike(obj):
+        return _json_dumps_stdlib(obj)
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    except TypeError:   # values orjson refuses (ints past 64 bits, non-JSON types)
+        return _json_dumps_stdlib(obj)
+
+def resolve_json_backend(name: str = JSON_BACKEND) -> str:
+    """'auto' picks orjson when it is installed, else the stdlib encoder."""
+    if name == "auto":
+        return "orjson" if orjson is not None else "json"
+    if name not in ("orjson", "json"):
+        raise ValueError(f"Unknown JSON backend: {name}")
+    if name == "orjson" and orjson is None:
+        raise ImportError("JSON_BACKEND='orjson' but orjson is not installed")
+    return name
+
+JSON_BACKEND_NAME = resolve_json_backend()
+json_dumps = _json_dumps_orjson if JSON_BACKEND_NAME == "orjson" else _json_dumps_stdlib
+
+# Record fields stored as JSON columns; every other field is a plain column
+JSON_FIELDS = ("instructors", "tags", "skills", "extra")
+
+def _pack_record(rec: Dict, now: str) -> Tuple[List, bytes]:
+    """
+    INSERT_SQL row and source_map payload (UTF-8 JSON object) of one record.
+    Each value is serialized once: the JSON columns are encoded on their own
+    and spliced into the payload after the plain fields, and the content hash
+    is the payload's sha1. `now` stamps created_at/updated_at.
+    """
+    instructors_json = json_dumps(rec.get("instructors") or [])
+    tags_json = json_dumps(rec.get("tags") or [])
+    skills_json = json_dumps(rec.get("skills") or [])
+    extra_json = json_dumps(rec.get("extra") or {})
+    head = json_dumps({k: v for k, v in rec.items() if k not in JSON_FIELDS})
+    payload = ((f'{head[:-1]},' if len(head) > 2 else "{")
+               + f'"instructors":{instructors_json},"tags":{tags_json},"skills":{skills_json},"extra":{extra_json}}}'
+               ).encode("utf-8")
+    fields = [
+        f"{rec['source']}:{rec['source_course_id']}", rec.get("source"), rec.get("source_course_id"),
         rec.get("title"), rec.get("description"), rec.get("url"), rec.get("provider"),
         instructors_json, rec.get("subject"), rec.get("level"), rec.get("language"),
         rec.get("duration_weeks"),
         tags_json, skills_json, rec.get("rating"), rec.get("ratings_count"),
         rec.get("popularity"), rec.get("image_url"),
-        now, now, extra_json
+        now, now, extra_json, hashlib.sha1(payload).hexdigest(),
     ]
+    return fields, payload
+
+def decode_source_map_payload(raw_record_json: Optional[str], raw_record_z: Optional[bytes]) -> Optional[Dict]:
+    """Decode a source_map row's payload, compressed or legacy."""
+    if raw_record_z is not None:
+        return json.loads(zlib.decompress(raw_record_z).decode("utf-8"))
+    if raw_record_json is not None:
+        return json.loads(raw_record_json)
+    return None
 
-def bulk_upsert(conn: sqlite3.Connection, records: Iterable[Dict], batch_size: int = 500):
+def _stored_state(conn: sqlite3.Connection, course_ids: List[str]) -> Dict[str, tuple]:
+    """course_id -> (content_hash, created_at, updated_at) of rows already in the live table."""
+    state: Dict[str, tuple] = {}
+    # Stay under SQLITE_MAX_VARIABLE_NUMBER on older builds
+    for i in range(0, len(course_ids), 500):
+        chunk = course_ids[i:i + 500]
+        q = (f"SELECT course_id, content_hash, created_at, updated_at FROM {LIVE_TABLE} "
+             f"WHERE course_id IN ({','.join('?' * len(chunk))})")
+        for cid, content_hash, created_at, updated_at in conn.execute(q, chunk):
+            state[cid] = (content_hash, created_at, updated_at)
+    return state
+
+def bulk_upsert(conn: sqlite3.Connection, records: Iterable[Dict], batch_size: int = 500,
+                retention: Optional[int] = SOURCE_MAP_RETENTION, table: str = LIVE_TABLE,
+                timer: Optional[StageTimer] = None,
+                checkpoint: Optional[Tuple[str, int, Dict[str, object]]] = None) -> Dict[str, int]:
     """
     Upsert records in batches (transaction per batch).
     Also records the raw source row in source_map for traceability.
+
+    Records whose content hash matches the stored one are skipped entirely
+    (no row rewrite, no updated_at bump, no source_map entry), so source_map
+    only gains a version when a course's content changes. Payloads are stored
+    zlib-compressed, and with `retention` only the newest N versions per
+    course survive; pruning happens inside the batch transaction.
+
+    With `table` set to the rebuild staging table every record is written
+    there, while counts, source_map versions and the created_at/updated_at
+    stamps carried into the staged rows still come from the live table.
+    Time spent packing, writing and committing is added to `timer`.
+
+    Every batch that changes the live table bumps catalog_meta's version.
+
+    With `checkpoint` = (source, batch number, high-water marks of the run),
+    every batch transaction also records the batch's last source_course_id in
+    etl_checkpoints (records must arrive ordered by it); batches with nothing
+    to write still commit that row. The marks are kept from the first batch.
+    Returns {"inserted": n, "updated": n, "unchanged": n}.
     """
     cur = conn.cursor()
-    batch_params = []
-    batch_source_map = []
+    insert_sql = INSERT_SQL if table == LIVE_TABLE else INSERT_SQL_TEMPLATE.format(table=table)
+    timer = timer or StageTimer()
+    batch_records = []
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
 
     def flush():
-        if not batch_params:
+        if not batch_records:
             return
-        with transaction(conn):
-            cur.executemany(INSERT_SQL, batch_params)
-            cur.executemany(INSERT_SOURCE_MAP_SQL, batch_source_map)
-        logger.info("Upserted %d records", len(batch_params))
-        batch_params.clear()
-        batch_source_map.clear()
+        now = datetime.utcnow().isoformat()   # created/updated/recorded stamp of the whole batch
+        with timer.stage("pack"):
+            packed_batch = [_pack_record(rec, now) for rec in batch_records]
+            batch_params = [packed for packed, _ in packed_batch]
+        with timer.stage("write"):
+            stored = _stored_state(conn, [p[0] for p in batch_params])
+        changed = []
+        changed_source_map = []
+        staging = table != LIVE_TABLE
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        with timer.stage("pack"):
+            for (packed, payload), rec in zip(packed_batch, batch_records):
+                course_id, content_hash = packed[0], packed[-1]
+                prev = stored.get(course_id)
+                if prev is None:
+                    counts["inserted"] += 1
+                elif prev[0] != content_hash:
+                    counts["updated"] += 1
+                    if staging:
+                        packed[18] = prev[1]
+                else:
+                    counts["unchanged"] += 1
+                    if staging:
+                        packed[18], packed[19] = prev[1], prev[2]
+                        changed.append(packed)
+                    continue
+                stored[course_id] = (content_hash, packed[18], packed[19])
+                changed.append(packed)
+                changed_source_map.append([course_id, rec.get("source"), rec.get("source_course_id"),
+                                           content_hash, zlib.compress(payload), now])
+        if changed or checkpoint:
+            try:
+                with timer.stage("write"):
+                    conn.execute("BEGIN")
+                    if changed:
+                        cur.executemany(insert_sql, changed)
+                        if not staging:
+                            _sync_side_tables(cur, changed)
+                        cur.executemany(INSERT_SOURCE_MAP_SQL, changed_source_map)
+                        if retention:
+                            cur.executemany(PRUNE_SOURCE_MAP_SQL,
+                                            [(sm[0], sm[0], retention) for sm in changed_source_map])
+                        if not staging:
+                            bump_catalog_version(conn)
+                    if checkpoint:
+                        cur.execute(CHECKPOINT_SQL, (checkpoint[0], batch_params[-1][2], checkpoint[1], now,
+                                                     json.dumps(checkpoint[2])))
+                with timer.stage("commit"):
+                    conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        logger.info("Upserted %d records (inserted=%d updated=%d unchanged=%d)", len(batch_params),
+                    counts["inserted"], counts["updated"], counts["unchanged"])
+        for k, v in counts.items():
+            stats[k] += v
+        batch_records.clear()
 
     for rec in records:
-        packed = _pack_record(rec)
-        batch_params.append(packed)
-        # store source_map with the raw normalized rec (not the original DB row)
-        raw_json = json.dumps(rec, ensure_ascii=False)
-        course_id = f"{rec['source']}:{rec['source_course_id']}"
-        batch_source_map.append([course_id, rec.get("source"), rec.get("source_course_id"), raw_json, datetime.utcnow().isoformat()])
-
-        if len(batch_params) >= batch_size:
+        batch_records.append(rec)
+        if len(batch_records) >= batch_size:
             flush()
 
     flush()
+    return stats
@@ -0,0 +1,67 @@
+"""
+Stage timing and run reports for the ETL.
+
+Stages are timed at batch granularity (never per record), so instrumentation
+stays on for every run. CPU time is per thread: extract/transform run on the
+extracting thread, pack/write/commit on the writer thread (writer.py).
+  extract   — SQLite reads and child-table joins (extractors.*_rows)
+  transform — per-record normalization (extractors.normalize_*)
+  pack      — _pack_record: JSON serialization + content hashing
+  write     — change detection reads and INSERT/UPSERT statements
+  commit    — COMMIT of each batch transaction
+"""
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+STAGES = ("extract", "transform", "pack", "write", "commit")
+
+class StageTimer:
+    """Accumulates wall and calling-thread CPU seconds (and call counts) per named stage."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            st = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            st["wall_s"] += time.perf_counter() - wall
+            st["cpu_s"] += time.thread_time() - cpu
+            st["calls"] += 1
+
+    def merge(self, stages: Dict[str, Dict[str, float]]):
+        """Fold in another timer's `stages` (e.g. shipped back from a worker process)."""
+        for name, part in stages.items():
+            st = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            for k, v in part.items():
+                st[k] += v
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        ordered = [s for s in STAGES if s in self.stages] + [s for s in self.stages if s not in STAGES]
+        return {name: {k: round(v, 4) for k, v in self.stages[name].items()} for name in ordered}
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None where `resource` is unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024   # bytes on macOS, KiB elsewhere
+    return round(peak / unit, 1)
+
+def write_run_report(path: Path, report: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    tmp.replace(path)
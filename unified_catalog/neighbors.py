@@ -0,0 +1,283 @@
+"""
+Materialized "related courses": the top NEIGHBORS_K neighbors of every course
+in course_neighbors(course_id, neighbor_id, score, rank), so serving them is
+one primary-key range read (related()).
+
+A pair's score blends three signals with NEIGHBOR_WEIGHTS: the TF-IDF cosine
+of the similar-courses index (similar.py, refreshed first), the cosine of
+the two skill sets (the index's 's:' terms) and a bonus for the same
+provider, given only to pairs that already share text or skills. Courses are
+scored in blocks of rows against the whole catalog: sparse gathers
+(similar.dot_rows) over the postings of rare terms plus one dense matrix
+product over the few very frequent terms, spread over a process pool that
+memory-maps the prepared arrays.
+
+After an incremental ETL only neighborhoods touched by a change are
+recomputed: the changed and new courses themselves, courses that listed a
+changed or deleted course, and courses whose k-th best score a changed
+course now beats. Other pair scores cannot move, because refreshes of the
+index never re-weight unchanged rows; a refit of the index (or new K or
+weights) recomputes everything.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    TARGET_DB, SIMILAR_DIR, NEIGHBORS_K, NEIGHBOR_WEIGHTS, NEIGHBORS_BLOCK_CELLS, NEIGHBORS_WORKERS,
+    NEIGHBORS_DENSE_DF, NEIGHBORS_DENSE_TERMS,
+)
+from .db import open_conn, transaction
+from .loader import LIVE_TABLE
+from .logging_config import logger
+from .similar import SimilarityIndex, dot_rows, segments, transpose, refresh as refresh_similar
+
+NEIGHBORS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS course_neighbors (
+    course_id TEXT NOT NULL,
+    neighbor_id TEXT NOT NULL,
+    score REAL NOT NULL,       -- NEIGHBOR_WEIGHTS blend, higher is closer
+    rank INTEGER NOT NULL,     -- 1 = closest
+    PRIMARY KEY (course_id, rank)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_course_neighbors_neighbor ON course_neighbors(neighbor_id);
+CREATE TABLE IF NOT EXISTS course_neighbor_state (
+    course_id TEXT PRIMARY KEY,
+    content_hash TEXT,         -- unified_courses.content_hash the neighbors were computed from
+    kth_score REAL NOT NULL    -- score of the k-th neighbor, 0 while there are fewer
+) WITHOUT ROWID;
+"""
+
+# Per-run arrays handed to the workers (as .npy files they memory-map): for each
+# signal its rows, the postings of its rare terms and a dense matrix of its frequent ones
+SIGNAL_ARRAYS = ("indptr", "indices", "data", "cols_indptr", "cols_indices", "cols_data", "dense_pos", "dense")
+SIGNALS = ("text", "skill")
+WORK_ARRAYS = tuple(f"{signal}_{name}" for signal in SIGNALS for name in SIGNAL_ARRAYS) + ("provider", "kth")
+
+def ensure_neighbors_schema(conn: sqlite3.Connection):
+    conn.executescript(NEIGHBORS_SCHEMA)
+    conn.commit()
+
+# ---------- Block scoring (runs in the workers) ----------
+
+_WORK: Dict[str, np.ndarray] = {}
+
+def _init_worker(work_dir: str, k: int, weights: Dict[str, float]):
+    _WORK.update({name: np.load(Path(work_dir) / f"{name}.npy", mmap_mode="r") for name in WORK_ARRAYS})
+    _WORK.update(k=k, weights=weights)
+
+def _signal_scores(signal: str, rows: np.ndarray, n: int) -> np.ndarray:
+    """Dot products of `rows` with every course: gathered over rare terms, one matrix product over frequent ones."""
+    indptr, indices, data, *cols, dense_pos, dense = (_WORK[f"{signal}_{name}"] for name in SIGNAL_ARRAYS)
+    scores = dot_rows((indptr, indices, data), tuple(cols), rows, n)
+    if len(dense):
+        lengths = indptr[rows + 1] - indptr[rows]
+        pos = segments(indptr[rows], lengths)
+        slot = dense_pos[indices[pos]]
+        hit = slot >= 0
+        block = np.zeros((len(rows), len(dense)), dtype=np.float32)
+        block[np.repeat(np.arange(len(rows)), lengths)[hit], slot[hit]] = data[pos][hit]
+        scores += block @ dense
+    return scores
+
+def _score_block(task: Tuple[np.ndarray, bool]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Best neighbors (rows, scores; best first) of the block's rows. With
+    `probe`, also the rows whose k-th best score one of the block's rows beats.
+    """
+    rows, probe = task
+    weights, provider = _WORK["weights"], _WORK["provider"]
+    n = len(provider)
+    scores = weights["text"] * _signal_scores("text", rows, n)
+    if weights["skills"]:
+        scores += weights["skills"] * _signal_scores("skill", rows, n)
+    if weights["provider"]:
+        own = provider[rows][:, None]
+        scores += weights["provider"] * ((own == provider[None, :]) & (own >= 0) & (scores > 0))
+    scores[np.arange(len(rows)), rows] = 0.0
+    touched = np.flatnonzero((scores > _WORK["kth"]).any(axis=0)) if probe else np.zeros(0, dtype=np.int64)
+    k = min(_WORK["k"], n - 1)
+    if k <= 0:
+        return rows, np.zeros((len(rows), 0), dtype=np.int64), np.zeros((len(rows), 0)), touched
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return rows, np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1), touched
+
+def _map_blocks(rows: np.ndarray, probe: bool, block: int, init_args: tuple, workers: int) -> Iterator[tuple]:
+    tasks = [(rows[i:i + block], probe) for i in range(0, len(rows), block)]
+    if workers <= 1 or len(tasks) <= 1:
+        _init_worker(*init_args)
+        try:
+            yield from map(_score_block, tasks)
+        finally:
+            _WORK.clear()
+        return
+    with mp.Pool(min(workers, len(tasks)), initializer=_init_worker, initargs=init_args) as pool:
+        yield from pool.imap_unordered(_score_block, tasks)
+
+# ---------- Refresh ----------
+
+def _split_signal(rows_csr: Tuple[np.ndarray, ...], cols_csr: Tuple[np.ndarray, ...], n: int) -> Dict[str, np.ndarray]:
+    """
+    Worker arrays of one signal. Terms in at least NEIGHBORS_DENSE_DF of the
+    courses (the NEIGHBORS_DENSE_TERMS most frequent of them) would dominate
+    every gather with their long postings; they go into a dense term x course
+    matrix instead, and only the rest keep postings.
+    """
+    cols_indptr, cols_indices, cols_data = cols_csr
+    df = np.diff(cols_indptr)
+    frequent = np.flatnonzero(df >= max(NEIGHBORS_DENSE_DF * n, 1))
+    frequent = frequent[np.argsort(-df[frequent], kind="stable")[:NEIGHBORS_DENSE_TERMS]]
+    dense_pos = np.full(len(df), -1, dtype=np.int32)
+    dense_pos[frequent] = np.arange(len(frequent))
+    dense = np.zeros((len(frequent), n), dtype=np.float32)
+    for slot, term in enumerate(frequent.tolist()):
+        lo, hi = cols_indptr[term], cols_indptr[term + 1]
+        dense[slot, cols_indices[lo:hi]] = cols_data[lo:hi]
+    rare = dense_pos < 0
+    rare_indptr = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(np.where(rare, df, 0), out=rare_indptr[1:])
+    in_rare = np.repeat(rare, df)
+    return dict(zip(SIGNAL_ARRAYS, (*rows_csr, rare_indptr, cols_indices[in_rare], cols_data[in_rare],
+                                    dense_pos, dense)))
+
+def _skill_matrix(index: SimilarityIndex) -> Tuple[Tuple[np.ndarray, ...], Tuple[np.ndarray, ...]]:
+    """Unit-length binary skill vectors (the index's 's:' columns) as CSR rows, and their transpose."""
+    vocab = index.vocab()
+    is_skill = np.fromiter((t.startswith("s:") for t in vocab), dtype=bool, count=len(vocab))
+    indptr, indices, _ = index.rows()
+    keep = is_skill[indices]
+    row_of_nnz = np.repeat(np.arange(len(index)), np.diff(indptr))[keep]
+    counts = np.bincount(row_of_nnz, minlength=len(index))
+    skill_indptr = np.zeros(len(index) + 1, dtype=np.int64)
+    np.cumsum(counts, out=skill_indptr[1:])
+    skill_indices = np.asarray(indices[keep])
+    skill_data = (1 / np.sqrt(counts[row_of_nnz])).astype(np.float32)
+    rows = (skill_indptr, skill_indices, skill_data)
+    return rows, transpose(*rows, len(vocab))
+
+def _provider_codes(conn: sqlite3.Connection, course_ids: List[str]) -> np.ndarray:
+    """Small integer per distinct provider (case-insensitive), -1 without one, in index row order."""
+    providers = {cid: (p or "").strip().lower() for cid, p in conn.execute(
+        f"SELECT course_id, provider FROM {LIVE_TABLE}")}
+    codes: Dict[str, int] = {"": -1}
+    return np.fromiter((codes.setdefault(providers.get(cid, ""), len(codes) - 1) for cid in course_ids),
+                       dtype=np.int32, count=len(course_ids))
+
+def refresh_neighbors(conn: sqlite3.Connection, index_dir: Optional[Path] = None, k: int = NEIGHBORS_K,
+                      weights: Optional[Dict[str, float]] = None, full: bool = False,
+                      workers: Optional[int] = NEIGHBORS_WORKERS) -> Dict[str, int]:
+    """
+    Refresh the similar-courses index in `index_dir`, then bring
+    course_neighbors up to date with it in one transaction. Returns course /
+    recomputed / changed / removed / stored-pair counts and whether every
+    course was recomputed.
+    """
+    weights = dict(NEIGHBOR_WEIGHTS, **(weights or {}))
+    index_dir = Path(index_dir or SIMILAR_DIR)
+    ensure_neighbors_schema(conn)
+    refresh_similar(conn, index_dir)
+    index = SimilarityIndex(index_dir)
+    n = len(index)
+
+    params = json.dumps({"k": k, "weights": weights, "similar_fit": index.meta["fitted_at"]}, sort_keys=True)
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'neighbors_params'").fetchone()
+    full = full or row is None or row[0] != params
+    state = {} if full else {cid: (h, kth) for cid, h, kth in conn.execute(
+        "SELECT course_id, content_hash, kth_score FROM course_neighbor_state")}
+    changed = np.array([i for i, (cid, h) in enumerate(zip(index.course_ids, index.content_hashes))
+                        if cid not in state or state[cid][0] != h], dtype=np.int64)
+    removed = [cid for cid in state if cid not in index._row_of]
+    stats = {"courses": n, "recomputed": 0, "changed": len(changed), "removed": len(removed), "pairs": 0,
+             "full": int(full)}
+    if not full and not len(changed) and not removed:
+        logger.info("Course neighbors: up to date (%d courses)", n)
+        return stats
+
+    ids = index.course_ids
+    kth = np.fromiter((state.get(cid, (None, 0.0))[1] for cid in ids), dtype=np.float64, count=n)
+    block = max(1, NEIGHBORS_BLOCK_CELLS // max(n, 1))
+    workers = workers or os.cpu_count() or 1
+
+    def write(results: Iterable[tuple]) -> set:
+        touched = set()
+        for rows, top, scores, probed in results:
+            rows, top, scores = rows.tolist(), top.tolist(), scores.tolist()
+            if not full:
+                conn.executemany("DELETE FROM course_neighbors WHERE course_id = ?", [(ids[r],) for r in rows])
+            pairs = [(ids[r], ids[j], s, rank) for r, nbrs, ss in zip(rows, top, scores)
+                     for rank, (j, s) in enumerate(zip(nbrs, ss), 1) if s > 0]
+            conn.executemany("INSERT INTO course_neighbors (course_id, neighbor_id, score, rank) VALUES (?, ?, ?, ?)",
+                             pairs)
+            conn.executemany(
+                "INSERT OR REPLACE INTO course_neighbor_state (course_id, content_hash, kth_score) VALUES (?, ?, ?)",
+                [(ids[r], index.content_hashes[r], ss[k - 1] if len(ss) >= k else 0.0)
+                 for r, ss in zip(rows, scores)],
+            )
+            stats["recomputed"] += len(rows)
+            stats["pairs"] += len(pairs)
+            touched.update(probed.tolist())
+        return touched
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        arrays = {f"text_{name}": a for name, a in _split_signal(index.rows(), index.cols(), n).items()}
+        arrays.update((f"skill_{name}", a) for name, a in _split_signal(*_skill_matrix(index), n).items())
+        arrays.update(provider=_provider_codes(conn, ids), kth=kth)
+        for name, array in arrays.items():
+            np.save(Path(work_dir) / f"{name}.npy", array)
+        init_args = (work_dir, k, weights)
+        with transaction(conn):
+            if full:
+                conn.execute("DELETE FROM course_neighbors")
+                conn.execute("DELETE FROM course_neighbor_state")
+                write(_map_blocks(np.arange(n), False, block, init_args, workers))
+            else:
+                stale = [ids[i] for i in changed.tolist()] + removed
+                listing = {index._row_of[cid] for cid, in conn.execute(
+                    "SELECT DISTINCT course_id FROM course_neighbors "
+                    "WHERE neighbor_id IN (SELECT value FROM json_each(?))", (json.dumps(stale),),
+                ) if cid in index._row_of}
+                touched = write(_map_blocks(changed, True, block, init_args, workers))
+                again = np.array(sorted((listing | touched) - set(changed.tolist())), dtype=np.int64)
+                write(_map_blocks(again, False, block, init_args, workers))
+                for table in ("course_neighbors", "course_neighbor_state"):
+                    conn.execute(f"DELETE FROM {table} WHERE course_id IN (SELECT value FROM json_each(?))",
+                                 (json.dumps(removed),))
+            conn.execute("INSERT INTO catalog_meta (key, value) VALUES ('neighbors_params', ?) "
+                         "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (params,))
+
+    logger.info("Course neighbors: %d of %d courses recomputed (%d changed, %d removed), %d pairs stored%s",
+                stats["recomputed"], n, stats["changed"], stats["removed"], stats["pairs"],
+                " (full)" if full else "")
+    return stats
+
+def related(conn: sqlite3.Connection, course_id: str, limit: int = NEIGHBORS_K) -> List[Tuple[str, float]]:
+    """Stored (neighbor_id, score) of a course, best first."""
+    return conn.execute(
+        "SELECT neighbor_id, score FROM course_neighbors WHERE course_id = ? ORDER BY rank LIMIT ?",
+        (course_id, limit),
+    ).fetchall()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize the top-K related courses of every course")
+    parser.add_argument("course_id", nargs="?", help="Print the stored neighbors of this course")
+    parser.add_argument("--refresh", action="store_true", help="Recompute neighborhoods touched by changes")
+    parser.add_argument("--full", action="store_true", help="With --refresh: recompute every course")
+    parser.add_argument("--workers", type=int, default=NEIGHBORS_WORKERS, help="Scoring processes (default: cores)")
+    args = parser.parse_args()
+
+    conn = open_conn(TARGET_DB)
+    if args.refresh or args.full:
+        refresh_neighbors(conn, full=args.full, workers=args.workers)
+    if args.course_id:
+        for cid, score in related(conn, args.course_id):
+            print(f"{score:.3f}  {cid}")
+    conn.close()
@@ -0,0 +1,269 @@
+"""
+Course recommendations from quiz weaknesses.
+
+The quiz app (demo-quiz-app/backend, QUIZ_DB) records every answered
+question in result_per_question, and questions carry a label_id. Answers are
+pooled per entry of the QUIZ_LABEL_MAP lookup table, which maps a label id,
+or a whole label family by its letter prefix ("PROG004", else "PROG"), to
+catalog skills and tags. Per user and label the smoothed mastery is
+(correct + QUIZ_PRIOR_CORRECT) / (answers + QUIZ_PRIOR_ANSWERS), so one wrong
+answer weighs less than ten; its weakness is how far it falls below
+QUIZ_MASTERY_TARGET, and only a user's QUIZ_WEAKEST_LABELS weakest labels count.
+
+A course covers a label by the QUIZ_TERM_WEIGHTS-weighted share of the label's
+skills and tags it is linked to (skill/tag side tables); each label keeps its
+QUIZ_COURSES_PER_LABEL best courses as candidates. Scoring is batched: users
+with the same weak labels form one weakness matrix (users x labels, divided by
+each user's total weakness) multiplied by the coverage of those labels over
+their candidates (labels x courses), so a score is the share of the user's
+weakness a course addresses. A few bulk SQL reads feed the whole batch;
+store_recommendations() materializes the result in quiz_recommendations.
+"""
+import argparse
+import json
+import sqlite3
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    TARGET_DB, QUIZ_DB, QUIZ_LABEL_MAP, QUIZ_RECS_K, QUIZ_PRIOR_CORRECT, QUIZ_PRIOR_ANSWERS, QUIZ_MASTERY_TARGET,
+    QUIZ_WEAKEST_LABELS, QUIZ_TERM_WEIGHTS, QUIZ_COURSES_PER_LABEL, QUIZ_BLOCK_CELLS,
+)
+from .db import open_conn, open_readonly, transaction
+from .loader import SIDE_TABLES, nocase
+from .logging_config import logger
+
+RECS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_recommendations (
+    user_id INTEGER NOT NULL,  -- users.id of the quiz app
+    rank INTEGER NOT NULL,     -- 1 = best
+    course_id TEXT NOT NULL,
+    score REAL NOT NULL,       -- share of the user's quiz weakness the course covers
+    PRIMARY KEY (user_id, rank)
+) WITHOUT ROWID;
+"""
+
+QUESTION_LABELS_SQL = "SELECT id, label_id FROM questions WHERE label_id IS NOT NULL AND label_id != ''"
+# One row per answered question; points is 1 for a correct answer
+ANSWERS_SQL = """
+SELECT r.user_id, rpq.question_id, COALESCE(rpq.points, 0) > 0
+FROM result_per_question rpq
+JOIN results r ON r.id = rpq.result_id
+"""
+_FETCH_ROWS = 100_000
+
+Weaknesses = Tuple[np.ndarray, np.ndarray, np.ndarray]   # (user_ids, label indexes, weakness), sorted by user
+_NO_WEAKNESSES: Weaknesses = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+
+def ensure_recs_schema(conn: sqlite3.Connection):
+    conn.executescript(RECS_SCHEMA)
+    conn.commit()
+
+def load_label_map(path: Optional[Path] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Lookup table {label id or prefix: {"skills": [...], "tags": [...]}}."""
+    return json.loads(Path(path or QUIZ_LABEL_MAP).read_text(encoding="utf-8"))
+
+def label_key(label_id: str, label_map: Dict[str, Dict[str, List[str]]]) -> Optional[str]:
+    """Lookup entry of a quiz label: the label itself, else its letter prefix."""
+    label_id = label_id.strip()
+    if label_id in label_map:
+        return label_id
+    prefix = label_id.rstrip("0123456789")
+    return prefix if prefix in label_map else None
+
+# ---------- Weaknesses ----------
+
+def weaknesses(quiz_conn: sqlite3.Connection, labels: List[str],
+               label_map: Dict[str, Dict[str, List[str]]]) -> Weaknesses:
+    """(user, label, weakness) of each user's weakest labels, `labels` being the lookup keys."""
+    key_index = {key: i for i, key in enumerate(labels)}
+    questions = sorted(quiz_conn.execute(QUESTION_LABELS_SQL).fetchall())
+    unmapped = {raw for _, raw in questions if label_key(raw, label_map) is None}
+    if unmapped:
+        logger.info("Quiz labels without a lookup entry (answers ignored): %d", len(unmapped))
+    if not questions:
+        return _NO_WEAKNESSES
+    question_ids = np.array([q for q, _ in questions], dtype=np.int64)
+    question_label = np.array([key_index.get(label_key(raw, label_map), -1) for _, raw in questions] + [-1],
+                              dtype=np.int64)   # trailing -1: unlabeled questions
+
+    # Pool answers per (user, lookup entry), one chunk of rows at a time
+    pairs, right = [], []
+    cur = quiz_conn.execute(ANSWERS_SQL)
+    for rows in iter(lambda: cur.fetchmany(_FETCH_ROWS), []):
+        user, question, correct = np.fromiter(chain.from_iterable(rows), dtype=np.int64,
+                                              count=3 * len(rows)).reshape(-1, 3).T
+        pos = np.searchsorted(question_ids, question)
+        pos[question_ids[np.minimum(pos, len(question_ids) - 1)] != question] = len(question_ids)
+        label = question_label[pos]
+        keep = label >= 0
+        pairs.append(user[keep] * len(labels) + label[keep])
+        right.append(correct[keep])
+    if not sum(len(p) for p in pairs):
+        return _NO_WEAKNESSES
+    pairs, inverse = np.unique(np.concatenate(pairs), return_inverse=True)
+    correct = np.bincount(inverse, weights=np.concatenate(right))
+    answers = np.bincount(inverse).astype(np.float64)
+    weak = QUIZ_MASTERY_TARGET - (correct + QUIZ_PRIOR_CORRECT) / (answers + QUIZ_PRIOR_ANSWERS)
+    users, label = pairs // len(labels), pairs % len(labels)
+
+    # Keep each user's QUIZ_WEAKEST_LABELS weakest labels below the target
+    order = np.lexsort((label, -weak, users))
+    users, label, weak = users[order], label[order], weak[order]
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    rank = np.arange(len(users)) - np.repeat(starts, np.diff(np.r_[starts, len(users)]))
+    keep = (weak > 0) & (rank < QUIZ_WEAKEST_LABELS)
+    return users[keep], label[keep], weak[keep]
+
+# ---------- Coverage ----------
+
+def label_coverage(conn: sqlite3.Connection, labels: List[str],
+                   label_map: Dict[str, Dict[str, List[str]]]) -> Tuple[List[str], np.ndarray]:
+    """(course_ids, labels x courses coverage) over the courses linked to any mapped skill or tag."""
+    total = np.zeros(len(labels))
+    pairs = []   # (label, course_id, weight)
+    for _, values, id_col, links, _ in SIDE_TABLES:
+        weight = QUIZ_TERM_WEIGHTS.get(values)
+        if not weight:
+            continue
+        uses: Dict[str, List[int]] = {}   # value folded like NOCASE -> labels listing it
+        for i, key in enumerate(labels):
+            names = {nocase(name.strip()) for name in label_map[key].get(values, []) if name.strip()}
+            total[i] += weight * len(names)
+            for name in names:
+                uses.setdefault(name, []).append(i)
+        if not uses:
+            continue
+        # name is COLLATE NOCASE, so the IN list matches case-insensitively
+        for name, cid in conn.execute(
+            f"SELECT v.name, l.course_id FROM {values} v JOIN {links} l ON l.{id_col} = v.{id_col} "
+            f"WHERE v.name IN (SELECT value FROM json_each(?))", (json.dumps(sorted(uses)),)
+        ):
+            pairs.extend((i, cid, weight) for i in uses[nocase(name)])
+    if not pairs:
+        return [], np.zeros((len(labels), 0), dtype=np.float32)
+    rows, cids, weights = (np.array(a) for a in zip(*pairs))
+    course_ids, cols = np.unique(cids, return_inverse=True)
+    cover = np.zeros((len(labels), len(course_ids)), dtype=np.float32)
+    np.add.at(cover, (rows, cols), weights / total[rows])
+    return course_ids.tolist(), cover
+
+# ---------- Scoring ----------
+
+def label_columns(cover: np.ndarray, limit: Optional[int] = None) -> List[np.ndarray]:
+    """Course columns covering each label, at most `limit` (default QUIZ_COURSES_PER_LABEL) best ones."""
+    limit = QUIZ_COURSES_PER_LABEL if limit is None else limit
+    out = []
+    for row in cover:
+        cols = np.flatnonzero(row)
+        if limit and len(cols) > limit:
+            cols = np.sort(cols[np.lexsort((cols, -row[cols]))[:limit]])
+        out.append(cols)
+    return out
+
+def score_users(weak: Weaknesses, cover: np.ndarray,
+                k: int = QUIZ_RECS_K) -> Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yield (user_ids, top course columns, scores), best first, per group of users
+    with the same weak labels: their weakness block (users x labels) @ the
+    coverage of those labels over the labels' candidate courses.
+    """
+    users, label, w = weak
+    if not len(users):
+        return
+    n_labels = cover.shape[0]
+    user_ids, starts, counts = np.unique(users, return_index=True, return_counts=True)
+    row = np.repeat(np.arange(len(user_ids)), counts)
+    pos = np.arange(len(users)) - np.repeat(starts, counts)
+    labels = np.full((len(user_ids), counts.max()), n_labels)   # padding sorts last
+    weights = np.zeros(labels.shape, dtype=np.float32)
+    labels[row, pos], weights[row, pos] = label, w
+    order = np.argsort(labels, axis=1, kind="stable")
+    labels, weights = np.take_along_axis(labels, order, axis=1), np.take_along_axis(weights, order, axis=1)
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    columns = label_columns(cover)
+    keys, group = np.unique(labels, axis=0, return_inverse=True)
+    members = np.argsort(group, kind="stable")
+    bounds = np.r_[0, np.cumsum(np.bincount(group, minlength=len(keys)))]
+    for g, key in enumerate(keys):
+        key = key[key < n_labels]
+        cols = np.sort(np.concatenate([columns[l] for l in key]))
+        cols = cols[np.r_[True, cols[1:] != cols[:-1]]] if len(cols) else cols
+        kk = min(k, len(cols))
+        if kk <= 0:
+            continue
+        block = cover[np.ix_(key, cols)]
+        step = max(1, QUIZ_BLOCK_CELLS // len(cols))
+        for lo in range(bounds[g], bounds[g + 1], step):
+            rows = members[lo:min(lo + step, bounds[g + 1])]
+            scores = weights[rows, :len(key)] @ block
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.lexsort((top, -top_scores), axis=1)
+            yield (user_ids[rows], cols[np.take_along_axis(top, order, axis=1)],
+                   np.take_along_axis(top_scores, order, axis=1))
+
+def recommend(conn: sqlite3.Connection, quiz_conn: sqlite3.Connection, k: int = QUIZ_RECS_K,
+              user_ids: Optional[Iterable[int]] = None,
+              label_map: Optional[Dict[str, Dict[str, List[str]]]] = None) -> Dict[int, List[Tuple[str, float]]]:
+    """{user_id: [(course_id, score), ...]} for every user with a weak label (or just `user_ids`)."""
+    label_map = load_label_map() if label_map is None else label_map
+    labels = sorted(label_map)
+    weak = weaknesses(quiz_conn, labels, label_map)
+    if user_ids is not None:
+        mask = np.isin(weak[0], np.fromiter(user_ids, dtype=np.int64))
+        weak = tuple(a[mask] for a in weak)
+    course_ids, cover = label_coverage(conn, labels, label_map)
+    out: Dict[int, List[Tuple[str, float]]] = {}
+    for users, top, scores in score_users(weak, cover, k):
+        for user, cols, ss in zip(users.tolist(), top.tolist(), scores.tolist()):
+            out[user] = [(course_ids[c], s) for c, s in zip(cols, ss) if s > 0]
+    logger.info("Quiz recommendations: %d users with weak labels, %d with courses (%d candidate courses)",
+                len(np.unique(weak[0])), len(out), len(course_ids))
+    return out
+
+def store_recommendations(conn: sqlite3.Connection, recs: Dict[int, List[Tuple[str, float]]],
+                          users: Optional[Iterable[int]] = None):
+    """Write `recs` to quiz_recommendations, replacing `users`' rows (None: the whole table)."""
+    ensure_recs_schema(conn)
+    with transaction(conn):
+        if users is None:
+            conn.execute("DELETE FROM quiz_recommendations")
+        else:
+            conn.execute("DELETE FROM quiz_recommendations WHERE user_id IN (SELECT value FROM json_each(?))",
+                         (json.dumps([int(u) for u in users]),))
+        conn.executemany("INSERT INTO quiz_recommendations (user_id, rank, course_id, score) VALUES (?, ?, ?, ?)",
+                         [(user, rank, cid, score) for user, courses in recs.items()
+                          for rank, (cid, score) in enumerate(courses, 1)])
+
+def stored(conn: sqlite3.Connection, user_id: int, limit: int = QUIZ_RECS_K) -> List[Tuple[str, float]]:
+    """Stored (course_id, score) of a user, best first."""
+    return conn.execute(
+        "SELECT course_id, score FROM quiz_recommendations WHERE user_id = ? ORDER BY rank LIMIT ?",
+        (user_id, limit),
+    ).fetchall()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend courses for the weakest quiz labels of each user")
+    parser.add_argument("users", nargs="*", type=int, help="Print recommendations for these quiz users")
+    parser.add_argument("-k", type=int, default=QUIZ_RECS_K)
+    parser.add_argument("--quiz-db", type=Path, default=QUIZ_DB)
+    parser.add_argument("--label-map", type=Path, default=QUIZ_LABEL_MAP)
+    parser.add_argument("--store", action="store_true", help="Score every user and store quiz_recommendations")
+    args = parser.parse_args()
+
+    conn, quiz_conn = open_conn(TARGET_DB), open_readonly(args.quiz_db)
+    label_map = load_label_map(args.label_map)
+    recs = recommend(conn, quiz_conn, k=args.k, user_ids=None if args.store else args.users, label_map=label_map)
+    if args.store:
+        store_recommendations(conn, recs)
+    for user in args.users:
+        print(f"user {user}:")
+        for cid, score in recs.get(user, []):
+            print(f"  {score:.3f}  {cid}")
+    quiz_conn.close()
+    conn.close()
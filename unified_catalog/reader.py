@@ -0,0 +1,321 @@
+"""
+Read API over the unified catalog.
+
+    reader = CatalogReader()                        # TARGET_DB by default
+    reader.get("edx:abc")                           # Course or None
+    reader.get_many(["edx:abc", "nptel:noc1"])      # input order, None for unknown ids
+    reader.find(subject="Data Science", level="beginner", limit=20)
+    reader.by_skill("Python")
+    reader.related("edx:abc")                       # [(Course, score)] from course_neighbors
+    reader.select('skill:python AND skill:statistics AND NOT skill:r AND level:beginner')
+    reader.count('skill:python OR tag:"data science"')
+
+Every thread gets its own read-only connection (URI mode=ro, mmap). Query
+results go into a bounded LRU cache that is valid for one catalog version
+(catalog_meta, bumped by every commit that changes unified_courses; see
+loader.bump_catalog_version). The version is only re-read after
+PRAGMA data_version reports a commit from another connection, so a repeated
+lookup is one in-memory pragma and a dict hit: no page reads, no JSON decoding.
+select() and count() evaluate boolean filters on an in-memory bitmap index
+(bitmaps.py) that is rebuilt on first use after the version moves.
+"""
+import argparse
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .config import READER_CACHE_SIZE, TARGET_DB
+from .db import open_readonly
+from .loader import LIVE_TABLE, catalog_version, nocase
+
+COURSE_COLUMNS = (
+    "course_id", "source", "source_course_id", "title", "description", "url", "provider",
+    "instructors_json", "subject", "level", "language", "duration_weeks",
+    "tags_json", "skills_json", "rating", "ratings_count", "popularity", "image_url",
+    "created_at", "updated_at", "extra_json",
+)
+_COLS = ", ".join(f"u.{c}" for c in COURSE_COLUMNS)
+
+# Fixed statements, so each connection's statement cache prepares them once
+BY_ID_SQL = f"SELECT {_COLS} FROM {LIVE_TABLE} u WHERE u.course_id = ?"
+BY_IDS_SQL = f"SELECT {_COLS} FROM {LIVE_TABLE} u WHERE u.course_id IN (SELECT value FROM json_each(?))"
+BY_SKILL_SQL = f"""
+    SELECT {_COLS} FROM skills v
+    JOIN course_skills l ON l.skill_id = v.skill_id
+    JOIN {LIVE_TABLE} u ON u.course_id = l.course_id
+    WHERE v.name = ?
+    ORDER BY u.course_id LIMIT ? OFFSET ?
+"""
+RELATED_SQL = f"""
+    SELECT {_COLS}, n.score FROM course_neighbors n
+    JOIN {LIVE_TABLE} u ON u.course_id = n.neighbor_id
+    WHERE n.course_id = ?
+    ORDER BY n.rank LIMIT ?
+"""
+FIND_FIELDS = ("source", "subject", "level", "provider", "language")
+
+_MISS = object()
+
+class Course:
+    """
+    One unified_courses row, kept as the fetched tuple. Plain columns are
+    attributes (`course.title`); `instructors`, `tags` and `skills` (tuples)
+    and `extra` (read-only mapping) are decoded from their JSON columns on
+    first access. Cached instances are shared between callers, hence immutable.
+    """
+    __slots__ = ("_row", "_decoded")
+
+    def __init__(self, row: tuple):
+        self._row = row
+        self._decoded: Optional[Dict[int, object]] = None
+
+    def _json(self, i: int, decode: Callable):
+        decoded = self._decoded
+        if decoded is None:
+            decoded = self._decoded = {}
+        try:
+            return decoded[i]
+        except KeyError:
+            value = decoded[i] = decode(self._row[i])
+            return value
+
+    def to_dict(self) -> Dict:
+        """Plain dict with decoded lists, like the normalized ETL record."""
+        out = {}
+        for i, name in enumerate(COURSE_COLUMNS):
+            if name.endswith("_json"):
+                value = getattr(self, name[:-5])
+                out[name[:-5]] = dict(value) if name == "extra_json" else list(value)
+            else:
+                out[name] = self._row[i]
+        return out
+
+    def __eq__(self, other):
+        return isinstance(other, Course) and self._row == other._row
+
+    def __hash__(self):
+        return hash(self._row[0])
+
+    def __repr__(self):
+        return f"Course({self._row[0]!r}, title={self._row[3]!r})"
+
+def _decode_list(raw: Optional[str]) -> tuple:
+    return tuple(json.loads(raw)) if raw else ()
+
+def _decode_dict(raw: Optional[str]):
+    return MappingProxyType(json.loads(raw) if raw else {})
+
+def _column(i: int):
+    return property(lambda self: self._row[i])
+
+def _json_column(i: int, decode: Callable):
+    return property(lambda self: self._json(i, decode))
+
+for _i, _name in enumerate(COURSE_COLUMNS):
+    if _name.endswith("_json"):
+        setattr(Course, _name[:-5], _json_column(_i, _decode_dict if _name == "extra_json" else _decode_list))
+    else:
+        setattr(Course, _name, _column(_i))
+
+class CatalogReader:
+    """
+    Thread-safe, cached read access to unified_courses. Methods return Course
+    objects (lists are fresh per call; the Course objects are shared).
+    """
+
+    def __init__(self, path=None, cache_size: int = READER_CACHE_SIZE):
+        self.path = Path(path or TARGET_DB)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: List[sqlite3.Connection] = []
+        self._cache: OrderedDict = OrderedDict()
+        self._version: Optional[int] = None
+        self._bitmaps = None
+
+    # ---------- Connections / catalog version ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread off only so close() can close every thread's connection
+            conn = open_readonly(self.path, check_same_thread=False)
+            conn.row_factory = None
+            self._local.conn = conn
+            self._local.data_version = None
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _current_version(self) -> int:
+        conn = self._conn()
+        local = self._local
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != local.data_version:
+            try:
+                version = catalog_version(conn)
+            except sqlite3.OperationalError:   # catalog written before catalog_meta existed
+                version = 0
+            local.data_version, local.version = data_version, version
+            with self._lock:
+                # Versions only grow; a thread still on an older snapshot must not roll the cache back
+                if self._version is None or version > self._version:
+                    self._cache.clear()
+                    self._version = version
+        return local.version
+
+    @property
+    def version(self) -> int:
+        return self._current_version()
+
+    # ---------- Result cache ----------
+    def _lookup(self, key):
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.misses += 1
+                return _MISS
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _store(self, items: Iterable, version: int):
+        with self._lock:
+            if version != self._version:   # fetched from an older snapshot than the cache holds
+                return
+            for key, value in items:
+                self._cache[key] = value
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cached_list(self, key, sql: str, params: tuple) -> List[Course]:
+        version = self._current_version()
+        value = self._lookup(key)
+        if value is _MISS:
+            value = tuple(Course(r) for r in self._conn().execute(sql, params))
+            self._store([(key, value)], version)
+        return list(value)
+
+    def cache_info(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache),
+                "max_size": self.cache_size, "version": self._version}
+
+    # ---------- Queries ----------
+    def get(self, course_id: str) -> Optional[Course]:
+        version = self._current_version()
+        key = ("id", course_id)
+        value = self._lookup(key)
+        if value is _MISS:
+            row = self._conn().execute(BY_ID_SQL, (course_id,)).fetchone()
+            value = Course(row) if row else None   # unknown ids are cached too
+            self._store([(key, value)], version)
+        return value
+
+    def get_many(self, course_ids: Iterable[str]) -> List[Optional[Course]]:
+        """Courses for `course_ids` in order (None where unknown); cache misses are fetched in one query."""
+        ids = list(course_ids)
+        version = self._current_version()
+        found: Dict[str, Optional[Course]] = {}
+        missing = []
+        for cid in dict.fromkeys(ids):
+            value = self._lookup(("id", cid))
+            if value is _MISS:
+                missing.append(cid)
+            else:
+                found[cid] = value
+        if missing:
+            rows = {r[0]: Course(r) for r in self._conn().execute(BY_IDS_SQL, (json.dumps(missing),))}
+            fetched = [(cid, rows.get(cid)) for cid in missing]
+            found.update(fetched)
+            self._store([(("id", cid), value) for cid, value in fetched], version)
+        return [found[cid] for cid in ids]
+
+    def find(self, source: Optional[str] = None, subject: Optional[str] = None, level: Optional[str] = None,
+             provider: Optional[str] = None, language: Optional[str] = None,
+             limit: int = 100, offset: int = 0) -> List[Course]:
+        """Courses matching every given field exactly, ordered by course_id."""
+        given = [(f, v) for f, v in zip(FIND_FIELDS, (source, subject, level, provider, language)) if v is not None]
+        where = " AND ".join(f"u.{f} = ?" for f, _ in given) or "1"
+        sql = f"SELECT {_COLS} FROM {LIVE_TABLE} u WHERE {where} ORDER BY u.course_id LIMIT ? OFFSET ?"
+        params = tuple(v for _, v in given) + (limit, offset)
+        return self._cached_list(("find", tuple(given), limit, offset), sql, params)
+
+    def by_skill(self, skill: str, limit: int = 100, offset: int = 0) -> List[Course]:
+        """Courses teaching `skill` (case-insensitive, through course_skills), ordered by course_id."""
+        # Keyed like the SQL compares (NOCASE folds ASCII only), so spellings share a key only if they match alike
+        return self._cached_list(("skill", nocase(skill), limit, offset), BY_SKILL_SQL, (skill, limit, offset))
+
+    def related(self, course_id: str, limit: int = 10) -> List[Tuple[Course, float]]:
+        """
+        (Course, score) of the course's stored neighbors, best first (see
+        neighbors.py). Not cached: the table is refreshed after the version bump.
+        """
+        return [(Course(r[:-1]), r[-1]) for r in self._conn().execute(RELATED_SQL, (course_id, limit))]
+
+    # ---------- Boolean filters ----------
+    def bitmaps(self):
+        """BitmapIndex of the current catalog version, built on first use after every change."""
+        version = self._current_version()
+        index = self._bitmaps
+        if index is None or index.version < version:
+            from .bitmaps import BitmapIndex   # numpy is only needed once filters are used
+            index = BitmapIndex.build(self._conn())
+            with self._lock:
+                if self._bitmaps is None or index.version >= self._bitmaps.version:
+                    self._bitmaps = index
+        return index
+
+    def count(self, expr: str) -> int:
+        """Number of courses matching a boolean filter (syntax in bitmaps.py)."""
+        return len(self.bitmaps().query(expr))
+
+    def select(self, expr: str, limit: int = 100, offset: int = 0) -> List[Course]:
+        """Courses matching a boolean filter, ordered by course_id."""
+        index = self.bitmaps()
+        ids = index.course_ids_of(index.query(expr), limit=offset + limit)[offset:]
+        return self.get_many(ids)
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._cache.clear()
+            self._version = None
+            self._bitmaps = None
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up courses in the unified catalog")
+    parser.add_argument("course_ids", nargs="*")
+    parser.add_argument("--skill")
+    parser.add_argument("--where", help="Boolean filter, e.g. 'skill:python AND NOT level:advanced'")
+    for field in FIND_FIELDS:
+        parser.add_argument(f"--{field}")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with CatalogReader() as reader:
+        if args.course_ids:
+            courses = reader.get_many(args.course_ids)
+        elif args.where:
+            courses = reader.select(args.where, limit=args.limit)
+        elif args.skill:
+            courses = reader.by_skill(args.skill, limit=args.limit)
+        else:
+            courses = reader.find(**{f: getattr(args, f) for f in FIND_FIELDS}, limit=args.limit)
+        for course in courses:
+            print(json.dumps(course.to_dict() if course else None, ensure_ascii=False))
@@ -0,0 +1,83 @@
+"""
+Keyword search over the unified catalog (FTS5 index `course_fts`, kept in
+sync with unified_courses by triggers created in loader.ensure_schema).
+"""
+import argparse
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Union
+
+from .db import open_conn
+from .loader import FTS_TABLE, LIVE_TABLE
+
+# bm25 column weights, in loader.FTS_COLUMNS order: title, description, provider, tags, skills
+BM25_WEIGHTS = (10.0, 1.0, 3.0, 4.0, 4.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+Filter = Optional[Union[str, Iterable[str]]]
+
+def to_match_query(text: str, prefix: bool = True) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word becomes a quoted term
+    (implicit AND), the last one a prefix term so partial typing still matches.
+    """
+    words = _TOKEN_RE.findall(text)
+    terms = [f'"{w}"' for w in words]
+    if terms and prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def _add_filter(clauses: List[str], params: List, column: str, value: Filter):
+    if value is None:
+        return
+    values = [value] if isinstance(value, str) else list(value)
+    clauses.append(f"u.{column} IN ({','.join('?' * len(values))})")
+    params.extend(values)
+
+def search(conn: sqlite3.Connection, query: str, source: Filter = None, level: Filter = None,
+           subject: Filter = None, limit: int = 20, offset: int = 0, raw: bool = False,
+           highlight: tuple = ("[", "]")) -> List[Dict]:
+    """
+    BM25-ranked keyword search. `query` is free text unless `raw` is set, in
+    which case it is passed to FTS5 as-is (phrases, OR, NEAR, column filters).
+    Filters accept a single value or a list. Each hit carries a `snippet`
+    with matches wrapped in `highlight`.
+    """
+    match = query if raw else to_match_query(query)
+    if not match:
+        return []
+    clauses, params = [f"{FTS_TABLE} MATCH ?"], [match]
+    _add_filter(clauses, params, "source", source)
+    _add_filter(clauses, params, "level", level)
+    _add_filter(clauses, params, "subject", subject)
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    sql = f"""
+        SELECT u.course_id, u.source, u.title, u.provider, u.level, u.subject, u.url,
+               bm25({FTS_TABLE}, {weights}) AS score,
+               snippet({FTS_TABLE}, -1, ?, ?, '…', 16) AS snippet
+        FROM {FTS_TABLE} JOIN {LIVE_TABLE} u ON u.row_id = {FTS_TABLE}.rowid
+        WHERE {' AND '.join(clauses)}
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    """
+    cur = conn.execute(sql, [highlight[0], highlight[1], *params, limit, offset])
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, row)) for row in cur]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the unified course catalog")
+    parser.add_argument("query")
+    parser.add_argument("--source", nargs="*")
+    parser.add_argument("--level", nargs="*")
+    parser.add_argument("--subject", nargs="*")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--raw", action="store_true", help="pass the query to FTS5 unchanged")
+    args = parser.parse_args()
+
+    conn = open_conn()
+    for hit in search(conn, args.query, source=args.source, level=args.level, subject=args.subject,
+                      limit=args.limit, raw=args.raw):
+        print(f"{hit['score']:8.2f}  {hit['course_id']}  {hit['title']}")
+        print(f"          {hit['snippet']}")
+    conn.close()
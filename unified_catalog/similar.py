@@ -0,0 +1,297 @@
+"""
+Content-based "similar courses" over the unified catalog.
+
+Every course is an L2-normalized TF-IDF vector over its title words (counted
+SIMILAR_TITLE_WEIGHT times), description words, tags and skills, and
+"similar to X" is the top-k of the sparse dot products of X's row with every
+other row. The matrix is kept in plain numpy CSR arrays, plus their transpose
+(per-term postings, which is what queries walk), and saved as .npy files with
+the vocabulary, IDF and row -> course_id mapping, so serving processes
+memory-map a fitted index instead of refitting.
+
+refresh() brings a saved index up to date: only courses whose content_hash
+changed since they were vectorized (plus new ones) are re-tokenized, against
+the IDF of the last full fit; terms first seen in a refresh get an IDF from
+their own document frequency. Once more than SIMILAR_REFIT_FRACTION of the
+fitted rows have changed, the next refresh refits everything.
+
+Each save is a new generation directory; CURRENT names the live one, so a
+reader never sees a half-written index.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import TARGET_DB, SIMILAR_DIR, SIMILAR_TITLE_WEIGHT, SIMILAR_REFIT_FRACTION
+from .db import open_conn
+from .dedup import words   # same tokenizer and stopwords as the duplicate detector
+from .loader import LIVE_TABLE
+from .logging_config import logger
+
+ARRAYS = ("rows_indptr", "rows_indices", "rows_data", "cols_indptr", "cols_indices", "cols_data", "idf")
+
+_TEXT_SQL = f"SELECT course_id, content_hash, title, description, tags_json, skills_json FROM {LIVE_TABLE}"
+
+def index_dir_for(target_db: Optional[Path] = None) -> Path:
+    """Index directory that belongs to a catalog DB: unified_courses.db -> unified_courses.similar/."""
+    return SIMILAR_DIR if target_db is None else Path(target_db).with_suffix(".similar")
+
+# ---------- Vectorizing ----------
+
+def course_terms(title: Optional[str], description: Optional[str], tags_json: Optional[str],
+                 skills_json: Optional[str]) -> Dict[str, int]:
+    """Term counts of one course: title and description words, 't:<tag>' and 's:<skill>'."""
+    counts: Dict[str, int] = defaultdict(int)
+    for w in words(title):
+        counts[w] += SIMILAR_TITLE_WEIGHT
+    for w in words(description):
+        counts[w] += 1
+    for prefix, values in (("t:", tags_json), ("s:", skills_json)):
+        for value in json.loads(values or "[]"):
+            term = " ".join(words(value))
+            if term:
+                counts[prefix + term] += 1
+    return counts
+
+def _term_ids(counts: List[Dict[str, int]], vocab: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR indptr / term ids / raw counts of `counts`; unseen terms are appended to `vocab`."""
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in counts], out=indptr[1:])
+    nnz = int(indptr[-1])
+    indices = np.fromiter((vocab.setdefault(t, len(vocab)) for c in counts for t in c), dtype=np.int32, count=nnz)
+    tf = np.fromiter((v for c in counts for v in c.values()), dtype=np.float32, count=nnz)
+    return indptr, indices, tf
+
+def _idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    return (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+
+def _weights(indptr: np.ndarray, indices: np.ndarray, tf: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    """Sublinear tf * idf, each row scaled to unit length."""
+    data = (1 + np.log(tf)) * idf[indices]
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(indptr) - 1))
+    return (data / norms[rows]).astype(np.float32)
+
+def transpose(indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+               n_terms: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-term postings (CSR of the transpose): indptr over terms, row ids, weights."""
+    rows = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    cols_indptr = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_terms), out=cols_indptr[1:])
+    return cols_indptr, rows[order], data[order]
+
+def segments(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Positions of the ranges [start, start + length), concatenated."""
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+
+def dot_rows(rows_csr: Tuple[np.ndarray, ...], cols_csr: Tuple[np.ndarray, ...], rows: np.ndarray,
+             n: int) -> np.ndarray:
+    """
+    Dot products of the CSR rows `rows` with all n rows, as a dense
+    (len(rows), n) float64 array: one gather over the postings of every term
+    the rows use (`cols_csr` is the transpose), one bincount.
+    """
+    indptr, indices, data = rows_csr
+    cols_indptr, cols_indices, cols_data = cols_csr
+    lengths = indptr[rows + 1] - indptr[rows]
+    pos = segments(indptr[rows], lengths)
+    terms, weights = indices[pos], data[pos]
+    starts = cols_indptr[terms]
+    post_lengths = cols_indptr[terms + 1] - starts
+    post = segments(starts, post_lengths)
+    owner = np.repeat(np.repeat(np.arange(len(rows), dtype=np.int64) * n, lengths), post_lengths)
+    scores = np.bincount(owner + cols_indices[post], weights=cols_data[post] * np.repeat(weights, post_lengths),
+                         minlength=len(rows) * n)
+    return scores.astype(np.float64, copy=False).reshape(len(rows), n)   # bincount of nothing is int64
+
+# ---------- Persisted index ----------
+
+class SimilarityIndex:
+    """The live generation of a saved index; arrays are read-only memory maps unless `mmap` is off."""
+
+    def __init__(self, index_dir: Optional[Path] = None, mmap: bool = True):
+        index_dir = Path(index_dir or SIMILAR_DIR)
+        self.path = current_generation(index_dir)
+        mode = "r" if mmap else None
+        for name in ARRAYS:
+            setattr(self, name, np.load(self.path / f"{name}.npy", mmap_mode=mode))
+        ids = json.loads((self.path / "ids.json").read_text(encoding="utf-8"))
+        self.course_ids: List[str] = ids["course_ids"]
+        self.content_hashes: List[Optional[str]] = ids["content_hashes"]
+        self.meta: Dict = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self._row_of = {cid: i for i, cid in enumerate(self.course_ids)}
+
+    def __len__(self):
+        return len(self.course_ids)
+
+    def rows(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.rows_indptr, self.rows_indices, self.rows_data
+
+    def cols(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.cols_indptr, self.cols_indices, self.cols_data
+
+    def vocab(self) -> List[str]:
+        """Term of each column (only refreshes need it, so it is not loaded up front)."""
+        return json.loads((self.path / "vocab.json").read_text(encoding="utf-8"))
+
+    def similar(self, course_id: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Up to k (course_id, cosine) most similar to `course_id`, best first; [] for unknown ids."""
+        row = self._row_of.get(course_id)
+        if row is None:
+            return []
+        scores = dot_rows(self.rows(), self.cols(), np.array([row]), len(self))[0]
+        scores[row] = 0.0
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.course_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+def write_generation(index_dir: Path, generation: int, arrays: Dict[str, np.ndarray], docs: Dict[str, object]):
+    """
+    Write `arrays` (.npy) and `docs` (.json) as generation g<generation> next
+    to the live one, then point CURRENT at it.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    name = f"g{generation:06d}"
+    tmp = index_dir / f".{name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    for key, array in arrays.items():
+        np.save(tmp / f"{key}.npy", array)
+    for key, doc in docs.items():
+        (tmp / f"{key}.json").write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    shutil.rmtree(index_dir / name, ignore_errors=True)
+    tmp.rename(index_dir / name)
+    pointer = index_dir / "CURRENT.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, index_dir / "CURRENT")
+    # Keep the previous generation for processes that loaded it a moment ago
+    for old in sorted(index_dir.glob("g*"))[:-2]:
+        shutil.rmtree(old, ignore_errors=True)
+
+def current_generation(index_dir: Path) -> Path:
+    """Directory of the live generation (FileNotFoundError when nothing was saved yet)."""
+    return index_dir / (index_dir / "CURRENT").read_text().strip()
+
+def _save(index_dir: Path, arrays: Dict[str, np.ndarray], vocab: List[str], course_ids: List[str],
+          content_hashes: List[Optional[str]], meta: Dict):
+    write_generation(index_dir, meta["generation"], {key: arrays[key] for key in ARRAYS},
+                     {"vocab": vocab, "ids": {"course_ids": course_ids, "content_hashes": content_hashes},
+                      "meta": meta})
+
+# ---------- Fit / refresh ----------
+
+def _fit(conn: sqlite3.Connection, index_dir: Path, generation: int) -> Dict[str, int]:
+    course_ids, hashes, counts = [], [], []
+    for cid, content_hash, title, description, tags_json, skills_json in conn.execute(_TEXT_SQL):
+        course_ids.append(cid)
+        hashes.append(content_hash)
+        counts.append(course_terms(title, description, tags_json, skills_json))
+    vocab: Dict[str, int] = {}
+    indptr, indices, tf = _term_ids(counts, vocab)
+    idf = _idf(np.bincount(indices, minlength=len(vocab)), len(counts))
+    data = _weights(indptr, indices, tf, idf)
+    cols = transpose(indptr, indices, data, len(vocab))
+    arrays = dict(zip(ARRAYS, (indptr, indices, data, *cols, idf)))
+    meta = {"generation": generation, "fitted_at": datetime.utcnow().isoformat(), "fit_rows": len(course_ids),
+            "changed_since_fit": 0, "title_weight": SIMILAR_TITLE_WEIGHT}
+    _save(index_dir, arrays, list(vocab), course_ids, hashes, meta)
+    return {"rows": len(course_ids), "vectorized": len(course_ids), "removed": 0, "terms": len(vocab), "full": 1}
+
+def refresh(conn: sqlite3.Connection, index_dir: Optional[Path] = None, full: bool = False) -> Dict[str, int]:
+    """
+    Bring the index in `index_dir` up to date with unified_courses (fits one
+    when there is none, or with `full`). Returns row / re-vectorized / removed
+    / term counts and whether it was a full fit.
+    """
+    index_dir = Path(index_dir or SIMILAR_DIR)
+    try:
+        old = SimilarityIndex(index_dir)
+    except FileNotFoundError:
+        old = None
+    generation = old.meta["generation"] + 1 if old else 1
+
+    if old is not None and not full:
+        live = dict(conn.execute(f"SELECT course_id, content_hash FROM {LIVE_TABLE}"))
+        # Rows whose course is gone or whose content changed are dropped; changed and new courses re-vectorized
+        keep = np.fromiter((cid in live and live[cid] == h for cid, h in zip(old.course_ids, old.content_hashes)),
+                           dtype=bool, count=len(old))
+        indexed = {cid for cid, kept in zip(old.course_ids, keep) if kept}
+        todo = [cid for cid in live if cid not in indexed]
+        removed = sum(1 for cid in old.course_ids if cid not in live)
+        changed_since_fit = old.meta["changed_since_fit"] + len(todo) + removed
+        full = changed_since_fit > SIMILAR_REFIT_FRACTION * max(old.meta["fit_rows"], 1)
+    if old is None or full:
+        stats = _fit(conn, index_dir, generation)
+    elif not todo and not removed:
+        stats = {"rows": len(old), "vectorized": 0, "removed": 0, "terms": len(old.idf), "full": 0}
+    else:
+        stats = _refresh(conn, index_dir, old, keep, todo, removed, changed_since_fit, generation)
+    logger.info("Similar-courses index: %d rows, %d re-vectorized, %d removed, %d terms%s", stats["rows"],
+                stats["vectorized"], stats["removed"], stats["terms"], " (full fit)" if stats["full"] else "")
+    return stats
+
+def _refresh(conn: sqlite3.Connection, index_dir: Path, old: SimilarityIndex, keep: np.ndarray, todo: List[str],
+             removed: int, changed_since_fit: int, generation: int) -> Dict[str, int]:
+    """Drop stale rows of `old`, vectorize `todo` against its IDF and save the result as a new generation."""
+    course_ids, hashes, counts = [], [], []
+    for cid, content_hash, title, description, tags_json, skills_json in conn.execute(
+        f"{_TEXT_SQL} WHERE course_id IN (SELECT value FROM json_each(?))", (json.dumps(todo),)
+    ):
+        course_ids.append(cid)
+        hashes.append(content_hash)
+        counts.append(course_terms(title, description, tags_json, skills_json))
+
+    vocab_terms = old.vocab()
+    vocab = {t: i for i, t in enumerate(vocab_terms)}
+    n_old_terms = len(vocab)
+    indptr_new, indices_new, tf = _term_ids(counts, vocab)
+    new_df = np.bincount(indices_new[indices_new >= n_old_terms] - n_old_terms, minlength=len(vocab) - n_old_terms)
+    idf = np.concatenate([old.idf, _idf(new_df, old.meta["fit_rows"])])
+    data_new = _weights(indptr_new, indices_new, tf, idf)
+
+    lengths = np.diff(old.rows_indptr)
+    kept_nnz = np.repeat(keep, lengths)
+    kept_indptr = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+    np.cumsum(lengths[keep], out=kept_indptr[1:])
+    indptr = np.concatenate([kept_indptr, kept_indptr[-1] + indptr_new[1:]])
+    indices = np.concatenate([old.rows_indices[kept_nnz], indices_new])
+    data = np.concatenate([old.rows_data[kept_nnz], data_new])
+    cols = transpose(indptr, indices, data, len(vocab))
+
+    kept_rows = np.flatnonzero(keep)
+    all_ids = [old.course_ids[i] for i in kept_rows] + course_ids
+    all_hashes = [old.content_hashes[i] for i in kept_rows] + hashes
+    vocab_terms.extend(list(vocab)[n_old_terms:])
+    meta = dict(old.meta, generation=generation, changed_since_fit=changed_since_fit)
+    _save(index_dir, dict(zip(ARRAYS, (indptr, indices, data, *cols, idf))), vocab_terms, all_ids, all_hashes,
+          meta)
+    return {"rows": len(all_ids), "vectorized": len(course_ids), "removed": removed, "terms": len(vocab),
+            "full": 0}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-based similar courses (TF-IDF)")
+    parser.add_argument("course_id", nargs="?", help="Print the courses most similar to this one")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--refresh", action="store_true", help="Update the saved index from the catalog")
+    parser.add_argument("--full", action="store_true", help="With --refresh: refit from scratch")
+    args = parser.parse_args()
+
+    if args.refresh or args.full:
+        conn = open_conn(TARGET_DB)
+        refresh(conn, full=args.full)
+        conn.close()
+    if args.course_id:
+        for cid, score in SimilarityIndex().similar(args.course_id, k=args.k):
+            print(f"{score:.3f}  {cid}")
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from unified_catalog.loader import ensure_schema, bulk_upsert
+
+def _record(cid, **overrides):
+    rec = {
+        "source": "edx",
+        "source_course_id": cid,
+        "title": f"Course {cid}",
+        "description": "Desc",
+        "url": None,
+        "provider": "MITx",
+        "instructors": ["prof_x"],
+        "subject": "CS",
+        "level": "beginner",
+        "language": "English",
+        "duration_weeks": 6,
+        "tags": ["AI"],
+        "skills": ["Python"],
+        "rating": None,
+        "ratings_count": None,
+        "popularity": None,
+        "image_url": None,
+        "extra": {"availability": "Available"},
+    }
+    rec.update(overrides)
+    return rec
+
+@pytest.fixture
+def make_record():
+    """Normalized edx record for course `cid`; keyword arguments override fields."""
+    return _record
+
+@pytest.fixture
+def make_catalog(tmp_path):
+    """Load records into a fresh catalog (tmp_path/u.db unless `path` is given) and return its connection."""
+    conns = []
+
+    def build(records, path=None):
+        conn = sqlite3.connect(str(path or tmp_path / "u.db"))
+        ensure_schema(conn)
+        bulk_upsert(conn, records)
+        conns.append(conn)
+        return conn
+
+    yield build
+    for conn in conns:
+        conn.close()
+
+@pytest.fixture
+def ml_catalog(make_catalog, make_record):
+    """Two machine learning courses, a Python web course and an unrelated baking one."""
+    return make_catalog([
+        make_record("ml1", title="Machine Learning with Python", description="Regression and classification",
+                    skills=["Python", "Machine Learning"], tags=["AI"]),
+        make_record("ml2", title="Applied Machine Learning", description="Classification models in practice",
+                    skills=["Machine Learning"], tags=["AI"]),
+        make_record("bake", title="Bread Baking", description="Sourdough and rye", skills=["Baking"],
+                    tags=["Food"]),
+        make_record("web", title="Web Development with Python", description="Flask and HTML", skills=["Python"],
+                    tags=["Web"]),
+    ])
@@ -0,0 +1,47 @@
+import numpy as np
+
+from unified_catalog import ann
+from unified_catalog.ann import AnnIndex, build, build_from_vectors
+
+def _clustered(n, dim=32, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.4 * rng.standard_normal((n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def test_forest_recall_and_filters(tmp_path, monkeypatch):
+    n = 3000
+    vectors = _clustered(n)
+    ids = [f"c{i}" for i in range(n)]
+    values = {"source": ["edx", "nptel", "coursera"] * (n // 3), "level": [None, "Beginner"] * (n // 2),
+              "language": ["English"] * n}
+    stats = build_from_vectors(tmp_path / "ann", ids, vectors, values, trees=6, leaf_size=32)
+    assert stats["depth"] == 7
+    index = AnnIndex(tmp_path / "ann")
+    assert isinstance(index.vectors, np.memmap)
+
+    hits = total = 0
+    for cid in ids[:100]:
+        approx = {c for c, _ in index.similar(cid, k=10)}
+        exact = {c for c, _ in index.exact(index.vector(cid), k=10, exclude=cid)}
+        assert cid not in approx and len(approx) == 10
+        hits, total = hits + len(approx & exact), total + 10
+    assert hits / total > 0.9
+
+    # Small filtered sets are scanned exactly; larger ones filter the candidates
+    exact = index.exact(index.vector("c0"), k=5, exclude="c0", source="nptel", level="beginner")
+    assert index.similar("c0", k=5, source="NPTEL", level="beginner") == exact
+    assert all(int(c[1:]) % 6 == 1 for c, _ in exact)
+    monkeypatch.setattr(ann, "ANN_EXACT_BELOW", 0)
+    filtered = index.similar("c0", k=10, source="nptel", level="beginner")
+    assert len(filtered) == 10 and all(int(c[1:]) % 6 == 1 for c, _ in filtered)
+    assert index.similar("c0", level="expert") == [] and index.similar("unknown") == []
+
+def test_build_from_catalog(ml_catalog, tmp_path):
+    conn = ml_catalog
+    build(conn, tmp_path / "ann", similar_dir=tmp_path / "idx", dim=16, trees=2, leaf_size=2)
+    index = AnnIndex(tmp_path / "ann")
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1, atol=1e-5)
+    assert index.similar("edx:ml1", k=1, probes=8) == index.exact(index.vector("edx:ml1"), k=1, exclude="edx:ml1")
+    assert [c for c, _ in index.similar("edx:ml1", k=3, level="BEGINNER")] != []
+    conn.close()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from unified_catalog.bitmaps import Bitmap, BitmapIndex
+from unified_catalog.loader import bulk_upsert
+from unified_catalog.reader import CatalogReader
+
+def test_bitmap_ops_match_sets_across_representations():
+    rng = np.random.default_rng(0)
+    n = 1000
+    sets = [set(rng.choice(n, size, replace=False).tolist()) for size in (0, 5, 20, 31, 32, 300, 900)]
+    bitmaps = [Bitmap.from_ordinals(n, np.array(sorted(s))) for s in sets]
+    assert bitmaps[1].ords is not None and bitmaps[-1].words is not None
+    universe = set(range(n))
+    for a, x in zip(sets, bitmaps):
+        assert set((~x).ordinals().tolist()) == universe - a and len(~x) == n - len(a)
+        for b, y in zip(sets, bitmaps):
+            assert set((x & y).ordinals().tolist()) == a & b and len(x & y) == len(a & b)
+            assert set((x | y).ordinals().tolist()) == a | b and len(x | y) == len(a | b)
+            assert set((x - y).ordinals().tolist()) == a - b and len(x - y) == len(a - b)
+    assert all((i in bitmaps[5]) == (i in sets[5]) for i in range(n))
+
+def test_index_queries_and_reader_rebuild(tmp_path, make_catalog, make_record):
+    path = tmp_path / "u.db"
+    conn = make_catalog([
+        make_record("a", skills=["Python", "Statistics"], tags=["Data Science"]),
+        make_record("b", skills=["Python", "R", "Statistics"]),
+        make_record("c", skills=["python"], level="advanced", provider="HarvardX"),
+        make_record("d", skills=["SQL"], tags=["Data Science"], level="Beginner"),
+    ])
+    index = BitmapIndex.build(conn)
+    ids = lambda expr: index.course_ids_of(index.query(expr))
+    assert ids("skill:python AND skill:statistics AND NOT skill:r AND level:beginner") == ["edx:a"]
+    assert ids('skill:sql OR (tag:"data science" skill:Python)') == ["edx:a", "edx:d"]
+    assert ids("NOT skill:python") == ["edx:d"]
+    assert ids("level:beginner AND NOT (provider:harvardx OR skill:r)") == ["edx:a", "edx:d"]
+    assert len(index.query("skill:nonexistent")) == 0
+    assert index.values("skill")["python"] == 3
+    for bad in ("skill:python AND", "(skill:python", "color:red", "python"):
+        with pytest.raises(ValueError):
+            index.query(bad)
+
+    with CatalogReader(path) as reader:
+        assert reader.count("skill:python") == 3
+        assert [c.course_id for c in reader.select("skill:python", limit=1, offset=1)] == ["edx:b"]
+        built = reader.bitmaps()
+        assert reader.bitmaps() is built                  # same catalog version, same index
+        bulk_upsert(conn, [make_record("d", skills=["SQL", "Python"])])
+        assert reader.count("skill:python") == 4
+    conn.close()
@@ -0,0 +1,90 @@
+import pytest
+
+from unified_catalog.dedup import update_clusters, duplicates_of
+from unified_catalog.loader import bulk_upsert
+
+DESC = ("An introduction to machine learning covering supervised learning, regression, "
+        "classification, neural networks and practical model evaluation with real datasets.")
+
+@pytest.fixture
+def conn(make_catalog, make_record):
+    return make_catalog([
+        make_record("ml", title="Introduction to Machine Learning", description=DESC, source="edx"),
+        make_record("ml", title="Introduction to Machine Learning", description=DESC + " Certificate.",
+                    source="coursera"),
+        make_record("ml2", title="Introduction to Machine Learning", description=DESC, source="edx"),
+        make_record("bake", title="Baking Bread at Home", description="Sourdough, rye and flatbreads.",
+                    source="nptel"),
+    ])
+
+def test_clusters_link_cross_source_duplicates(conn):
+    stats = update_clusters(conn)
+    assert stats["signed"] == 4
+    pairs = conn.execute("SELECT course_a, course_b FROM course_duplicate_pairs ORDER BY 1, 2").fetchall()
+    assert pairs == [("coursera:ml", "edx:ml"), ("coursera:ml", "edx:ml2")]   # same-source pair not linked
+    assert duplicates_of(conn, "edx:ml") == ["coursera:ml", "edx:ml2"]
+    assert duplicates_of(conn, "nptel:bake") == []
+
+    assert update_clusters(conn)["signed"] == 0   # nothing changed, nothing re-signed
+    conn.close()
+
+def test_clusters_follow_changes_and_deletes(conn, make_record):
+    update_clusters(conn)
+
+    bulk_upsert(conn, [make_record("ml", title="Quantum Chemistry", description="Orbitals and spectra.",
+                                   source="coursera")])
+    conn.execute("DELETE FROM unified_courses WHERE course_id = 'edx:ml2'")
+    conn.commit()
+    stats = update_clusters(conn)
+    assert stats["signed"] == 1 and stats["removed"] == 1
+    assert duplicates_of(conn, "edx:ml") == []
+    assert conn.execute("SELECT COUNT(*) FROM course_clusters").fetchone()[0] == 0
+    conn.close()
+
+STATS = ("Statistics for data science: probability, distributions, hypothesis testing, "
+         "confidence intervals and linear regression explained with worked examples.")
+
+def _clusters(conn):
+    return conn.execute("SELECT course_id, cluster_id, cluster_size FROM course_clusters ORDER BY 1").fetchall()
+
+def test_chunked_pass_matches_each_pair_once(conn):
+    whole = update_clusters(conn)
+    pairs = conn.execute("SELECT * FROM course_duplicate_pairs ORDER BY 1, 2").fetchall()
+    clusters = _clusters(conn)
+    chunked = update_clusters(conn, full=True, chunk=1)
+    assert (chunked["candidates"], chunked["pairs"]) == (whole["candidates"], whole["pairs"])
+    assert conn.execute("SELECT * FROM course_duplicate_pairs ORDER BY 1, 2").fetchall() == pairs
+    assert _clusters(conn) == clusters
+    conn.close()
+
+def test_only_touched_clusters_are_rewritten(conn, make_record):
+    bulk_upsert(conn, [make_record("st", title="Statistics for Data Science", description=STATS, source="edx"),
+                       make_record("st", title="Statistics for Data Science", description=STATS, source="nptel")])
+    update_clusters(conn)
+    stats_rows = conn.execute("SELECT rowid, * FROM course_clusters WHERE cluster_id = 'edx:st'").fetchall()
+    assert len(stats_rows) == 2
+
+    # edx:ml2 leaves the machine-learning cluster, the nptel baking course joins the statistics one
+    bulk_upsert(conn, [make_record("ml2", title="Medieval Poetry", description="Chaucer and the troubadours.",
+                                   source="edx"),
+                       make_record("bake", title="Statistics for Data Science", description=STATS, source="coursera")])
+    stats = update_clusters(conn, chunk=1)
+    assert stats["reclustered"] == 6   # both clusters' members and the two changed courses, not the whole catalog
+    incremental = _clusters(conn)
+    assert ("coursera:bake", "coursera:bake", 3) in incremental
+    assert "edx:ml2" not in [r[0] for r in incremental]
+
+    update_clusters(conn, full=True)
+    assert _clusters(conn) == incremental
+    conn.close()
+
+def test_untouched_cluster_rows_are_kept(conn, make_record):
+    bulk_upsert(conn, [make_record("st", title="Statistics for Data Science", description=STATS, source="edx"),
+                       make_record("st", title="Statistics for Data Science", description=STATS, source="nptel")])
+    update_clusters(conn)
+    before = conn.execute("SELECT rowid, * FROM course_clusters WHERE cluster_id = 'edx:st'").fetchall()
+    bulk_upsert(conn, [make_record("ml", title="Quantum Chemistry", description="Orbitals and spectra.",
+                                   source="coursera")])
+    update_clusters(conn)
+    assert conn.execute("SELECT rowid, * FROM course_clusters WHERE cluster_id = 'edx:st'").fetchall() == before
+    conn.close()
@@ -0,0 +1,278 @@
+import json
+import sqlite3
+
+import pytest
+
+from unified_catalog import etl, writer
+from unified_catalog.ann import AnnIndex
+from unified_catalog.benchmarks.synthetic import build_sources
+
+def _make_coursera(path, n):
+    conn = sqlite3.connect(str(path))
+    conn.execute("""
+        CREATE TABLE coursera_courses (
+            id TEXT PRIMARY KEY,
+            name TEXT, url TEXT, product_type TEXT,
+            partners_json TEXT, skills_json TEXT,
+            rating REAL, num_ratings INTEGER,
+            difficulty TEXT, duration TEXT, tagline TEXT, fetched_at TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO coursera_courses VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+        [(f"c{i}", f"Course {i}", f"/c{i}", "course", '["Partner"]', '["Python"]',
+          4.5, 10, "Beginner", "4 weeks", "tagline", "2025-01-01") for i in range(n)],
+    )
+    conn.commit()
+    conn.close()
+
+def _make_edx(path, n):
+    conn = sqlite3.connect(str(path))
+    conn.execute("""
+        CREATE TABLE courses (
+            id TEXT PRIMARY KEY,
+            title TEXT, description TEXT, subject TEXT, level TEXT, language TEXT,
+            weeks_to_complete INTEGER, availability TEXT, marketing_url TEXT, card_image_url TEXT
+        )
+    """)
+    conn.execute("CREATE TABLE tags (id INTEGER PRIMARY KEY AUTOINCREMENT, course_id TEXT, tag TEXT)")
+    conn.executemany(
+        "INSERT INTO courses VALUES (?,?,?,?,?,?,?,?,?,?)",
+        [(f"e{i}", f"EdX {i}", "Desc", "CS", "Introductory", "English", 6, "Available", "http://x", None)
+         for i in range(n)],
+    )
+    conn.executemany("INSERT INTO tags(course_id, tag) VALUES (?, ?)", [(f"e{i}", "AI") for i in range(n)])
+    conn.commit()
+    conn.close()
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    _make_coursera(tmp_path / "coursera.db", 7)
+    _make_edx(tmp_path / "edx.db", 5)
+    monkeypatch.setattr(etl, "COURSERA_DB", tmp_path / "coursera.db")
+    monkeypatch.setattr(etl, "EDX_DB", tmp_path / "edx.db")
+    monkeypatch.setattr(etl, "NPTEL_DB", tmp_path / "missing_nptel.db")
+    monkeypatch.setattr(etl, "TARGET_DB", tmp_path / "unified.db")
+    monkeypatch.setattr(etl, "RUN_REPORT_FILE", tmp_path / "logs" / "etl_run_report.json")
+    return tmp_path
+
+def _records(report):
+    return {src: stats["records"] for src, stats in report.items()}
+
+def _unified_counts(path):
+    conn = sqlite3.connect(str(path))
+    rows = conn.execute("SELECT source, COUNT(*) FROM unified_courses GROUP BY source").fetchall()
+    conn.close()
+    return dict(rows)
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_run_loads_all_sources(sources, workers):
+    report = etl.run(["coursera", "edx", "nptel"], batch_size=3, workers=workers)
+    assert _records(report) == {"coursera": 7, "edx": 5}
+    assert report["coursera"]["inserted"] == 7
+    assert _unified_counts(sources / "unified.db") == {"coursera": 7, "edx": 5}
+
+def test_parallel_dry_run_writes_nothing(sources):
+    report = etl.run(["coursera", "edx"], dry_run=True, batch_size=2, workers=2)
+    assert _records(report) == {"coursera": 7, "edx": 5}
+    assert _unified_counts(sources / "unified.db") == {}
+
+def test_parallel_extractor_failure_skips_source(sources, monkeypatch):
+    (sources / "edx.db").write_bytes(b"not a sqlite database")
+    monkeypatch.setattr(etl, "FAIL_FAST", False)
+    report = etl.run(["coursera", "edx"], batch_size=3, workers=2)
+    assert _records(report) == {"coursera": 7}
+    assert _unified_counts(sources / "unified.db") == {"coursera": 7}
+
+    monkeypatch.setattr(etl, "FAIL_FAST", True)
+    with pytest.raises(RuntimeError):
+        etl.run(["coursera", "edx"], batch_size=3, workers=2)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_incremental_run_only_pulls_changed_rows(sources, workers):
+    assert _records(etl.run(["coursera", "edx"], workers=workers)) == {"coursera": 7, "edx": 5}
+
+    conn = sqlite3.connect(str(sources / "coursera.db"))
+    conn.execute("UPDATE coursera_courses SET name='Renamed', fetched_at='2025-02-01' WHERE id='c3'")
+    conn.execute("""INSERT INTO coursera_courses (id, name, fetched_at) VALUES ('c99', 'New', '2025-02-01')""")
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(str(sources / "edx.db"))
+    conn.execute("INSERT INTO tags(course_id, tag) VALUES ('e2', 'ML')")
+    conn.commit()
+    conn.close()
+
+    report = etl.run(["coursera", "edx"], workers=workers, incremental=True)
+    assert _records(report) == {"coursera": 2, "edx": 1}
+    assert report["coursera"]["inserted"] == 1 and report["coursera"]["updated"] == 1
+    assert _records(etl.run(["coursera", "edx"], workers=workers, incremental=True)) == {"coursera": 0, "edx": 0}
+
+    conn = sqlite3.connect(str(sources / "unified.db"))
+    assert conn.execute("SELECT title FROM unified_courses WHERE course_id='coursera:c3'").fetchone()[0] == "Renamed"
+    assert conn.execute("SELECT tags_json FROM unified_courses WHERE course_id='edx:e2'").fetchone()[0] == '["AI","ML"]'
+    conn.close()
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rebuild_swaps_in_fresh_table(sources, workers):
+    etl.run(["coursera", "edx"], workers=workers)
+    conn = sqlite3.connect(str(sources / "coursera.db"))
+    conn.execute("DELETE FROM coursera_courses WHERE id='c0'")
+    conn.execute("UPDATE coursera_courses SET name='Renamed' WHERE id='c1'")
+    conn.commit()
+    conn.close()
+
+    report = etl.run(["coursera"], workers=workers, rebuild=True)
+    assert report["coursera"]["unchanged"] == 5 and report["coursera"]["updated"] == 1
+    assert _unified_counts(sources / "unified.db") == {"coursera": 6, "edx": 5}
+
+    conn = sqlite3.connect(str(sources / "unified.db"))
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+    assert "unified_courses_rebuild" not in names
+    assert {"idx_unified_source_pair", "idx_unified_title", "idx_unified_subject", "idx_unified_level"} <= names
+    assert conn.execute("SELECT title FROM unified_courses WHERE course_id='coursera:c1'").fetchone()[0] == "Renamed"
+    linked = {r[0] for r in conn.execute("SELECT course_id FROM course_skills")}
+    assert linked == {f"coursera:c{i}" for i in range(1, 7)}
+    assert "trg_unified_delete_side" in names
+    conn.close()
+
+def test_failed_rebuild_leaves_live_catalog(sources):
+    etl.run(["coursera", "edx"])
+    (sources / "edx.db").write_bytes(b"not a sqlite database")
+    etl.run(["coursera", "edx"], rebuild=True)
+    assert _unified_counts(sources / "unified.db") == {"coursera": 7, "edx": 5}
+
+def test_run_with_dedup_builds_clusters(sources):
+    etl.run(["coursera", "edx"], dedup=True)
+    conn = sqlite3.connect(str(sources / "unified.db"))
+    assert conn.execute("SELECT COUNT(*) FROM course_minhash").fetchone()[0] == 12
+    conn.close()
+
+def test_run_with_ann_builds_index(sources):
+    etl.run(["coursera", "edx"], ann=True)
+    index = AnnIndex(sources / "unified.ann")
+    assert len(index) == 12 and len(index.similar("edx:e0", k=3)) == 3
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_report_has_stage_timings(sources, workers):
+    etl.run(["coursera", "edx"], batch_size=3, workers=workers, profile=True)
+    report = json.loads((sources / "logs" / "etl_run_report.json").read_text())
+    assert report["totals"]["records"] == 12
+    coursera = report["sources"]["coursera"]
+    assert coursera["records"] == 7 and coursera["inserted"] == 7
+    assert list(coursera["stages"]) == ["extract", "transform", "pack", "write", "commit"]
+    assert coursera["stages"]["commit"]["calls"] == 3
+    assert coursera["records_per_sec"] > 0 and coursera["peak_rss_mb"] > 0
+    assert report["writer"]["records_written"] == 12 and report["writer"]["batch_sizes"]["max"] == 3
+    assert (sources / "logs" / "etl_profile.prof").exists()
+
+def test_run_on_synthetic_sources(tmp_path):
+    paths = build_sources(tmp_path / "src", 60)
+    report = etl.run(list(paths), target_db=tmp_path / "bench.db", source_paths=paths,
+                     report_path=tmp_path / "report.json")
+    assert _records(report) == {"coursera": 60, "edx": 60, "nptel": 60}
+    assert _unified_counts(tmp_path / "bench.db") == {"coursera": 60, "edx": 60, "nptel": 60}
+
+@pytest.mark.parametrize("workers,streaming", [(1, False), (2, True)])
+def test_run_where_filters(tmp_path, workers, streaming):
+    paths = build_sources(tmp_path / "src", 80)
+    etl.run(list(paths), target_db=tmp_path / "all.db", source_paths=paths, report_path=tmp_path / "all.json")
+    conn = sqlite3.connect(str(tmp_path / "all.db"))
+    expected = dict(conn.execute("""
+        SELECT source, COUNT(*) FROM unified_courses
+        WHERE source != 'nptel' AND (language IS NULL OR LOWER(language) = 'english')
+          AND (level IS NULL OR level IN ('beginner', 'intermediate'))
+        GROUP BY source
+    """).fetchall())
+    conn.close()
+
+    report = etl.run(list(paths), target_db=tmp_path / "some.db", source_paths=paths, workers=workers,
+                     streaming=streaming, report_path=tmp_path / "some.json",
+                     where=["language=English", "level=beginner,intermediate", "source=edx,coursera"])
+    assert _unified_counts(tmp_path / "some.db") == expected
+    assert set(report) == {"coursera", "edx"}
+    assert all(s["records"] + s["filtered"] == 80 for s in report.values())
+    assert json.loads((tmp_path / "some.json").read_text())["totals"]["filtered"] == 160 - sum(expected.values())
+
+def test_parse_filters_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        etl.parse_filters(["rating=5"])
+    assert etl.parse_filters(["level=a,b", "level=b"]) == {"level": ("b",)}
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resume_continues_after_last_committed_batch(sources, monkeypatch, workers):
+    real_upsert, calls = writer.bulk_upsert, []
+
+    def crashing_upsert(conn, records, **kw):
+        calls.append(records[0]["source"])
+        if records[0]["source"] == "coursera" and calls.count("coursera") == 3:
+            raise RuntimeError("simulated crash")
+        return real_upsert(conn, records, **kw)
+
+    monkeypatch.setattr(writer, "bulk_upsert", crashing_upsert)
+    etl.run(["coursera", "edx"], batch_size=2, workers=workers)
+    conn = sqlite3.connect(str(sources / "unified.db"))
+    assert conn.execute("SELECT source, last_key, batch FROM etl_checkpoints").fetchall() == [("coursera", "c3", 2)]
+    assert _unified_counts(sources / "unified.db") == {"coursera": 4, "edx": 5}
+
+    monkeypatch.setattr(writer, "bulk_upsert", real_upsert)
+    report = etl.run(["coursera"], batch_size=2, resume=True)
+    assert report["coursera"]["records"] == 3 and report["coursera"]["inserted"] == 3
+    assert _unified_counts(sources / "unified.db") == {"coursera": 7, "edx": 5}
+    assert conn.execute("SELECT COUNT(*) FROM etl_checkpoints").fetchone()[0] == 0
+    conn.close()
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resume_keeps_the_interrupted_runs_watermarks(sources, monkeypatch, workers):
+    real_upsert, calls = writer.bulk_upsert, []
+
+    def crashing_upsert(conn, records, **kw):
+        calls.append(records[0]["source"])
+        if calls.count("coursera") == 2:
+            raise RuntimeError("simulated crash")
+        return real_upsert(conn, records, **kw)
+
+    monkeypatch.setattr(writer, "bulk_upsert", crashing_upsert)
+    etl.run(["coursera"], batch_size=2, workers=workers)
+    # c0 was committed before the crash and changes before the resume
+    src = sqlite3.connect(str(sources / "coursera.db"))
+    src.execute("UPDATE coursera_courses SET name = 'Renamed', fetched_at = '2025-06-01' WHERE id = 'c0'")
+    src.commit()
+    src.close()
+
+    monkeypatch.setattr(writer, "bulk_upsert", real_upsert)
+    etl.run(["coursera", "edx"], batch_size=2, workers=workers, resume=True)
+    conn = sqlite3.connect(str(sources / "unified.db"))
+    assert conn.execute("SELECT value FROM etl_watermarks WHERE source = 'coursera'").fetchall() == [("2025-01-01",)]
+    report = etl.run(["coursera"], incremental=True, workers=workers)
+    assert report["coursera"]["updated"] == 1
+    assert conn.execute("SELECT title FROM unified_courses WHERE course_id = 'coursera:c0'").fetchone() == ("Renamed",)
+    conn.close()
+
+def _catalog(path):
+    conn = sqlite3.connect(str(path))
+    rows = dict(conn.execute("SELECT course_id, content_hash FROM unified_courses").fetchall())
+    skills = conn.execute("SELECT COUNT(*) FROM course_skills").fetchone()[0]
+    versions = conn.execute("SELECT COUNT(DISTINCT course_id) FROM source_map").fetchone()[0]
+    hits = conn.execute("SELECT COUNT(*) FROM course_fts WHERE course_fts MATCH 'course'").fetchone()[0]
+    conn.close()
+    return rows, skills, versions, hits
+
+def test_partitioned_run_merges_to_same_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, "RUN_REPORT_FILE", tmp_path / "logs" / "etl_run_report.json")
+    paths = build_sources(tmp_path / "src", 90)
+    etl.run(list(paths), target_db=tmp_path / "direct.db", source_paths=paths)
+
+    units = [etl.run(list(paths), target_db=tmp_path / "merged.db", source_paths=paths, partition=(k, 3))
+             for k in (1, 2, 3)]
+    assert sum(r["edx"]["records"] for r in units) == 90 and all(r["edx"]["records"] < 90 for r in units)
+    assert (tmp_path / "merged.part-2-of-3.db").exists()
+    assert etl.merge_partitions(3, target_db=tmp_path / "merged.db")["inserted"] == 270
+    assert _catalog(tmp_path / "merged.db") == _catalog(tmp_path / "direct.db")
+    assert etl.merge_partitions(3, target_db=tmp_path / "merged.db")["unchanged"] == 270
+
+def test_run_partitioned_uses_a_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, "RUN_REPORT_FILE", tmp_path / "logs" / "etl_run_report.json")
+    paths = build_sources(tmp_path / "src", 40)
+    totals = etl.run_partitioned(list(paths), 4, processes=2, target_db=tmp_path / "merged.db", source_paths=paths)
+    assert totals["inserted"] == 120
+    assert _unified_counts(tmp_path / "merged.db") == {"coursera": 40, "edx": 40, "nptel": 40}
@@ -0,0 +1,92 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.dataset as ds
+
+from unified_catalog import export
+from unified_catalog.export import export_catalog
+from unified_catalog.loader import bulk_upsert, merge_partition_db
+
+@pytest.fixture
+def conn(make_catalog, make_record):
+    return make_catalog([make_record("a", skills=["Python", "SQL"]), make_record("b"),
+                         make_record("c", source="nptel", tags=[])])
+
+def test_parquet_export_partitions_and_lists(conn, tmp_path):
+    conn.close()
+    out = tmp_path / "exports"
+
+    stats = export_catalog(tmp_path / "u.db", out, batch_rows=2)
+    assert stats["rows"] == 3 and len(stats["files"]) == 2
+
+    table = ds.dataset(str(out), format="parquet", partitioning="hive").to_table(
+        columns=["course_id", "source", "skills", "tags"]).sort_by("course_id")
+    assert table.schema.field("skills").type == pa.list_(pa.string())
+    assert table.column("course_id").to_pylist() == ["edx:a", "edx:b", "nptel:c"]
+    assert table.column("source").to_pylist() == ["edx", "edx", "nptel"]
+    assert table.column("skills").to_pylist()[0] == ["Python", "SQL"]
+    assert table.column("tags").to_pylist()[2] == []
+
+    # A second full export replaces the parts instead of duplicating rows
+    export_catalog(tmp_path / "u.db", out)
+    assert ds.dataset(str(out), format="parquet", partitioning="hive").count_rows() == 3
+
+def test_incremental_arrow_export_appends_changed_rows(conn, tmp_path, make_record):
+    out = tmp_path / "exports"
+    export_catalog(tmp_path / "u.db", out, fmt="arrow", partition_by_source=False)
+
+    assert export_catalog(tmp_path / "u.db", out, fmt="arrow", partition_by_source=False,
+                          incremental=True)["rows"] == 0
+    bulk_upsert(conn, [make_record("b", title="Renamed")])
+    stats = export_catalog(tmp_path / "u.db", out, fmt="arrow", partition_by_source=False, incremental=True)
+    assert stats["rows"] == 1
+    table = ds.dataset(stats["files"], format="arrow").to_table()
+    assert table.column("title").to_pylist() == ["Renamed"]
+
+    with pytest.raises(ValueError):
+        export_catalog(tmp_path / "u.db", out, fmt="parquet", incremental=True)
+    conn.close()
+
+def test_unparseable_numbers_export_as_null(conn, tmp_path):
+    conn.execute("UPDATE unified_courses SET duration_weeks = 'nan', ratings_count = '1,234', popularity = 'inf', "
+                 "rating = 'abc' WHERE course_id = 'edx:a'")
+    conn.commit()
+    conn.close()
+    stats = export_catalog(tmp_path / "u.db", tmp_path / "exports", partition_by_source=False)
+    row = ds.dataset(stats["files"], format="parquet").to_table().sort_by("course_id").to_pylist()[0]
+    assert (row["duration_weeks"], row["ratings_count"], row["popularity"], row["rating"]) == (None, 1234, None, None)
+
+def test_failed_export_leaves_previous_parts(conn, tmp_path, monkeypatch, make_record):
+    out = tmp_path / "exports"
+    export_catalog(tmp_path / "u.db", out)
+    # Two changed rows for the incremental export
+    bulk_upsert(conn, [make_record("a", title="Renamed"), make_record("b", title="Renamed")])
+    conn.close()
+    before = {p.relative_to(out): p.read_bytes() for p in out.rglob("*") if p.is_file()}
+
+    real_batch, calls = export._record_batch, []
+    def failing_batch(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        return real_batch(*args)
+    monkeypatch.setattr(export, "_record_batch", failing_batch)
+    for incremental in (False, True):
+        calls.clear()
+        with pytest.raises(RuntimeError):
+            export_catalog(tmp_path / "u.db", out, batch_rows=1, incremental=incremental)
+        assert {p.relative_to(out): p.read_bytes() for p in out.rglob("*") if p.is_file()} == before
+
+def test_incremental_export_sees_merged_partition_rows(conn, tmp_path, make_catalog, make_record):
+    out = tmp_path / "exports"
+    export_catalog(tmp_path / "u.db", out, partition_by_source=False)
+    # A partition run loaded before the export, merged after it
+    part = make_catalog([make_record("b", title="Renamed"), make_record("d")], path=tmp_path / "part.db")
+    part.execute("UPDATE unified_courses SET updated_at = '2000-01-01T00:00:00'")
+    part.commit()
+    part.close()
+    merge_partition_db(conn, tmp_path / "part.db")
+    stats = export_catalog(tmp_path / "u.db", out, partition_by_source=False, incremental=True)
+    assert sorted(ds.dataset(stats["files"], format="parquet").to_table().column("course_id").to_pylist()) \
+        == ["edx:b", "edx:d"]
+    conn.close()
@@ -103,3 +103,52 @@ def test_extract_nptel_minimal(tmp_path):
     assert "thermodynamics" in rec["tags"]
     assert "heat" in rec["tags"]
     conn.close()
+
+def _by_id(recs):
+    return {r["source_course_id"]: r for r in recs}
+
+def test_streaming_matches_preload(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "s.db"))
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    # edX without a staff table; course ids stored as integers on purpose
+    cur.execute("CREATE TABLE courses (id, title, description, subject, level, language, weeks_to_complete, availability, marketing_url, card_image_url)")
+    cur.execute("CREATE TABLE tags (id INTEGER PRIMARY KEY AUTOINCREMENT, course_id, tag TEXT)")
+    cur.execute("CREATE TABLE skills (id INTEGER PRIMARY KEY AUTOINCREMENT, course_id, skill TEXT, category TEXT, subcategory TEXT)")
+    cur.execute("CREATE TABLE owners (id INTEGER PRIMARY KEY AUTOINCREMENT, course_id, name TEXT)")
+    for cid in [10, 9, 2, 100]:
+        cur.execute("INSERT INTO courses VALUES (?, ?, 'D', 'CS', 'Advanced', 'English', 4, NULL, NULL, NULL)", (cid, f"T{cid}"))
+    cur.executemany("INSERT INTO tags(course_id, tag) VALUES (?, ?)",
+                    [(100, "x"), (9, "a"), (10, "b"), (9, "c"), (55, "orphan"), (2, "d")])
+    cur.executemany("INSERT INTO skills(course_id, skill) VALUES (?, ?)", [(2, "Python"), (100, "SQL")])
+    cur.executemany("INSERT INTO owners(course_id, name) VALUES (?, ?)", [(9, "MITx"), (9, "HarvardX")])
+    conn.commit()
+
+    preload = _by_id(extract_edx(conn))
+    streamed = list(extract_edx(conn, streaming=True))
+    assert [r["source_course_id"] for r in streamed] == ["10", "100", "2", "9"]
+    assert _by_id(streamed) == preload
+    assert preload["9"]["tags"] == ["a", "c"] and preload["9"]["provider"] == "MITx, HarvardX"
+    conn.close()
+
+def test_streaming_matches_preload_nptel(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "n.db"))
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute("""CREATE TABLE courses (course_id TEXT PRIMARY KEY, title TEXT, institute TEXT, professor TEXT,
+                   content_type TEXT, discipline_id TEXT, current_run INTEGER, self_paced INTEGER,
+                   url TEXT, scraped INTEGER, last_updated TEXT)""")
+    cur.execute("""CREATE TABLE course_metadata (id INTEGER PRIMARY KEY AUTOINCREMENT, course_id TEXT,
+                   lesson_number INTEGER, lesson_title TEXT, concepts_json TEXT, raw_concepts_text TEXT, fetched_at TEXT)""")
+    for cid in ["n2", "n1", "n3"]:
+        cur.execute("INSERT INTO courses (course_id, title, institute) VALUES (?, ?, 'IIT')", (cid, cid.upper()))
+    cur.executemany("INSERT INTO course_metadata (course_id, concepts_json, raw_concepts_text) VALUES (?, ?, ?)",
+                    [("n3", '["z"]', None), ("n1", '["a","b"]', "c"), ("n1", None, "b; d")])
+    conn.commit()
+
+    preload = _by_id(extract_nptel(conn))
+    streamed = _by_id(extract_nptel(conn, streaming=True))
+    assert streamed == preload
+    assert preload["n1"]["tags"] == ["a", "b", "c", "d"]
+    assert preload["n2"]["tags"] == []
+    conn.close()
@@ -0,0 +1,87 @@
+import json
+import sqlite3
+
+import pytest
+
+from unified_catalog import loader
+from unified_catalog.loader import (
+    UNIFIED_SCHEMA, ensure_schema, bulk_upsert, decode_source_map_payload, course_ids_for_value,
+)
+
+def test_bulk_upsert_skips_unchanged_records(tmp_path, make_record):
+    conn = sqlite3.connect(str(tmp_path / "u.db"))
+    ensure_schema(conn)
+
+    assert bulk_upsert(conn, [make_record("a"), make_record("b")]) == {"inserted": 2, "updated": 0, "unchanged": 0}
+    stamp = conn.execute("SELECT updated_at FROM unified_courses WHERE course_id='edx:a'").fetchone()[0]
+    changes = conn.total_changes
+
+    assert bulk_upsert(conn, [make_record("a"), make_record("b")]) == {"inserted": 0, "updated": 0, "unchanged": 2}
+    assert conn.total_changes == changes
+    assert conn.execute("SELECT updated_at FROM unified_courses WHERE course_id='edx:a'").fetchone()[0] == stamp
+
+    stats = bulk_upsert(conn, [make_record("a", title="New title"), make_record("b"), make_record("c")])
+    assert stats == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert conn.execute("SELECT title FROM unified_courses WHERE course_id='edx:a'").fetchone()[0] == "New title"
+    conn.close()
+
+def test_ensure_schema_adds_content_hash_to_old_db(tmp_path, make_record):
+    conn = sqlite3.connect(str(tmp_path / "old.db"))
+    old_schema = UNIFIED_SCHEMA.split("CREATE UNIQUE INDEX")[0]
+    old_schema = old_schema.replace("extra_json TEXT,", "extra_json TEXT").split("content_hash TEXT")[0] + ");"
+    conn.executescript(old_schema)
+    conn.execute("INSERT INTO unified_courses (course_id, source, source_course_id) VALUES ('edx:a', 'edx', 'a')")
+    ensure_schema(conn)
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(unified_courses)")]
+    assert "content_hash" in cols
+    assert bulk_upsert(conn, [make_record("a")]) == {"inserted": 0, "updated": 1, "unchanged": 0}
+    conn.close()
+
+def test_source_map_versions_are_compressed_and_pruned(tmp_path, make_record):
+    conn = sqlite3.connect(str(tmp_path / "u.db"))
+    ensure_schema(conn)
+
+    for title in ["v1", "v2", "v2", "v3", "v4"]:
+        bulk_upsert(conn, [make_record("a", title=title)], retention=2)
+
+    rows = conn.execute(
+        "SELECT raw_record_json, raw_record_z FROM source_map WHERE course_id='edx:a' ORDER BY id"
+    ).fetchall()
+    assert [decode_source_map_payload(*r)["title"] for r in rows] == ["v3", "v4"]
+    assert all(r[0] is None and isinstance(r[1], bytes) for r in rows)
+    conn.close()
+
+def test_side_tables_follow_upserts_and_deletes(tmp_path, make_record):
+    conn = sqlite3.connect(str(tmp_path / "u.db"))
+    ensure_schema(conn)
+
+    bulk_upsert(conn, [make_record("a", skills=["Python", "SQL"]), make_record("b", skills=["python"])])
+    assert sorted(course_ids_for_value(conn, "skills", "PYTHON")) == ["edx:a", "edx:b"]
+    assert conn.execute("SELECT COUNT(*) FROM skills").fetchone()[0] == 2
+
+    bulk_upsert(conn, [make_record("a", skills=["SQL"], tags=["Data"])])
+    assert course_ids_for_value(conn, "skills", "python") == ["edx:b"]
+    assert course_ids_for_value(conn, "tags", "data") == ["edx:a"]
+    assert course_ids_for_value(conn, "instructors", "prof_x") == ["edx:a", "edx:b"]
+
+    conn.execute("DELETE FROM unified_courses WHERE course_id='edx:b'")
+    assert course_ids_for_value(conn, "skills", "python") == []
+    conn.close()
+
+def test_pack_record_is_backend_independent(make_record):
+    pytest.importorskip("orjson")
+    rec = make_record("é1", title="Café ü \u2028", extra={"n": 1, "f": 4.5, 3: None, "nested": [True, None]})
+    odd = make_record("odd", rating=1e16, extra={"small": 1e-7, "nan": float("nan"), "inf": [float("-inf")], 1e20: 0.0})
+    payloads = []
+    for r in (odd, rec):
+        packed, payload = loader._pack_record(r, "2024-01-01T00:00:00")
+        for dumps in (loader._json_dumps_stdlib, loader._json_dumps_orjson):
+            loader_dumps, loader.json_dumps = loader.json_dumps, dumps
+            try:
+                assert loader._pack_record(r, "2024-01-01T00:00:00") == (packed, payload)
+            finally:
+                loader.json_dumps = loader_dumps
+        payloads.append(payload)
+    # Floats orjson would print differently keep the stdlib form (1e+16, NaN, not 1e16, null)
+    assert all(f in payloads[0] for f in (b":1e+16,", b'"small":1e-07', b'"nan":NaN', b"[-Infinity]", b'"1e+20":0.0'))
+    assert json.loads(payload) == json.loads(json.dumps(rec))   # the record itself, int keys as strings
@@ -0,0 +1,82 @@
+import numpy as np
+
+from unified_catalog import neighbors
+from unified_catalog.loader import bulk_upsert
+from unified_catalog.neighbors import refresh_neighbors, related
+from unified_catalog.reader import CatalogReader
+from unified_catalog.similar import SimilarityIndex
+
+TOPICS = ["python data analysis", "machine learning models", "statistics inference", "web development html",
+          "bread baking", "sql databases", "deep learning vision"]
+
+def _courses(make_record, changed=()):
+    out = []
+    for i in range(14):
+        a, b = TOPICS[i % 7], TOPICS[(i * 3 + 1) % 7]
+        title = f"{a} {b} part {i}" if i not in changed else "bread baking for engineers"
+        out.append(make_record(f"c{i:02d}", title=title, description=f"{b} {a} " + "notes " * (i % 5 + 1),
+                               skills=[a.split()[0].title(), b.split()[-1].title()],
+                               provider=["MITx", "HarvardX", None][i % 3]))
+    return out
+
+def _table(conn):
+    out = {}
+    for cid, nid, score, rank in conn.execute("SELECT * FROM course_neighbors ORDER BY course_id, rank"):
+        out.setdefault(cid, []).append((nid, round(score, 6), rank))
+    return out
+
+def _expected(conn, index_dir, k):
+    """Top-k of the dense blend, computed pair by pair."""
+    index = SimilarityIndex(index_dir)
+    vocab = index.vocab()
+    n = len(index)
+    text = np.zeros((n, len(vocab)))
+    for r in range(n):
+        lo, hi = index.rows_indptr[r], index.rows_indptr[r + 1]
+        text[r, index.rows_indices[lo:hi]] = index.rows_data[lo:hi]
+    skills = (text != 0) & np.array([t.startswith("s:") for t in vocab])
+    skills = skills / np.maximum(np.sqrt(skills.sum(axis=1, keepdims=True)), 1)
+    provider = dict(conn.execute("SELECT course_id, provider FROM unified_courses"))
+    weights = neighbors.NEIGHBOR_WEIGHTS
+    out = {}
+    for i, a in enumerate(index.course_ids):
+        scored = []
+        for j, b in enumerate(index.course_ids):
+            score = weights["text"] * text[i] @ text[j] + weights["skills"] * skills[i] @ skills[j]
+            if i != j and score > 0:
+                score += weights["provider"] * (provider[a] is not None and provider[a] == provider[b])
+                scored.append((-score, b))
+        out[a] = [(b, round(-s, 6), rank) for rank, (s, b) in enumerate(sorted(scored)[:k], 1)]
+    return out
+
+def test_neighbors_match_brute_force_blend(tmp_path, monkeypatch, make_catalog, make_record):
+    monkeypatch.setattr(neighbors, "NEIGHBORS_DENSE_DF", 0.25)   # frequent terms dense, the rest gathered
+    conn = make_catalog(_courses(make_record))
+    stats = refresh_neighbors(conn, tmp_path / "idx", k=4, workers=1)
+    assert (stats["full"], stats["recomputed"]) == (1, 14)
+    assert _table(conn) == _expected(conn, tmp_path / "idx", 4)
+    best = [nid for nid, *_ in _table(conn)["edx:c00"][:2]]
+    assert [nid for nid, _ in related(conn, "edx:c00", limit=2)] == best
+    with CatalogReader(tmp_path / "u.db") as reader:
+        assert [course.course_id for course, _ in reader.related("edx:c00", limit=2)] == best
+    assert refresh_neighbors(conn, tmp_path / "idx", k=4)["recomputed"] == 0
+    conn.close()
+
+def test_incremental_refresh_matches_full_recompute(tmp_path, monkeypatch, make_catalog, make_record):
+    monkeypatch.setattr("unified_catalog.similar.SIMILAR_REFIT_FRACTION", 0.9)
+    monkeypatch.setattr(neighbors, "NEIGHBORS_BLOCK_CELLS", 14 * 3)   # 3 rows per block, several tasks
+    conn = make_catalog(_courses(make_record))
+    refresh_neighbors(conn, tmp_path / "idx", k=3, workers=1)
+
+    bulk_upsert(conn, [r for r in _courses(make_record, changed={4}) if r["source_course_id"] == "c04"])
+    conn.execute("DELETE FROM unified_courses WHERE course_id = 'edx:c09'")
+    conn.commit()
+    stats = refresh_neighbors(conn, tmp_path / "idx", k=3, workers=2)
+    assert (stats["full"], stats["changed"], stats["removed"]) == (0, 1, 1)
+    assert stats["recomputed"] < 13
+    incremental = _table(conn)
+    assert "edx:c09" not in incremental and all("edx:c09" not in [n for n, *_ in v] for v in incremental.values())
+
+    assert refresh_neighbors(conn, tmp_path / "idx", k=3, full=True, workers=1)["recomputed"] == 13
+    assert incremental == _table(conn)
+    conn.close()
@@ -0,0 +1,83 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from unified_catalog import quiz_recs
+from unified_catalog.loader import bulk_upsert
+from unified_catalog.quiz_recs import label_columns, label_coverage, label_key, recommend, store_recommendations, stored
+
+LABEL_MAP = {"ALG": {"skills": ["Algebra", "Mathematics"], "tags": ["algebra"]},
+             "PROG": {"skills": ["Python"]}, "PROG004": {"skills": ["OOP"]}}
+
+@pytest.fixture
+def conn(make_catalog, make_record):
+    return make_catalog([
+        make_record("alg_full", skills=["Algebra", "Mathematics"], tags=["Algebra"]),
+        make_record("alg_half", skills=["algebra"], tags=[]),
+        make_record("py", skills=["Python"], tags=[]),
+        make_record("oop", skills=["OOP", "Python"], tags=[]),
+        make_record("bake", skills=["Baking"], tags=["algebra-free"]),
+    ])
+
+def _quiz(tmp_path, answers):
+    """Quiz-app tables (only the columns used) with one result per (user, question, points) answer."""
+    conn = sqlite3.connect(str(tmp_path / "quiz.db"))
+    conn.executescript("""
+        CREATE TABLE questions (id INTEGER PRIMARY KEY, label_id TEXT);
+        CREATE TABLE results (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL);
+        CREATE TABLE result_per_question (id INTEGER PRIMARY KEY, result_id INTEGER, question_id INTEGER,
+                                          points INTEGER DEFAULT 0);
+        INSERT INTO questions VALUES (1, 'ALG001'), (2, 'ALG002'), (3, 'PROG001'), (4, 'PROG004'),
+                                     (5, 'HIST001'), (6, NULL);
+    """)
+    for result_id, (user, question, points) in enumerate(answers, 1):
+        conn.execute("INSERT INTO results (id, user_id) VALUES (?, ?)", (result_id, user))
+        conn.execute("INSERT INTO result_per_question (result_id, question_id, points) VALUES (?, ?, ?)",
+                     (result_id, question, points))
+    conn.commit()
+    return conn
+
+def test_recommends_courses_covering_weakest_labels(conn, tmp_path, monkeypatch):
+    assert (label_key("PROG004", LABEL_MAP), label_key("PROG017", LABEL_MAP), label_key("HIST001", LABEL_MAP)) \
+        == ("PROG004", "PROG", None)
+    quiz = _quiz(tmp_path, [
+        (1, 1, 0), (1, 2, 0), (1, 3, 1), (1, 4, 0), (1, 5, 0), (1, 6, 0),   # weak: ALG, PROG004, a bit PROG
+        (2, 1, 1), (2, 2, 1), (2, 1, 1), (2, 3, 1),                         # ALG mastered, one PROG answer
+        (3, 5, 0),                                                           # unmapped label only
+        (2 ** 40, 1, 0),                                                     # ids past 32 bits
+    ])
+    recs = recommend(conn, quiz, k=10, label_map=LABEL_MAP)
+    assert set(recs) == {1, 2, 2 ** 40}
+
+    # Weakness = 0.8 - (correct + 1) / (answers + 2): ALG 0.55, PROG004 0.8 - 1/3, PROG 0.8 - 2/3
+    weak = {"ALG": 0.55, "PROG004": 0.8 - 1 / 3, "PROG": 0.8 - 2 / 3}
+    total = sum(weak.values())
+    expected = [("edx:oop", (weak["PROG004"] + weak["PROG"]) / total), ("edx:alg_full", weak["ALG"] / total),
+                ("edx:alg_half", weak["ALG"] * 0.4 / total), ("edx:py", weak["PROG"] / total)]
+    assert [c for c, _ in recs[1]] == [c for c, _ in expected]
+    assert [s for _, s in recs[1]] == pytest.approx([s for _, s in expected], rel=1e-5)
+    assert recs[2] == [("edx:oop", pytest.approx(1.0)), ("edx:py", pytest.approx(1.0))]   # ties by course_id
+
+    monkeypatch.setattr(quiz_recs, "QUIZ_WEAKEST_LABELS", 1)
+    only = recommend(conn, quiz, k=1, user_ids=[1], label_map=LABEL_MAP)
+    assert only == {1: [("edx:alg_full", pytest.approx(1.0))]}
+    # Candidate cap: each label keeps its best-covering courses, ties by course order
+    assert [c.tolist() for c in label_columns(np.array([[0, 0.4, 1, 0.4], [0, 0, 0, 0]]), limit=2)] == [[1, 2], []]
+    quiz.close()
+    conn.close()
+
+def test_label_coverage_matches_names_like_nocase(conn, make_record):
+    bulk_upsert(conn, [make_record("etude", skills=["Étude"], tags=[])])
+    # 'ÉTUDE' matches 'Étude' under NOCASE (only ASCII letters fold), 'étude' does not
+    label_map = {"LOW": {"skills": ["étude"]}, "UP": {"skills": ["ÉTUDE"]}}
+    course_ids, cover = label_coverage(conn, ["LOW", "UP"], label_map)
+    assert course_ids == ["edx:etude"] and cover[:, 0].tolist() == [0.0, 1.0]
+    conn.close()
+
+def test_store_recommendations(conn):
+    store_recommendations(conn, {1: [("edx:oop", 0.5), ("edx:py", 0.2)], 2: [("edx:py", 1.0)]})
+    store_recommendations(conn, {2: []}, users=[2])
+    assert stored(conn, 1) == [("edx:oop", 0.5), ("edx:py", 0.2)]
+    assert stored(conn, 1, limit=1) == [("edx:oop", 0.5)] and stored(conn, 2) == []
+    conn.close()
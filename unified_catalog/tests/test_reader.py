@@ -0,0 +1,61 @@
+import sqlite3
+import threading
+
+import pytest
+
+from unified_catalog.loader import bulk_upsert, catalog_version
+from unified_catalog.reader import CatalogReader
+
+@pytest.fixture
+def conn(make_catalog, make_record):
+    return make_catalog([
+        make_record("a", skills=["Python", "SQL"], level="beginner"),
+        make_record("b", skills=["python"], level="advanced", provider="HarvardX"),
+        make_record("c", source="nptel", subject="Maths", tags=[]),
+    ])
+
+def test_reader_queries_and_lazy_rows(conn, tmp_path):
+    path = tmp_path / "u.db"
+    with CatalogReader(path) as reader:
+        a = reader.get("edx:a")
+        assert a.title == "Course a" and a.skills == ("Python", "SQL") and a.extra["availability"] == "Available"
+        assert a.to_dict()["skills"] == ["Python", "SQL"]
+        assert reader.get("edx:missing") is None
+        assert [c and c.course_id for c in reader.get_many(["nptel:c", "nope", "edx:a"])] == ["nptel:c", None, "edx:a"]
+        assert [c.course_id for c in reader.find(subject="CS")] == ["edx:a", "edx:b"]
+        assert [c.course_id for c in reader.find(subject="CS", provider="HarvardX")] == ["edx:b"]
+        assert [c.course_id for c in reader.by_skill("PYTHON")] == ["edx:a", "edx:b", "nptel:c"]
+        with pytest.raises(sqlite3.OperationalError):   # read-only connection
+            reader._conn().execute("DELETE FROM unified_courses")
+    conn.close()
+
+def test_reader_cache_hits_and_version_invalidation(conn, tmp_path, make_record):
+    path = tmp_path / "u.db"
+    reader = CatalogReader(path)
+    first = reader.get("edx:a")
+    assert reader.get("edx:a") is first                 # served from the cache
+    assert reader.get_many(["edx:a"])[0] is first
+    assert reader.cache_info()["hits"] == 2
+
+    version = catalog_version(conn)
+    bulk_upsert(conn, [make_record("a", title="Renamed")])     # unchanged records would not bump
+    assert catalog_version(conn) == version + 1
+    assert reader.get("edx:a").title == "Renamed"
+
+    bulk_upsert(conn, [make_record("a", title="Renamed")])
+    assert catalog_version(conn) == version + 1
+
+    # NOCASE folds ASCII only: spellings that differ in a non-ASCII letter must not share a cache entry
+    bulk_upsert(conn, [make_record("d", skills=["Étude"])])
+    assert [c.course_id for c in reader.by_skill("ÉTUDE")] == ["edx:d"]
+    assert reader.by_skill("étude") == []
+
+    # Every thread reads through its own connection and sees the same cache
+    seen = []
+    worker = threading.Thread(target=lambda: seen.append(reader.get("edx:a")))
+    worker.start()
+    worker.join()
+    assert seen[0] is reader.get("edx:a")
+    assert len(reader._conns) == 2
+    reader.close()
+    conn.close()
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+from unified_catalog.loader import (
+    ensure_schema, bulk_upsert, finish_rebuild, begin_rebuild, STAGING_TABLE, LIVE_TABLE, UNIFIED_SCHEMA,
+    UNIFIED_TABLE_SQL,
+)
+from unified_catalog.search import search, to_match_query
+
+@pytest.fixture
+def conn(make_catalog, make_record):
+    return make_catalog([
+        make_record("a", title="Machine Learning Foundations", skills=["Python"], level="beginner"),
+        make_record("b", title="Cooking Basics", description="Learn machine-assisted baking", level="advanced"),
+        make_record("c", title="Data Structures", tags=["Algorithms"], source="nptel"),
+    ])
+
+def test_search_ranks_filters_and_highlights(conn):
+    hits = search(conn, "machine")
+    assert [h["course_id"] for h in hits] == ["edx:a", "edx:b"]   # title match outranks description
+    assert "[Machine]" in hits[0]["snippet"]
+    assert [h["course_id"] for h in search(conn, "machine", level=["advanced"])] == ["edx:b"]
+    assert [h["course_id"] for h in search(conn, "algorithm", source="nptel")] == ["nptel:c"]
+    assert search(conn, 'machine" (') != []   # stray FTS syntax is quoted away
+    conn.close()
+
+def test_search_index_follows_updates_deletes_and_rebuild(conn, make_record):
+    bulk_upsert(conn, [make_record("a", title="Deep Learning")])
+    assert search(conn, "foundations") == []
+    assert [h["course_id"] for h in search(conn, "deep")] == ["edx:a"]
+
+    conn.execute("DELETE FROM unified_courses WHERE course_id='edx:a'")
+    conn.commit()
+    assert search(conn, "deep") == []
+
+    begin_rebuild(conn)
+    bulk_upsert(conn, [make_record("d", title="Deep Rebuild")], table=STAGING_TABLE)
+    finish_rebuild(conn, ["edx"])
+    assert [h["course_id"] for h in search(conn, "deep")] == ["edx:d"]
+    assert [h["course_id"] for h in search(conn, "data")] == ["nptel:c"]
+    conn.close()
+
+def _restore_from_dump(conn):
+    # What a dump and restore (or a VACUUM free to renumber) does: same columns, no hidden rowid
+    conn.execute(f"ALTER TABLE {LIVE_TABLE} RENAME TO dumped")
+    conn.execute(UNIFIED_TABLE_SQL.format(table=LIVE_TABLE))
+    conn.execute(f"INSERT INTO {LIVE_TABLE} SELECT * FROM dumped ORDER BY course_id")
+    conn.execute("DROP TABLE dumped")
+    conn.commit()
+
+def test_search_survives_rowid_renumbering(conn):
+    conn.execute("DELETE FROM unified_courses WHERE course_id='edx:a'")
+    conn.commit()
+
+    _restore_from_dump(conn)
+    assert [h["course_id"] for h in search(conn, "data")] == ["nptel:c"]
+    assert "[Data]" in search(conn, "data")[0]["snippet"]
+    conn.close()
+
+def test_ensure_schema_adds_row_id_to_old_catalog(tmp_path, make_record):
+    conn = sqlite3.connect(str(tmp_path / "old.db"))
+    old_schema = (UNIFIED_SCHEMA.replace("    row_id INTEGER PRIMARY KEY,", "", 1)
+                  .replace("course_id TEXT NOT NULL UNIQUE,", "course_id TEXT PRIMARY KEY,", 1)
+                  .replace("content_rowid='row_id'", "content_rowid='rowid'")
+                  .replace(".row_id,", ".rowid,"))
+    conn.executescript(old_schema)
+    titles = {"a": "Alpha", "b": "Beta", "c": "Gamma", "d": "Delta"}
+    bulk_upsert(conn, [make_record(i, title=f"{t} Course") for i, t in titles.items()])
+    conn.execute("DELETE FROM unified_courses WHERE course_id IN ('edx:a', 'edx:b')")
+    conn.commit()
+    rowids = conn.execute("SELECT course_id, rowid FROM unified_courses ORDER BY course_id").fetchall()
+
+    ensure_schema(conn)
+    assert conn.execute("SELECT course_id, row_id FROM unified_courses ORDER BY course_id").fetchall() == rowids
+    assert [h["course_id"] for h in search(conn, "delta")] == ["edx:d"]   # old index still lines up
+    bulk_upsert(conn, [make_record("e", title="Epsilon Course")])
+    _restore_from_dump(conn)
+    assert [h["course_id"] for h in search(conn, "epsilon")] == ["edx:e"]
+    conn.close()
+
+def test_to_match_query():
+    assert to_match_query("intro to py") == '"intro" "to" "py"*'
+    assert to_match_query("  ") == ""
@@ -0,0 +1,57 @@
+import numpy as np
+
+from unified_catalog import similar
+from unified_catalog.loader import bulk_upsert
+from unified_catalog.similar import SimilarityIndex, refresh
+
+def _dense(index):
+    """Row-normalized TF-IDF matrix of the index as a dense array."""
+    out = np.zeros((len(index), len(index.idf)))
+    for r in range(len(index)):
+        lo, hi = index.rows_indptr[r], index.rows_indptr[r + 1]
+        out[r, index.rows_indices[lo:hi]] = index.rows_data[lo:hi]
+    return out
+
+def test_similar_courses_match_dense_cosine(ml_catalog, tmp_path):
+    conn = ml_catalog
+    assert refresh(conn, tmp_path / "idx")["full"] == 1
+
+    index = SimilarityIndex(tmp_path / "idx")
+    assert isinstance(index.rows_data, np.memmap)
+    hits = index.similar("edx:ml1", k=3)
+    assert [cid for cid, _ in hits][:2] == ["edx:ml2", "edx:web"]
+    assert "edx:bake" not in [cid for cid, _ in hits]   # nothing in common, score 0
+    dense = _dense(index)
+    row = index.course_ids.index("edx:ml1")
+    for cid, score in hits:
+        assert np.isclose(score, dense[row] @ dense[index.course_ids.index(cid)], atol=1e-6)
+    assert index.similar("edx:unknown") == []
+    conn.close()
+
+def test_refresh_revectorizes_only_changed_courses(ml_catalog, tmp_path, monkeypatch, make_record):
+    conn = ml_catalog
+    monkeypatch.setattr(similar, "SIMILAR_REFIT_FRACTION", 0.6)
+    refresh(conn, tmp_path / "idx")
+    assert refresh(conn, tmp_path / "idx")["vectorized"] == 0
+
+    bulk_upsert(conn, [make_record("bake", title="Baking Machine Learning Models", skills=["Machine Learning"])])
+    conn.execute("DELETE FROM unified_courses WHERE course_id = 'edx:web'")
+    conn.commit()
+    stats = refresh(conn, tmp_path / "idx")
+    assert (stats["vectorized"], stats["removed"], stats["full"], stats["rows"]) == (1, 1, 0, 3)
+
+    index = SimilarityIndex(tmp_path / "idx")
+    assert sorted(index.course_ids) == ["edx:bake", "edx:ml1", "edx:ml2"]
+    assert index.similar("edx:bake", k=1)[0][0] in ("edx:ml1", "edx:ml2")
+    assert index.similar("edx:web") == []
+    # Postings stay the exact transpose of the rows after a refresh
+    dense = _dense(index)
+    for t in range(len(index.idf)):
+        lo, hi = index.cols_indptr[t], index.cols_indptr[t + 1]
+        assert np.allclose(dense[index.cols_indices[lo:hi], t], index.cols_data[lo:hi])
+
+    # 3 of the 4 fitted rows changed since the fit: past the threshold, so the next refresh refits
+    bulk_upsert(conn, [make_record("ml1", title="Statistics")])
+    assert refresh(conn, tmp_path / "idx")["full"] == 1
+    assert SimilarityIndex(tmp_path / "idx").meta["changed_since_fit"] == 0
+    conn.close()
@@ -1,5 +1,11 @@
 import json
 from unified_catalog.transform import parse_json_field, merge_unique_lists, normalize_level, parse_weeks
+from unified_catalog.transform import (
+    parse_json_field_batch,
+    merge_unique_lists_batch,
+    normalize_level_batch,
+    parse_weeks_batch,
+)
 
 def test_parse_json_field_variants():
     assert parse_json_field(None) == []
@@ -23,3 +29,18 @@ def test_parse_weeks():
     assert parse_weeks("Approx. 8 Weeks") == 8
     assert parse_weeks("2-4 weeks") == 4
     assert parse_weeks("N/A") is None
+
+def test_batch_versions_match_scalar():
+    values = [None, "", "a, b", '["x","X","y"]', "a, b", ["p", "q"], 1, 1.0, True, "6 weeks", 2.6, "Intro"]
+    assert parse_json_field_batch(values) == [parse_json_field(v) for v in values]
+    levels = [None, "", "Beginner", "ADVANCED track", "Beginner", "Something else"]
+    assert normalize_level_batch(levels) == [normalize_level(v) for v in levels]
+    assert parse_weeks_batch(values[6:]) == [parse_weeks(v) for v in values[6:]]
+    lists = [["AI", "ai", " ML "], [], None]
+    assert merge_unique_lists_batch(lists) == [merge_unique_lists(lst) for lst in lists]
+
+def test_batch_results_are_not_shared():
+    out = parse_json_field_batch(["a, b", "a, b"])
+    out[0].append("c")
+    assert out[1] == ["a", "b"]
+    assert parse_json_field("a, b") == ["a", "b"]
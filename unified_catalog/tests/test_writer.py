@@ -0,0 +1,21 @@
+from unified_catalog.writer import BatchSizer
+
+def test_batch_sizer_moves_towards_target_latency():
+    sizer = BatchSizer(500, target_s=0.5, min_size=100, max_size=4000)
+    sizer.observe(500, 0.05)            # 10x faster than the target: at most doubles per step
+    assert sizer.size == 1000
+    for _ in range(5):
+        sizer.observe(sizer.size, sizer.size * 0.0001)
+    assert sizer.size == 4000           # capped
+    for _ in range(10):
+        sizer.observe(sizer.size, sizer.size * 0.01)
+    assert sizer.size == 100            # floored
+    sizer.observe(10, 5.0)              # tail batch: ignored
+    assert sizer.size == 100
+
+def test_fixed_batch_sizer_keeps_size():
+    sizer = BatchSizer(3, adaptive=False)
+    sizer.observe(3, 10.0)
+    sizer.observe(1, 0.001)
+    assert sizer.size == 3
+    assert sizer.summary()["batches"] == 2 and sizer.summary()["mean"] == 2.0
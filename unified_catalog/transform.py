@@ -1,6 +1,23 @@
 import json
 import re
-from typing import Iterable, List, Optional
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+
+from .config import TRANSFORM_CACHE_SIZE
+
+_SPLIT_RE = re.compile(r"[;,|]")
+_RANGE_RE = re.compile(r"(\d+)\s*-\s*(\d+)")
+_NUMBER_RE = re.compile(r"(\d+)")
+_LEVEL_KEYWORDS = (
+    ("beginner", ("intro", "beginner", "basic", "foundation")),
+    ("intermediate", ("intermediate", "middle")),
+    ("advanced", ("advanced", "expert")),
+)
+
+# Scalar normalizers are called once per value per record, and the values
+# repeat a lot (levels, durations, partner lists), so string inputs go through
+# bounded memo caches. Cached list results are stored as tuples and copied
+# out, so callers can still mutate what they get back.
 
 def parse_json_field(value) -> List[str]:
     """
@@ -15,23 +32,28 @@ def parse_json_field(value) -> List[str]:
     if isinstance(value, (int, float)):
         return [str(value)]
     if isinstance(value, str):
-        s = value.strip()
-        if not s:
-            return []
-        # Try JSON
+        return list(_parse_json_str(value))
+    # Fallback to string
+    return [str(value).strip()]
+
+@lru_cache(maxsize=TRANSFORM_CACHE_SIZE)
+def _parse_json_str(value: str) -> tuple:
+    s = value.strip()
+    if not s:
+        return ()
+    # Try JSON (only worth it when it can be a list)
+    if s[0] == "[":
         try:
             parsed = json.loads(s)
-            if isinstance(parsed, (list, tuple)):
+            if isinstance(parsed, list):
                 raw = [str(v).strip() for v in parsed if str(v).strip()]
-                return _dedup_preserve_order(raw)
+                return tuple(_dedup_preserve_order(raw))
         except Exception:
             pass
-        # Fallback split on commas/semicolons/pipes
-        parts = re.split(r"[;,|]", s)
-        raw = [p.strip() for p in parts if p.strip()]
-        return _dedup_preserve_order(raw)
-    # Fallback to string
-    return [str(value).strip()]
+    # Fallback split on commas/semicolons/pipes
+    parts = _SPLIT_RE.split(s)
+    raw = [p.strip() for p in parts if p.strip()]
+    return tuple(_dedup_preserve_order(raw))
 
 def merge_unique_lists(*lists: Iterable[str]) -> List[str]:
     out: List[str] = []
@@ -50,13 +72,14 @@ def merge_unique_lists(*lists: Iterable[str]) -> List[str]:
 def normalize_level(level: Optional[str]) -> Optional[str]:
     if not level:
         return None
+    return _normalize_level_str(level)
+
+@lru_cache(maxsize=TRANSFORM_CACHE_SIZE)
+def _normalize_level_str(level: str) -> Optional[str]:
     s = level.strip().lower()
-    if any(k in s for k in ["intro", "beginner", "basic", "foundation"]):
-        return "beginner"
-    if any(k in s for k in ["intermediate", "middle"]):
-        return "intermediate"
-    if any(k in s for k in ["advanced", "expert"]):
-        return "advanced"
+    for name, keywords in _LEVEL_KEYWORDS:
+        if any(k in s for k in keywords):
+            return name
     return level.strip()
 
 def parse_weeks(value) -> Optional[int]:
@@ -70,23 +93,59 @@ def parse_weeks(value) -> Optional[int]:
         return value
     if isinstance(value, float):
         return int(round(value))
-    s = str(value).strip().lower()
+    return _parse_weeks_str(str(value))
+
+@lru_cache(maxsize=TRANSFORM_CACHE_SIZE)
+def _parse_weeks_str(value: str) -> Optional[int]:
+    s = value.strip().lower()
     # range like "2-4 weeks" -> take upper bound
-    m = re.search(r"(\d+)\s*-\s*(\d+)", s)
+    m = _RANGE_RE.search(s)
     if m:
         try:
             return int(m.group(2))
-        except Exception:
+        except ValueError:
             pass
     # single number
-    m = re.search(r"(\d+)", s)
+    m = _NUMBER_RE.search(s)
     if m:
         try:
             return int(m.group(1))
-        except Exception:
+        except ValueError:
             pass
     return None
 
+# ---------- Batch (column) versions ----------
+# Same output as mapping the scalar function over the column; each distinct
+# value in the batch is normalized once.
+
+def _map_distinct(func, values: Sequence) -> List:
+    memo = {}
+    out = []
+    for v in values:
+        key = (v.__class__, v)   # 1, 1.0 and True are equal keys but normalize differently
+        try:
+            r = memo[key]
+        except KeyError:
+            r = memo[key] = func(v)
+        except TypeError:   # unhashable (list/dict) values
+            r = func(v)
+        out.append(r)
+    return out
+
+def parse_json_field_batch(values: Sequence) -> List[List[str]]:
+    # Results are copied per row: records must not share list objects
+    return [list(r) for r in _map_distinct(parse_json_field, values)]
+
+def normalize_level_batch(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    return _map_distinct(normalize_level, values)
+
+def parse_weeks_batch(values: Sequence) -> List[Optional[int]]:
+    return _map_distinct(parse_weeks, values)
+
+def merge_unique_lists_batch(lists: Sequence[Iterable[str]]) -> List[List[str]]:
+    """merge_unique_lists(lst) for each list in the column."""
+    return [merge_unique_lists(lst) if lst else [] for lst in lists]
+
 def safe_json(obj) -> str:
     try:
         return json.dumps(obj, ensure_ascii=False)
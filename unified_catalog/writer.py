@@ -0,0 +1,220 @@
+"""
+Background writer for the ETL.
+
+Extraction (the main thread, or worker processes relayed by the main thread)
+hands normalized batches to a single writer thread through a bounded queue,
+so reading/normalizing the next batch overlaps the upsert and COMMIT of the
+previous one. The writer owns its own connection to the target DB and is the
+only thing that writes to it while a run is loading.
+
+Per source, incoming records are re-chunked into commit batches whose size is
+picked by a BatchSizer: with adaptive sizing on, the size moves towards the
+one that makes a batch's write + commit take WRITER_TARGET_COMMIT_S.
+"""
+import cProfile
+import queue as queue_mod
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config import (
+    QUEUE_MAX_BATCHES,
+    WRITER_TARGET_COMMIT_S,
+    WRITER_MIN_BATCH,
+    WRITER_MAX_BATCH,
+    FAIL_FAST,
+)
+from .db import open_conn
+from .loader import LIVE_TABLE, bulk_upsert
+from .logging_config import logger
+from .metrics import StageTimer
+
+class BatchSizer:
+    """
+    Chooses the next commit batch size. Tracks an exponentially weighted
+    per-record write cost and aims at `target_s` per batch, moving at most 2x
+    per batch and staying within [min_size, max_size]. With `adaptive` off the
+    size stays at `initial`.
+    """
+
+    def __init__(self, initial: int, adaptive: bool = True, target_s: float = WRITER_TARGET_COMMIT_S,
+                 min_size: int = WRITER_MIN_BATCH, max_size: int = WRITER_MAX_BATCH):
+        self.size = initial
+        self.adaptive = adaptive
+        self.target_s = target_s
+        self.min_size = min(min_size, initial)
+        self.max_size = max(max_size, initial)
+        self.per_record_s: Optional[float] = None
+        self.sizes: List[int] = []
+
+    def observe(self, records: int, seconds: float):
+        self.sizes.append(records)
+        # Tail batches carry the fixed commit cost over few rows; they say little about the rate
+        if not self.adaptive or records < self.size // 2 or seconds <= 0:
+            return
+        rate = seconds / records
+        self.per_record_s = rate if self.per_record_s is None else 0.7 * self.per_record_s + 0.3 * rate
+        ideal = self.target_s / self.per_record_s
+        ideal = min(max(ideal, self.size / 2), self.size * 2)
+        self.size = int(min(max(ideal, self.min_size), self.max_size))
+
+    def summary(self) -> Dict:
+        sizes = self.sizes
+        return {
+            "adaptive": self.adaptive,
+            "target_commit_s": self.target_s if self.adaptive else None,
+            "batches": len(sizes),
+            "min": min(sizes) if sizes else None,
+            "max": max(sizes) if sizes else None,
+            "mean": round(sum(sizes) / len(sizes), 1) if sizes else None,
+            "final": self.size,
+        }
+
+class BackgroundWriter:
+    """
+    Writer thread fed through a bounded queue.
+
+        writer = BackgroundWriter(target_db, table, sizer)
+        writer.begin_source("edx", stats, timer, batch_no=0, marks=marks)
+        writer.put("edx", records)                 # blocks while the queue is full
+        writer.end_source("edx", on_done)          # on_done(conn, src) after its last commit
+        writer.close()                             # drain, join, re-raise a FAIL_FAST error
+
+    Upsert counts go into each source's `stats`, pack/write/commit timings
+    into its `timer`. With `checkpoints`, every commit also records the
+    source's checkpoint, with the high-water `marks` its run began with (see
+    loader.bulk_upsert). A source whose write fails is added to `failed` and
+    the rest of its records are dropped. With `profile_path`, the thread's
+    cProfile stats are dumped there.
+    """
+
+    def __init__(self, target_db: Path, table: str, sizer: BatchSizer, checkpoints: bool = True,
+                 maxsize: int = QUEUE_MAX_BATCHES, profile_path: Optional[Path] = None):
+        self.target_db = target_db
+        self.table = table
+        self.sizer = sizer
+        self.profile_path = profile_path
+        self.checkpoints = checkpoints and table == LIVE_TABLE
+        self.queue: queue_mod.Queue = queue_mod.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.failed: set = set()
+        self.error: Optional[BaseException] = None
+        self._sources: Dict[str, Dict] = {}
+        self._depths: List[int] = []
+        self._blocked_s = 0.0
+        self._idle_s = 0.0
+        self._busy_s = 0.0
+        self._written = 0
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="etl-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- Producer side ----------
+    def begin_source(self, src: str, stats: Dict[str, int], timer: StageTimer, batch_no: int = 0,
+                     marks: Optional[Dict[str, object]] = None):
+        self._sources[src] = {"stats": stats, "timer": timer, "batch_no": batch_no, "marks": marks or {},
+                              "buffer": []}
+
+    def put(self, src: str, records: List[Dict]):
+        self._put(("batch", src, records))
+
+    def end_source(self, src: str, on_done: Callable):
+        self._put(("done", src, on_done))
+
+    def close(self, raise_error: bool = True):
+        """Write everything queued, stop the thread and re-raise a FAIL_FAST writer error."""
+        while self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=1.0)
+                break
+            except queue_mod.Full:
+                continue
+        self._thread.join()
+        if raise_error and self.error is not None:
+            raise self.error
+
+    def _put(self, item):
+        if self.error is not None:
+            raise self.error
+        self._depths.append(self.queue.qsize())
+        t = time.perf_counter()
+        while True:
+            try:
+                self.queue.put(item, timeout=1.0)
+                break
+            except queue_mod.Full:
+                if not self._thread.is_alive():
+                    raise RuntimeError("ETL writer thread stopped") from self.error
+        self._blocked_s += time.perf_counter() - t
+
+    # ---------- Writer thread ----------
+    def _run(self):
+        profiler = cProfile.Profile() if self.profile_path else None
+        if profiler:
+            profiler.enable()
+        conn = open_conn(self.target_db)
+        try:
+            while True:
+                t = time.perf_counter()
+                item = self.queue.get()
+                self._idle_s += time.perf_counter() - t
+                if item is None:
+                    return
+                kind, src, payload = item
+                if src in self.failed:
+                    continue
+                try:
+                    if kind == "batch":
+                        buf = self._sources[src]["buffer"]
+                        buf.extend(payload)
+                        while len(buf) >= self.sizer.size:
+                            self._write(conn, src, self.sizer.size)
+                    else:
+                        self._write(conn, src, len(self._sources[src]["buffer"]))
+                        payload(conn, src)
+                except Exception as e:
+                    logger.exception("Writer failed for source=%s: %s", src, e)
+                    self.failed.add(src)
+                    self._sources[src]["buffer"].clear()
+                    if FAIL_FAST:
+                        self.error = e
+                        return
+        finally:
+            conn.close()
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(str(self.profile_path))
+
+    def _write(self, conn, src: str, n: int):
+        if not n:
+            return
+        state = self._sources[src]
+        chunk, state["buffer"][:n] = state["buffer"][:n], []
+        state["batch_no"] += 1
+        checkpoint = (src, state["batch_no"], state["marks"]) if self.checkpoints else None
+        t = time.perf_counter()
+        counts = bulk_upsert(conn, chunk, batch_size=len(chunk), table=self.table, timer=state["timer"],
+                             checkpoint=checkpoint)
+        elapsed = time.perf_counter() - t
+        self._busy_s += elapsed
+        self._written += len(chunk)
+        self.sizer.observe(len(chunk), elapsed)
+        for k, v in counts.items():
+            state["stats"][k] += v
+
+    # ---------- Report ----------
+    def summary(self) -> Dict:
+        wall = time.perf_counter() - self._started
+        depths = self._depths
+        return {
+            "records_written": self._written,
+            "records_per_sec": round(self._written / wall, 1) if wall else None,
+            "busy_s": round(self._busy_s, 4),
+            "idle_s": round(self._idle_s, 4),
+            "producer_blocked_s": round(self._blocked_s, 4),
+            "queue_max": self.maxsize,
+            "queue_depth_max": max(depths) if depths else 0,
+            "queue_depth_mean": round(sum(depths) / len(depths), 2) if depths else 0,
+            "batch_sizes": self.sizer.summary(),
+        }